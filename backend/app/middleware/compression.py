@@ -0,0 +1,322 @@
+import logging
+import zlib
+from typing import Callable, Dict, NamedTuple, Optional, Sequence
+
+from starlette.concurrency import run_in_threadpool
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+# Levels favouring speed, since every response is compressed on the fly.
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+ZSTD_LEVEL = 3
+
+# Bodies at least this large are compressed off the event loop.
+THREADPOOL_SIZE = 64 * 1024
+
+COMPRESSIBLE_TYPES = (
+    "text/",
+    "application/json",
+    "application/x-ndjson",
+    "application/javascript",
+    "application/xml",
+    "application/vnd.apache.arrow.stream",
+    "image/svg+xml",
+)
+
+
+class Encoder(NamedTuple):
+    """
+    A streaming compressor: compress a chunk, flush what was compressed so far, or finish.
+    """
+    compress: Callable[[bytes], bytes]
+    flush: Callable[[], bytes]
+    finish: Callable[[], bytes]
+
+
+def import_brotli():
+    """
+    Import the brotli module, which is only needed for the br encoding.
+
+    Returns:
+        module: The brotli module, or None when it is not installed.
+    """
+    try:
+        import brotli
+    except ImportError:
+        return None
+    return brotli
+
+
+def import_zstandard():
+    """
+    Import the zstandard module, which is only needed for the zstd encoding.
+
+    Returns:
+        module: The zstandard module, or None when it is not installed.
+    """
+    try:
+        import zstandard
+    except ImportError:
+        return None
+    return zstandard
+
+
+def gzip_encoder() -> Encoder:
+    """
+    Build a gzip encoder.
+
+    Returns:
+        Encoder: The encoder.
+    """
+    compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, zlib.MAX_WBITS | 16)
+    return Encoder(
+        compressor.compress, lambda: compressor.flush(zlib.Z_SYNC_FLUSH), compressor.flush
+    )
+
+
+def brotli_encoder() -> Encoder:
+    """
+    Build a brotli encoder.
+
+    Returns:
+        Encoder: The encoder.
+    """
+    compressor = import_brotli().Compressor(quality=BROTLI_QUALITY)
+    return Encoder(compressor.process, compressor.flush, compressor.finish)
+
+
+def zstd_encoder() -> Encoder:
+    """
+    Build a zstd encoder.
+
+    Returns:
+        Encoder: The encoder.
+    """
+    zstandard = import_zstandard()
+    compressor = zstandard.ZstdCompressor(level=ZSTD_LEVEL).compressobj()
+    return Encoder(
+        compressor.compress,
+        lambda: compressor.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK),
+        compressor.flush,
+    )
+
+
+def available_encoders(encodings: Sequence[str]) -> Dict[str, Callable[[], Encoder]]:
+    """
+    Get the encoders of the configured encodings whose module is installed.
+
+    A configured encoding whose module is missing is logged as a warning and left out.
+
+    Args:
+        encodings (Sequence[str]): The encodings in order of preference, e.g.
+            ('zstd', 'br', 'gzip').
+
+    Returns:
+        Dict[str, Callable[[], Encoder]]: The encoder factories, in the same order.
+    """
+    encoders = {
+        "zstd": zstd_encoder if import_zstandard() is not None else None,
+        "br": brotli_encoder if import_brotli() is not None else None,
+        "gzip": gzip_encoder,
+    }
+    for encoding in encodings:
+        if encoding in ("zstd", "br") and encoders[encoding] is None:
+            logging.warning(f"The {encoding} encoding is configured but its package is not installed; skipping it")
+    return {
+        encoding: encoders[encoding] for encoding in encodings if encoders.get(encoding) is not None
+    }
+
+
+def negotiate(accept_encoding: Optional[str], encodings: Sequence[str]) -> Optional[str]:
+    """
+    Pick the encoding of a response from the Accept-Encoding header of the request.
+
+    The encoding with the highest q-value wins, and ties go to the earlier one in
+    encodings. A '*' entry stands for the encodings not listed; q=0 refuses one.
+
+    Args:
+        accept_encoding (Optional[str]): The Accept-Encoding header.
+        encodings (Sequence[str]): The available encodings in order of preference.
+
+    Returns:
+        Optional[str]: The encoding, or None to send the response as it is.
+    """
+    weights = {}
+    for part in (accept_encoding or "").split(","):
+        name, _, parameters = part.partition(";")
+        weight = 1.0
+        for parameter in parameters.split(";"):
+            key, _, value = parameter.strip().partition("=")
+            if key.lower() == "q":
+                try:
+                    weight = float(value)
+                except ValueError:
+                    weight = 0.0
+        if name.strip():
+            weights[name.strip().lower()] = weight
+
+    best, best_weight = None, 0.0
+    for encoding in encodings:
+        weight = weights.get(encoding, weights.get("*", 0.0))
+        if weight > best_weight:
+            best, best_weight = encoding, weight
+    return best
+
+
+def compressible(status: int, headers: Headers) -> bool:
+    """
+    Tell whether a response is worth compressing, whatever the request accepts.
+
+    Args:
+        status (int): The status code.
+        headers (Headers): The response headers.
+
+    Returns:
+        bool: True for successful and error responses of a text-like type that are
+            not encoded already and allow transformations.
+    """
+    return (
+        status >= 200
+        and status not in (204, 304)
+        and "content-encoding" not in headers
+        and "no-transform" not in headers.get("cache-control", "")
+        and headers.get("content-type", "").startswith(COMPRESSIBLE_TYPES)
+    )
+
+
+class CompressionMiddleware:
+    """
+    Compress responses with the best encoding the client accepts: zstd, br or gzip.
+
+    Bodies sent in one piece are compressed when they have at least minimum_size
+    bytes. Streamed bodies, such as the reading exports, are compressed chunk by
+    chunk as they pass, without buffering them. With flush_chunks each chunk is
+    flushed so the client gets it at once. Under Mangum the whole response is
+    collected before it is returned to Lambda anyway, so public/main.py turns
+    flushing off there, which compresses better and keeps large exports under the
+    API Gateway payload limit for longer. The br and zstd encodings need the brotli
+    and zstandard packages from requirements.txt, and are skipped with a warning
+    when an install leaves them out.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        minimum_size: int = 500,
+        encodings: Sequence[str] = ("zstd", "br", "gzip"),
+        flush_chunks: bool = True,
+    ):
+        """
+        Initialize the CompressionMiddleware class.
+
+        Args:
+            app (ASGIApp): The application.
+            minimum_size (int): The smallest body compressed, in bytes.
+            encodings (Sequence[str]): The encodings offered, in order of preference.
+            flush_chunks (bool): Whether every chunk of a streamed body is flushed to the client.
+        """
+        self.app = app
+        self.minimum_size = minimum_size
+        self.encoders = available_encoders(encodings)
+        self.flush_chunks = flush_chunks
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        encoding = negotiate(Headers(scope=scope).get("accept-encoding"), list(self.encoders))
+        start = None
+        encoder = None
+
+        async def send_compressed(message: Message):
+            nonlocal start, encoder
+            if message["type"] == "http.response.start":
+                start = message
+                return
+            if message["type"] != "http.response.body":
+                return await send(message)
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+
+            if start is not None:
+                message_start, start = start, None
+                encoder = self.start_encoding(message_start, encoding, body, more_body)
+                if encoder is not None and not more_body:
+                    data = await self.compress(encoder, body, finish=True)
+                    MutableHeaders(raw=message_start["headers"])["Content-Length"] = str(len(data))
+                    await send(message_start)
+                    return await send({"type": "http.response.body", "body": data})
+                await send(message_start)
+
+            if encoder is None:
+                return await send(message)
+
+            data = await self.compress(encoder, body, finish=not more_body, flush=self.flush_chunks)
+            if data or not more_body:
+                await send({"type": "http.response.body", "body": data, "more_body": more_body})
+
+        await self.app(scope, receive, send_compressed)
+
+    def start_encoding(
+        self, message_start: Message, encoding: Optional[str], body: bytes, more_body: bool
+    ) -> Optional[Encoder]:
+        """
+        Decide whether a response is compressed, and set its headers accordingly.
+
+        Compressed responses get a Content-Encoding and a weak ETag; streamed ones
+        lose their Content-Length. Every compressible response varies on
+        Accept-Encoding, whether it is compressed or not.
+
+        Args:
+            message_start (Message): The start message, whose headers are updated in place.
+            encoding (Optional[str]): The negotiated encoding.
+            body (bytes): The first chunk of the body.
+            more_body (bool): Whether more chunks follow.
+
+        Returns:
+            Optional[Encoder]: The encoder of the response, or None to send it as it is.
+        """
+        headers = MutableHeaders(raw=list(message_start["headers"]))
+        message_start["headers"] = headers.raw
+        if not compressible(message_start["status"], headers):
+            return None
+
+        headers.add_vary_header("Accept-Encoding")
+        length = int(headers.get("content-length", -1))
+        small = (not more_body and len(body) < self.minimum_size) or 0 <= length < self.minimum_size
+        if encoding is None or small:
+            return None
+
+        headers["Content-Encoding"] = encoding
+        if "etag" in headers and not headers["etag"].startswith("W/"):
+            headers["ETag"] = f"W/{headers['etag']}"
+        if more_body:
+            del headers["Content-Length"]
+        return self.encoders[encoding]()
+
+    async def compress(
+        self, encoder: Encoder, body: bytes, finish: bool = False, flush: bool = False
+    ) -> bytes:
+        """
+        Compress a chunk of a body, off the event loop when it is large.
+
+        Args:
+            encoder (Encoder): The encoder of the response.
+            body (bytes): The chunk.
+            finish (bool): Whether this is the last chunk.
+            flush (bool): Whether to flush the compressed data so far.
+
+        Returns:
+            bytes: The compressed data to send.
+        """
+        def run() -> bytes:
+            data = encoder.compress(body)
+            if finish:
+                return data + encoder.finish()
+            return data + encoder.flush() if flush else data
+
+        if len(body) >= THREADPOOL_SIZE:
+            return await run_in_threadpool(run)
+        return run()
@@ -0,0 +1,203 @@
+import hashlib
+from typing import Callable, Dict
+from urllib.parse import parse_qsl, urlencode
+
+from starlette.concurrency import run_in_threadpool
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.responses.conditional import matches
+from app.services.cache import response_cache
+
+LISTINGS = {
+    "/api/devices": "devices",
+    "/api/categories": "categories",
+    "/api/locations": "locations",
+}
+
+
+def normalized_query(query_string: bytes) -> str:
+    """
+    Normalize a query string, so that equivalent listing calls share one cache entry.
+
+    Args:
+        query_string (bytes): The raw query string.
+
+    Returns:
+        str: The non-empty parameters, sorted by name and value.
+    """
+    pairs = parse_qsl(query_string.decode("latin-1"), keep_blank_values=False)
+    return urlencode(sorted(pairs))
+
+
+def etag(body: bytes) -> str:
+    """
+    Build the entity tag of a response body.
+
+    The tag is weak since compression may change the bytes on the wire.
+
+    Args:
+        body (bytes): The body.
+
+    Returns:
+        str: The quoted tag.
+    """
+    return f'W/"{hashlib.sha1(body).hexdigest()}"'
+
+
+class ListingCacheMiddleware:
+    """
+    Serve repeated GET calls of the device, category and location listings from a cache.
+
+    Responses are keyed on the listing, its current version and the normalized
+    query parameters. The services bump the version of a listing when a write
+    commits, so cached pages of the old version are never served again and expire
+    by themselves. Every listing response carries an ETag and a Cache-Control
+    header, and a matching If-None-Match gets a 304 without a body. Requests asking
+    for strong read consistency bypass the cache.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        ttl: float = 30,
+        max_age: int = 0,
+        listings: Dict[str, str] = None,
+        backend: Callable = response_cache,
+    ):
+        """
+        Initialize the ListingCacheMiddleware class.
+
+        Args:
+            app (ASGIApp): The application.
+            ttl (float): Seconds a cached response is served for.
+            max_age (int): The max-age clients may reuse a response for without revalidating.
+            listings (Dict[str, str]): The cached paths and the version each one follows.
+            backend (Callable): Returns the cache backend, or None to disable the cache.
+        """
+        self.app = app
+        self.ttl = ttl
+        self.cache_control = f"max-age={max_age}, must-revalidate"
+        self.listings = listings or LISTINGS
+        self.backend = backend
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http" or scope["method"] != "GET":
+            return await self.app(scope, receive, send)
+
+        path = scope["path"]
+        root_path = scope.get("root_path", "").rstrip("/")
+        if root_path and path.startswith(root_path):
+            path = path[len(root_path):]
+        namespace = self.listings.get(path.rstrip("/"))
+        headers = Headers(scope=scope)
+        backend = self.backend()
+
+        if namespace is None or backend is None or headers.get("x-read-consistency") == "strong":
+            return await self.app(scope, receive, send)
+
+        key, body = await run_in_threadpool(self.lookup, backend, namespace, scope["query_string"])
+        if key is None:
+            return await self.app(scope, receive, send)
+
+        if body is not None:
+            return await self.replay(body, headers, send)
+        await self.capture(backend, key, headers, scope, receive, send)
+
+    def lookup(self, backend, namespace: str, query_string: bytes):
+        """
+        Look up a listing response in the cache.
+
+        Args:
+            backend: The cache backend.
+            namespace (str): The listing.
+            query_string (bytes): The raw query string of the request.
+
+        Returns:
+            tuple: The cache key and the cached body, or None; the key is None when
+            the version cannot be read.
+        """
+        version = backend.version(namespace)
+        if version is None:
+            return None, None
+        digest = hashlib.sha1(normalized_query(query_string).encode()).hexdigest()
+        key = f"{namespace}:{version}:{digest}"
+        return key, backend.get(key)
+
+    async def replay(self, body: bytes, headers: Headers, send: Send):
+        """
+        Send a cached response, or a 304 when the client holds it already.
+
+        Args:
+            body (bytes): The cached body.
+            headers (Headers): The request headers.
+            send (Send): The ASGI send callable.
+        """
+        tag = etag(body)
+        response_headers = [
+            (b"etag", tag.encode()),
+            (b"cache-control", self.cache_control.encode()),
+            (b"x-cache", b"hit"),
+        ]
+        if matches(headers.get("if-none-match", ""), tag):
+            await send({"type": "http.response.start", "status": 304, "headers": response_headers})
+            await send({"type": "http.response.body", "body": b""})
+            return
+
+        response_headers += [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(body)).encode()),
+        ]
+        await send({"type": "http.response.start", "status": 200, "headers": response_headers})
+        await send({"type": "http.response.body", "body": body})
+
+    async def capture(self, backend, key: str, headers: Headers, scope: Scope, receive: Receive, send: Send):
+        """
+        Run the listing, then store a successful response and tag it.
+
+        The start message is held back until the body is complete, since the ETag
+        depends on it. Listings are sent in one piece, so this costs no streaming.
+
+        Args:
+            backend: The cache backend.
+            key (str): The cache key of the response.
+            headers (Headers): The request headers.
+            scope (Scope): The ASGI scope.
+            receive (Receive): The ASGI receive callable.
+            send (Send): The ASGI send callable.
+        """
+        start = None
+        chunks = []
+
+        async def send_tagged(message: Message):
+            nonlocal start
+            if message["type"] == "http.response.start":
+                start = message
+                return
+            if message["type"] != "http.response.body" or start is None:
+                return await send(message)
+
+            chunks.append(message.get("body", b""))
+            if message.get("more_body", False):
+                return
+
+            body = b"".join(chunks)
+            if start["status"] != 200:
+                await send(start)
+                return await send({"type": "http.response.body", "body": body})
+
+            tag = etag(body)
+            await run_in_threadpool(backend.set, key, body, self.ttl)
+            response_headers = MutableHeaders(raw=start["headers"])
+            response_headers["etag"] = tag
+            response_headers["cache-control"] = self.cache_control
+            response_headers["x-cache"] = "miss"
+            if matches(headers.get("if-none-match", ""), tag):
+                del response_headers["content-length"]
+                del response_headers["content-type"]
+                await send({**start, "status": 304})
+                return await send({"type": "http.response.body", "body": b""})
+            await send(start)
+            await send({"type": "http.response.body", "body": body})
+
+        await self.app(scope, receive, send_tagged)
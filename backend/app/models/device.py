@@ -5,6 +5,7 @@ from sqlalchemy.orm import relationship
 from app.models.category import Category
 from app.models.location import Location
 from .base import Base
+from .search import register_search_index
 
 
 class Device(Base):
@@ -31,8 +32,11 @@ class Device(Base):
     visualization = Column(Integer)
     message_type = Column(Integer)
     created_at = Column(DateTime, nullable=False, default=func.current_timestamp())
-    updated_at = Column(DateTime, nullable=False, default=func.current_timestamp())
+    updated_at = Column(DateTime, nullable=False, default=func.current_timestamp(), onupdate=func.current_timestamp())
 
     category = relationship(Category, back_populates="devices")
     location = relationship(Location, back_populates="devices")
     readings = relationship('Reading', back_populates="device")
+
+
+register_search_index(Device.__table__, "name", "description")
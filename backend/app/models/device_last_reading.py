@@ -0,0 +1,34 @@
+from sqlalchemy import Column, DateTime, Double, ForeignKey, Integer, String, func
+
+from .base import Base
+
+
+class DeviceLastReading(Base):
+    """
+    Database model for DeviceLastReading.
+
+    One row per device mirrors its most recent reading, so the current value of
+    every device is read without scanning the readings table. The row is upserted
+    in the same transaction as the readings it reflects.
+
+    Attributes:
+        device_id (int): The device, also the primary key.
+        reading_id (int): The ID of the most recent reading.
+        user_id (int): The user of the reading.
+        unit (str): The unit of the value.
+        value (str): The raw value.
+        value_num (float): The value parsed as a number, NULL when it is not numeric.
+        read_at (DateTime): The created_at of the reading.
+        updated_at (DateTime): When the row was last written.
+    """
+
+    __tablename__ = "dev_agnes_device_last_readings"
+
+    device_id = Column(Integer, ForeignKey("dev_agnes_devices.id"), primary_key=True)
+    reading_id = Column(Integer, nullable=False)
+    user_id = Column(Integer)
+    unit = Column(String)
+    value = Column(String)
+    value_num = Column(Double)
+    read_at = Column(DateTime, nullable=False)
+    updated_at = Column(DateTime, nullable=False, default=func.current_timestamp(), onupdate=func.current_timestamp())
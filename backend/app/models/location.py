@@ -2,6 +2,7 @@ from sqlalchemy import Column, Integer, String, DateTime, func
 
 from sqlalchemy.orm import relationship
 from .base import Base
+from .search import register_search_index
 
 
 class Location(Base):
@@ -21,6 +22,9 @@ class Location(Base):
     name = Column(String)
     description = Column(String)
     created_at = Column(DateTime, nullable=False, default=func.current_timestamp())
-    updated_at = Column(DateTime, nullable=False, default=func.current_timestamp())
+    updated_at = Column(DateTime, nullable=False, default=func.current_timestamp(), onupdate=func.current_timestamp())
 
     devices = relationship('Device', back_populates="location")
+
+
+register_search_index(Location.__table__, "name", "description")
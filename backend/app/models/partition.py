@@ -0,0 +1,247 @@
+from datetime import date, datetime, timezone
+from typing import List, Optional, Tuple
+
+from sqlalchemy import PrimaryKeyConstraint, Table, event, text
+from sqlalchemy.engine import Connection
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.orm import Query
+
+PARTITION_MONTHS_AHEAD = 3
+RECENT_MONTHS = 1
+
+
+def month_start(value: date) -> date:
+    """
+    Return the first day of the month of a date.
+
+    Args:
+        value (date): The date or datetime.
+
+    Returns:
+        date: The first day of its month.
+    """
+    return date(value.year, value.month, 1)
+
+
+def add_months(value: date, months: int) -> date:
+    """
+    Move the first day of a month by a number of months.
+
+    Args:
+        value (date): The first day of a month.
+        months (int): The number of months, negative to go back.
+
+    Returns:
+        date: The first day of the resulting month.
+    """
+    index = value.year * 12 + value.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(table_name: str, month: date) -> str:
+    """
+    Return the name of the partition holding one month of a table.
+
+    Args:
+        table_name (str): The name of the partitioned table.
+        month (date): The first day of the month.
+
+    Returns:
+        str: The partition name, such as dev_agnes_readings_p2026_10.
+    """
+    return f"{table_name}_p{month.year:04d}_{month.month:02d}"
+
+
+def partition_statement(table_name: str, month: date) -> str:
+    """
+    Build the DDL creating the partition of a table for one month.
+
+    Args:
+        table_name (str): The name of the partitioned table.
+        month (date): The first day of the month.
+
+    Returns:
+        str: The CREATE TABLE ... PARTITION OF statement.
+    """
+    return (
+        f"CREATE TABLE IF NOT EXISTS {partition_name(table_name, month)} PARTITION OF {table_name} "
+        f"FOR VALUES FROM ('{month.isoformat()}') TO ('{add_months(month, 1).isoformat()}')"
+    )
+
+
+def partition_months(first: date, last: date) -> List[date]:
+    """
+    List the months between two dates.
+
+    Args:
+        first (date): A date in the first month.
+        last (date): A date in the last month, inclusive.
+
+    Returns:
+        List[date]: The first day of every month in the range.
+    """
+    months = []
+    month, last = month_start(first), month_start(last)
+    while month <= last:
+        months.append(month)
+        month = add_months(month, 1)
+    return months
+
+
+def default_partition_statement(table_name: str) -> str:
+    """
+    Build the DDL creating the partition that catches rows outside every month.
+
+    Args:
+        table_name (str): The name of the partitioned table.
+
+    Returns:
+        str: The CREATE TABLE ... DEFAULT statement.
+    """
+    return f"CREATE TABLE IF NOT EXISTS {table_name}_default PARTITION OF {table_name} DEFAULT"
+
+
+def partition_names(connection: Connection, table_name: str) -> List[str]:
+    """
+    List the partitions of a PostgreSQL table.
+
+    Args:
+        connection (Connection): A connection to a PostgreSQL database.
+        table_name (str): The name of the partitioned table.
+
+    Returns:
+        List[str]: The partition names, including the default partition.
+    """
+    return list(connection.execute(
+        text(
+            "SELECT child.relname FROM pg_inherits "
+            "JOIN pg_class parent ON parent.oid = pg_inherits.inhparent "
+            "JOIN pg_class child ON child.oid = pg_inherits.inhrelid "
+            "WHERE parent.relname = :table_name"
+        ),
+        {"table_name": table_name},
+    ).scalars())
+
+
+def monthly_partitions(connection: Connection, table_name: str) -> List[Tuple[str, date]]:
+    """
+    List the monthly partitions of a table, oldest first.
+
+    Args:
+        connection (Connection): A connection to the database.
+        table_name (str): The name of the partitioned table.
+
+    Returns:
+        List[Tuple[str, date]]: The name and month of each partition; empty when
+        the table is not partitioned.
+    """
+    if connection.dialect.name != "postgresql":
+        return []
+
+    partitions = []
+    prefix = f"{table_name}_p"
+    for name in partition_names(connection, table_name):
+        suffix = name[len(prefix):] if name.startswith(prefix) else ""
+        year, _, month = suffix.partition("_")
+        if year.isdigit() and month.isdigit():
+            partitions.append((name, date(int(year), int(month), 1)))
+    return sorted(partitions, key=lambda partition: partition[1])
+
+
+def ensure_partitions(
+    connection: Connection, table_name: str, months_ahead: int = PARTITION_MONTHS_AHEAD, today: Optional[date] = None
+) -> List[str]:
+    """
+    Create the missing monthly partitions of a table up to some months ahead.
+
+    Run this well before a month starts, for example from a scheduled Lambda, so
+    rows always land in their own month rather than in the default partition. A
+    month cannot be added once the default partition holds rows for it.
+
+    Args:
+        connection (Connection): A connection to a PostgreSQL database.
+        table_name (str): The name of the partitioned table.
+        months_ahead (int): How many months after the current one to cover.
+        today (Optional[date]): The current date, for tests.
+
+    Returns:
+        List[str]: The names of the partitions that were created.
+    """
+    if connection.dialect.name != "postgresql":
+        return []
+
+    first = month_start(today or datetime.now(timezone.utc).date())
+    last = add_months(first, months_ahead)
+    existing = set(partition_names(connection, table_name))
+
+    created = []
+    for month in partition_months(first, last):
+        name = partition_name(table_name, month)
+        if name not in existing:
+            connection.execute(text(partition_statement(table_name, month)))
+            created.append(name)
+    return created
+
+
+def recent_first(query: Query, column, months: int = RECENT_MONTHS):
+    """
+    Fetch the first row of a query, looking in the partitions of the recent months first.
+
+    On PostgreSQL the query is first bounded to the rows of column from the start
+    of the month months before the current one, so the planner reads only those
+    partitions, and run unbounded only when that finds nothing. Lookups of recent
+    rows, the common case, then stay out of the older partitions. Other databases
+    run the query once.
+
+    Args:
+        query (Query): The query, ordered when the first row matters.
+        column: The partition column, such as Reading.created_at.
+        months (int): How many months before the current one the first attempt covers.
+
+    Returns:
+        The first row, or None when there is none.
+    """
+    if query.session.get_bind().dialect.name == "postgresql":
+        since = add_months(month_start(datetime.now(timezone.utc).date()), -months)
+        row = query.filter(column >= since).first()
+        if row is not None:
+            return row
+    return query.first()
+
+
+def register_partitioning(table: Table, column: str):
+    """
+    Partition a table by month on a timestamp column when it is created on PostgreSQL.
+
+    The table must declare postgresql_partition_by. Its primary key is extended
+    with the partition column, as PostgreSQL requires, and the default partition
+    and the partitions from the current month to PARTITION_MONTHS_AHEAD are created
+    with it. Other databases keep a single table.
+
+    Args:
+        table (Table): The table to partition.
+        column (str): The timestamp column in the partition key.
+    """
+    table.info["partition_key"] = column
+
+    def create_partitions(target, connection, **kw):
+        if connection.dialect.name != "postgresql":
+            return
+        connection.execute(text(default_partition_statement(table.name)))
+        ensure_partitions(connection, table.name)
+
+    event.listen(table, "after_create", create_partitions)
+
+
+@compiles(PrimaryKeyConstraint, "postgresql")
+def _compile_primary_key(constraint, compiler, **kw):
+    key = constraint.table.info.get("partition_key")
+    if not key or key in constraint.columns:
+        return compiler.visit_primary_key_constraint(constraint, **kw)
+
+    columns = [*constraint.columns, constraint.table.c[key]]
+    ddl = ""
+    if constraint.name is not None:
+        ddl += f"CONSTRAINT {compiler.preparer.format_constraint(constraint)} "
+    ddl += "PRIMARY KEY (%s)" % ", ".join(compiler.preparer.quote(column.name) for column in columns)
+    return ddl
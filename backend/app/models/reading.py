@@ -1,10 +1,38 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, func
-from sqlalchemy.orm import relationship
+import re
+
+from sqlalchemy import Column, Double, Integer, String, ForeignKey, DateTime, Index, func
+from sqlalchemy.orm import relationship, validates
 from app.models.device import Device
+from app.models.partition import register_partitioning
 
 
 from .base import Base
 
+NUMBER_PATTERN = re.compile(r"^[-+]?([0-9]+\.?[0-9]*|\.[0-9]+)([eE][-+]?[0-9]+)?$")
+
+
+def parse_number(value):
+    """
+    Parse a reading value as a number.
+
+    Args:
+        value (str): The reading value.
+
+    Returns:
+        float: The numeric value, or None when the value is not a plain decimal number.
+    """
+    if value is None:
+        return None
+    value = str(value).strip()
+    return float(value) if NUMBER_PATTERN.match(value) else None
+
+
+def default_value_num(context):
+    """
+    Column default filling value_num from the value of an inserted row.
+    """
+    return parse_number(context.get_current_parameters().get("value"))
+
 
 class Reading(Base):
     """
@@ -12,20 +40,42 @@ class Reading(Base):
 
     Attributes:
         id (int): The primary key for the Reading table.
-        username (str): The unique username of the user.
-        email (str): The unique email address of the user.
-        password (str): The hashed password of the user.
+        user_id (int): The user the reading belongs to.
+        device_id (int): The device that sent the reading.
+        unit (str): The unit of the value.
+        value (str): The raw value as sent by the device.
+        value_num (float): The value parsed as a number, NULL when it is not numeric.
+
+    On PostgreSQL the table is range partitioned by month on created_at, and its
+    primary key is (id, created_at). Other databases keep a single table.
     """
 
     __tablename__ = "dev_agnes_readings"
+    __table_args__ = (
+        Index("ix_dev_agnes_readings_device_id_created_at", "device_id", "created_at"),
+        Index("ix_dev_agnes_readings_user_id_created_at", "user_id", "created_at"),
+        {"postgresql_partition_by": "RANGE (created_at)"},
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"))
     device_id = Column(Integer, ForeignKey("dev_agnes_devices.id"))
     unit = Column(String)
     value = Column(String)
+    value_num = Column(Double, default=default_value_num)
     created_at = Column(DateTime, nullable=False, default=func.current_timestamp())
-    updated_at = Column(DateTime, nullable=False, default=func.current_timestamp())
+    updated_at = Column(DateTime, nullable=False, default=func.current_timestamp(), onupdate=func.current_timestamp())
 
     user = relationship('User', back_populates="readings")
     device = relationship(Device, back_populates="readings")
+
+    @validates("value")
+    def validate_value(self, key, value):
+        """
+        Keep value_num in step with value when a reading is created or updated.
+        """
+        self.value_num = parse_number(value)
+        return value
+
+
+register_partitioning(Reading.__table__, "created_at")
@@ -0,0 +1,44 @@
+from sqlalchemy import Column, DateTime, Float, ForeignKey, Integer, UniqueConstraint, func
+
+from .base import Base
+
+
+class ReadingRollup(Base):
+    """
+    Database model for ReadingRollup.
+
+    A rollup row holds the partial aggregate of one device's numeric readings over
+    one fixed-width time bucket, so charts can be served without scanning readings.
+
+    Attributes:
+        id (int): The primary key for the ReadingRollup table.
+        device_id (int): The device the readings belong to.
+        width (int): The bucket width in seconds (60, 3600 or 86400).
+        bucket_start (DateTime): The start of the bucket (UTC).
+        count (int): The number of numeric readings in the bucket.
+        sum (float): The sum of the values.
+        min (float): The smallest value.
+        max (float): The largest value.
+        last_value (float): The value of the most recent reading.
+        last_at (DateTime): The timestamp of the most recent reading.
+        last_reading_id (int): The ID of the most recent reading.
+    """
+
+    __tablename__ = "dev_agnes_reading_rollups"
+    __table_args__ = (
+        UniqueConstraint("device_id", "width", "bucket_start", name="uq_dev_agnes_reading_rollups_bucket"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    device_id = Column(Integer, ForeignKey("dev_agnes_devices.id"), nullable=False)
+    width = Column(Integer, nullable=False)
+    bucket_start = Column(DateTime, nullable=False)
+    count = Column(Integer, nullable=False, default=0)
+    sum = Column(Float, nullable=False, default=0)
+    min = Column(Float)
+    max = Column(Float)
+    last_value = Column(Float)
+    last_at = Column(DateTime)
+    last_reading_id = Column(Integer)
+    created_at = Column(DateTime, nullable=False, default=func.current_timestamp())
+    updated_at = Column(DateTime, nullable=False, default=func.current_timestamp())
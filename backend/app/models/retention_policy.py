@@ -0,0 +1,45 @@
+from sqlalchemy import Column, DateTime, ForeignKey, Integer, func
+
+from .base import Base
+
+
+class RetentionPolicy(Base):
+    """
+    Database model for RetentionPolicy.
+
+    A policy says how long the readings of the devices in a category, and each
+    width of their rollups, are kept. The policy without a category applies to
+    every device whose category has no policy of its own. A NULL number of days
+    keeps the data forever.
+
+    Attributes:
+        id (int): The primary key for the RetentionPolicy table.
+        category_id (int): The category the policy applies to, NULL for the default policy.
+        raw_days (int): Days raw readings are kept.
+        minute_rollup_days (int): Days 1 minute rollups are kept.
+        hour_rollup_days (int): Days 1 hour rollups are kept.
+        day_rollup_days (int): Days 1 day rollups are kept.
+    """
+
+    __tablename__ = "dev_agnes_retention_policies"
+
+    id = Column(Integer, primary_key=True, index=True)
+    category_id = Column(Integer, ForeignKey("dev_agnes_categories.id"), unique=True)
+    raw_days = Column(Integer)
+    minute_rollup_days = Column(Integer)
+    hour_rollup_days = Column(Integer)
+    day_rollup_days = Column(Integer)
+    created_at = Column(DateTime, nullable=False, default=func.current_timestamp())
+    updated_at = Column(DateTime, nullable=False, default=func.current_timestamp())
+
+    def rollup_days(self, width: int):
+        """
+        Return the number of days rollups of a width are kept.
+
+        Args:
+            width (int): The rollup width in seconds.
+
+        Returns:
+            int: The number of days, or None to keep them forever.
+        """
+        return {60: self.minute_rollup_days, 3600: self.hour_rollup_days, 86400: self.day_rollup_days}[width]
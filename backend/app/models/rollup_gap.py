@@ -0,0 +1,29 @@
+from sqlalchemy import Column, DateTime, Integer, String
+
+from .base import Base
+
+
+class RollupGap(Base):
+    """
+    Database model for RollupGap.
+
+    A gap is a range of reading IDs that a rollup refresh passed over while no
+    reading held them. The IDs may belong to a transaction that had not committed
+    yet, so later refreshes fold in the readings that appear there, until the gap
+    expires.
+
+    Attributes:
+        id (int): The primary key for the RollupGap table.
+        name (str): The name of the rollup the gap belongs to.
+        first_id (int): The first missing reading ID.
+        last_id (int): The last missing reading ID.
+        created_at (DateTime): When the refresh found the gap (UTC).
+    """
+
+    __tablename__ = "dev_agnes_rollup_gaps"
+
+    id = Column(Integer, primary_key=True)
+    name = Column(String(50), nullable=False, index=True)
+    first_id = Column(Integer, nullable=False)
+    last_id = Column(Integer, nullable=False)
+    created_at = Column(DateTime, nullable=False)
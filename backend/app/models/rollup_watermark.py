@@ -0,0 +1,20 @@
+from sqlalchemy import Column, DateTime, Integer, String, func
+
+from .base import Base
+
+
+class RollupWatermark(Base):
+    """
+    Database model for RollupWatermark.
+
+    Attributes:
+        name (str): The name of the rollup the watermark belongs to.
+        last_reading_id (int): The highest reading ID folded into the rollup.
+        updated_at (DateTime): The timestamp of the last refresh.
+    """
+
+    __tablename__ = "dev_agnes_rollup_watermarks"
+
+    name = Column(String(50), primary_key=True)
+    last_reading_id = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime, nullable=False, default=func.current_timestamp())
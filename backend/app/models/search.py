@@ -0,0 +1,98 @@
+from typing import List, Sequence
+
+from sqlalchemy import DDL, Table, event
+
+
+def search_table_name(table_name: str) -> str:
+    """
+    Return the name of the SQLite FTS5 table that indexes a table.
+
+    Args:
+        table_name (str): The name of the indexed table.
+
+    Returns:
+        str: The name of the FTS5 table.
+    """
+    return f"{table_name}_fts"
+
+
+def search_index_statements(dialect: str, table_name: str, columns: Sequence[str]) -> List[str]:
+    """
+    Build the DDL that makes the text columns of a table searchable.
+
+    On PostgreSQL every column gets a pg_trgm GIN index, which serves ILIKE
+    '%text%' and similarity ranking. On SQLite an external-content FTS5 table
+    with the trigram tokenizer mirrors the columns and is kept in sync by
+    triggers. Other databases get no search index.
+
+    Args:
+        dialect (str): The name of the database dialect.
+        table_name (str): The name of the table.
+        columns (Sequence[str]): The text columns to index.
+
+    Returns:
+        List[str]: The DDL statements, in execution order.
+    """
+    if dialect == "postgresql":
+        return ["CREATE EXTENSION IF NOT EXISTS pg_trgm"] + [
+            f"CREATE INDEX IF NOT EXISTS ix_{table_name}_{column}_trgm "
+            f"ON {table_name} USING gin ({column} gin_trgm_ops)"
+            for column in columns
+        ]
+
+    if dialect != "sqlite":
+        return []
+
+    fts = search_table_name(table_name)
+    names = ", ".join(columns)
+    new = ", ".join(f"new.{column}" for column in columns)
+    old = ", ".join(f"old.{column}" for column in columns)
+    delete = f"INSERT INTO {fts}({fts}, rowid, {names}) VALUES ('delete', old.id, {old});"
+    insert = f"INSERT INTO {fts}(rowid, {names}) VALUES (new.id, {new});"
+
+    return [
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {fts} "
+        f"USING fts5({names}, content='{table_name}', content_rowid='id', tokenize='trigram')",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_ai AFTER INSERT ON {table_name} BEGIN {insert} END",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_ad AFTER DELETE ON {table_name} BEGIN {delete} END",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_au AFTER UPDATE ON {table_name} BEGIN {delete} {insert} END",
+        f"INSERT INTO {fts}({fts}) VALUES ('rebuild')",
+    ]
+
+
+def drop_search_index_statements(dialect: str, table_name: str, columns: Sequence[str]) -> List[str]:
+    """
+    Build the DDL that removes the search index of a table.
+
+    Args:
+        dialect (str): The name of the database dialect.
+        table_name (str): The name of the table.
+        columns (Sequence[str]): The indexed text columns.
+
+    Returns:
+        List[str]: The DDL statements, in execution order.
+    """
+    if dialect == "postgresql":
+        return [f"DROP INDEX IF EXISTS ix_{table_name}_{column}_trgm" for column in columns]
+
+    if dialect != "sqlite":
+        return []
+
+    fts = search_table_name(table_name)
+    return [f"DROP TRIGGER IF EXISTS {fts}_{suffix}" for suffix in ("ai", "ad", "au")] + [f"DROP TABLE IF EXISTS {fts}"]
+
+
+def register_search_index(table: Table, *columns: str):
+    """
+    Create the search index of a table whenever the table itself is created.
+
+    Args:
+        table (Table): The table to index.
+        *columns (str): The text columns to index.
+    """
+    for dialect in ("postgresql", "sqlite"):
+        for statement in search_index_statements(dialect, table.name, columns):
+            event.listen(table, "after_create", DDL(statement).execute_if(dialect=dialect))
+
+    drop = DDL(f"DROP TABLE IF EXISTS {search_table_name(table.name)}").execute_if(dialect="sqlite")
+    event.listen(table, "before_drop", drop)
@@ -5,6 +5,7 @@ from app.models.reading import Reading
 
 
 from .base import Base
+from .search import register_search_index
 
 
 class User(Base):
@@ -27,6 +28,9 @@ class User(Base):
     email = Column(String, unique=True, index=True)
     password = Column(String)
     created_at = Column(DateTime, nullable=False, default=func.current_timestamp())
-    updated_at = Column(DateTime, nullable=False, default=func.current_timestamp())
+    updated_at = Column(DateTime, nullable=False, default=func.current_timestamp(), onupdate=func.current_timestamp())
 
     readings = relationship(Reading, back_populates="user")
+
+
+register_search_index(User.__table__, "username", "email")
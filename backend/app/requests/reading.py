@@ -1,6 +1,6 @@
-from typing import Optional
+from typing import List, Optional
 
-from pydantic import BaseModel, field_validator
+from pydantic import BaseModel, Field, field_validator
 
 
 class ReadingCreateRequest(BaseModel):
@@ -102,3 +102,14 @@ class ReadingUpdateRequest(BaseModel):
             raise ValueError("The value field is required")
 
         return value
+
+
+class ReadingBatchCreateRequest(BaseModel):
+    """
+    Data model for ingesting many Readings in a single call.
+
+    Attributes:
+        readings (List[ReadingCreateRequest]): The readings to create, in gateway order.
+    """
+
+    readings: List[ReadingCreateRequest] = Field(..., min_length=1, max_length=10000)
@@ -0,0 +1,77 @@
+import hashlib
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import List, Optional
+
+from fastapi import Request, Response
+
+
+def matches(if_none_match: str, tag: str) -> bool:
+    """
+    Check whether an If-None-Match header lists an entity tag, comparing weakly.
+
+    Args:
+        if_none_match (str): The header value.
+        tag (str): The entity tag.
+
+    Returns:
+        bool: True when the client already holds this representation.
+    """
+    if if_none_match.strip() == "*":
+        return True
+    candidates = {candidate.strip().removeprefix("W/") for candidate in if_none_match.split(",")}
+    return tag.removeprefix("W/") in candidates
+
+
+def entity_tag(id: int, timestamps: List[datetime]) -> str:
+    """
+    Build the entity tag of a single entity from its ID and updated_at.
+
+    Entities embedding others, such as a device with its category and location,
+    pass the updated_at of those too, so that editing them changes the tag.
+
+    Args:
+        id (int): The ID of the entity.
+        timestamps (List[datetime]): The updated_at of the entity and of the entities it embeds.
+
+    Returns:
+        str: The quoted weak tag.
+    """
+    source = ":".join([str(id)] + [timestamp.isoformat() if timestamp else "" for timestamp in timestamps])
+    return f'W/"{hashlib.sha1(source.encode()).hexdigest()}"'
+
+
+def not_modified(request: Request, response: Response, id: int, timestamps: List[datetime]) -> Optional[Response]:
+    """
+    Set the ETag and Last-Modified headers of a single-entity response, and answer
+    conditional requests for a representation the client already holds.
+
+    If-None-Match takes precedence over If-Modified-Since, which compares whole
+    seconds. The timestamps are naive UTC, as stored by the models.
+
+    Args:
+        request (Request): The request.
+        response (Response): The response whose headers are set.
+        id (int): The ID of the entity.
+        timestamps (List[datetime]): The updated_at of the entity and of the entities it embeds.
+
+    Returns:
+        Optional[Response]: A 304 response to return as is, or None to send the entity.
+    """
+    tag = entity_tag(id, timestamps)
+    modified = max(timestamp for timestamp in timestamps if timestamp).replace(microsecond=0, tzinfo=timezone.utc)
+    response.headers["ETag"] = tag
+    response.headers["Last-Modified"] = format_datetime(modified, usegmt=True)
+
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        fresh = matches(if_none_match, tag)
+    else:
+        try:
+            fresh = modified <= parsedate_to_datetime(request.headers.get("if-modified-since", ""))
+        except (TypeError, ValueError):
+            fresh = False
+
+    if not fresh:
+        return None
+    return Response(status_code=304, headers=dict(response.headers))
@@ -1,4 +1,4 @@
-from typing import List, Optional
+from typing import Dict, List, Optional, Union
 from pydantic import BaseModel
 from app.responses.category import CategoryResponse
 
@@ -40,6 +40,46 @@ class SingleDeviceResponse(BaseModel):
     status_code: int
 
 
+class DeviceLatestReading(BaseModel):
+    """
+    Pydantic model representing the most recent reading of a device.
+
+    Attributes:
+        device_id (int): The unique identifier of the device.
+        name (str): The name of the device.
+        category_id (int): The category of the device.
+        location_id (int): The location of the device.
+        reading_id (Optional[int]): The most recent reading, None when the device has none.
+        user_id (Optional[int]): The user of the reading.
+        unit (Optional[str]): The unit of the value.
+        value (Optional[str]): The raw value.
+        value_num (Optional[float]): The value parsed as a number.
+        read_at (Optional[str]): When the reading was created.
+    """
+    device_id: int
+    name: str
+    category_id: Optional[int]
+    location_id: Optional[int]
+    reading_id: Optional[int] = None
+    user_id: Optional[int] = None
+    unit: Optional[str] = None
+    value: Optional[str] = None
+    value_num: Optional[float] = None
+    read_at: Optional[str] = None
+
+
+class DeviceLatestResponse(BaseModel):
+    """
+    Pydantic model representing the most recent reading of each device.
+
+    Attributes:
+        data (List[DeviceLatestReading]): One item per device.
+        status_code (int): The HTTP status code of the response.
+    """
+    data: List[DeviceLatestReading]
+    status_code: int
+
+
 class Pagination(BaseModel):
     """
     Pydantic model representing pagination information.
@@ -48,13 +88,17 @@ class Pagination(BaseModel):
         current_page (int): The current page number.
         items_per_current_page (int): The number of items per page.
         total_items (int): The total number of items.
+        next_cursor (Optional[str]): The cursor of the next page in cursor mode.
+        has_next (Optional[bool]): Whether another page follows this one.
     """
-    current_page: int
-    last_page: int
-    first_item: int
-    last_item: int
+    current_page: Optional[int] = None
+    last_page: Optional[int] = None
+    first_item: Optional[int] = None
+    last_item: Optional[int] = None
     items_per_page: int
-    total: int
+    total: Optional[int] = None
+    next_cursor: Optional[str] = None
+    has_next: Optional[bool] = None
 
 
 class PaginatedDeviceResponse(BaseModel):
@@ -64,10 +108,12 @@ class PaginatedDeviceResponse(BaseModel):
     Attributes:
         users (List[DeviceResponse]): The list of users.
         pagination (Pagination): The pagination information.
+        included (Optional[dict]): The related entities by relationship and ID, in compound mode.
     """
     data: List[DeviceResponse]
     meta: Pagination
     status_code: int
+    included: Optional[Dict[str, Dict[int, Union[CategoryResponse, LocationResponse]]]] = None
 
 
 class DeviceCreateResponse(BaseModel):
@@ -1,4 +1,4 @@
-from typing import List
+from typing import List, Optional
 from pydantic import BaseModel
 
 
@@ -36,13 +36,17 @@ class Pagination(BaseModel):
         current_page (int): The current page number.
         items_per_current_page (int): The number of items per page.
         total_items (int): The total number of items.
+        next_cursor (Optional[str]): The cursor of the next page in cursor mode.
+        has_next (Optional[bool]): Whether another page follows this one.
     """
-    current_page: int
-    last_page: int
-    first_item: int
-    last_item: int
+    current_page: Optional[int] = None
+    last_page: Optional[int] = None
+    first_item: Optional[int] = None
+    last_item: Optional[int] = None
     items_per_page: int
-    total: int
+    total: Optional[int] = None
+    next_cursor: Optional[str] = None
+    has_next: Optional[bool] = None
 
 
 class PaginatedLocationResponse(BaseModel):
@@ -1,4 +1,4 @@
-from typing import List, Optional
+from typing import Dict, List, Optional, Union
 from pydantic import BaseModel
 
 from app.responses.device import DeviceResponse
@@ -43,13 +43,17 @@ class Pagination(BaseModel):
         current_page (int): The current page number.
         items_per_current_page (int): The number of items per page.
         total_items (int): The total number of items.
+        next_cursor (Optional[str]): The cursor of the next page in cursor mode.
+        has_next (Optional[bool]): Whether another page follows this one.
     """
-    current_page: int
-    last_page: int
-    first_item: int
-    last_item: int
+    current_page: Optional[int] = None
+    last_page: Optional[int] = None
+    first_item: Optional[int] = None
+    last_item: Optional[int] = None
     items_per_page: int
-    total: int
+    total: Optional[int] = None
+    next_cursor: Optional[str] = None
+    has_next: Optional[bool] = None
 
 
 class PaginatedReadingResponse(BaseModel):
@@ -59,10 +63,12 @@ class PaginatedReadingResponse(BaseModel):
     Attributes:
         users (List[ReadingResponse]): The list of users.
         pagination (Pagination): The pagination information.
+        included (Optional[dict]): The related entities by relationship and ID, in compound mode.
     """
     data: List[ReadingResponse]
     meta: Pagination
     status_code: int
+    included: Optional[Dict[str, Dict[int, Union[DeviceResponse, UserResponse]]]] = None
 
 
 class ReadingCreateResponse(BaseModel):
@@ -95,3 +101,97 @@ class ReadingUpdateResponse(BaseModel):
     device_id: int
     unit: str
     value: str
+
+
+class ReadingBatchItemResponse(BaseModel):
+    """
+    Pydantic model representing the outcome of one item of a batch ingest.
+
+    Attributes:
+        index (int): The position of the item in the submitted batch.
+        status (str): Either 'created' or 'rejected'.
+        id (Optional[int]): The identifier of the created reading.
+        detail (Optional[str]): The reason the item was rejected.
+    """
+    index: int
+    status: str
+    id: Optional[int] = None
+    detail: Optional[str] = None
+
+
+class ReadingBatchSummary(BaseModel):
+    """
+    Pydantic model representing the totals of a batch ingest.
+
+    Attributes:
+        total (int): The number of submitted items.
+        created (int): The number of items written.
+        rejected (int): The number of items skipped.
+    """
+    total: int
+    created: int
+    rejected: int
+
+
+class ReadingBatchResponse(BaseModel):
+    """
+    Pydantic model representing a response for a batch ingest.
+
+    Attributes:
+        data (List[ReadingBatchItemResponse]): The per-item outcomes.
+        meta (ReadingBatchSummary): The batch totals.
+        status_code (int): The HTTP status code of the response.
+    """
+    data: List[ReadingBatchItemResponse]
+    meta: ReadingBatchSummary
+    status_code: int
+
+
+class ReadingAggregateBucket(BaseModel):
+    """
+    Pydantic model representing one time bucket of aggregated readings.
+
+    Only the requested functions are present in a bucket.
+
+    Attributes:
+        bucket (str): The start of the bucket (UTC).
+        avg (Optional[float]): The average value.
+        min (Optional[float]): The smallest value.
+        max (Optional[float]): The largest value.
+        count (Optional[int]): The number of numeric readings.
+        last (Optional[float]): The most recent value.
+    """
+    bucket: str
+    avg: Optional[float] = None
+    min: Optional[float] = None
+    max: Optional[float] = None
+    count: Optional[int] = None
+    last: Optional[float] = None
+
+
+class ReadingAggregateMeta(BaseModel):
+    """
+    Pydantic model representing the parameters of an aggregation.
+
+    Attributes:
+        device_id (int): The aggregated device.
+        bucket (str): The bucket width.
+        fn (List[str]): The computed functions.
+    """
+    device_id: int
+    bucket: str
+    fn: List[str]
+
+
+class ReadingAggregateResponse(BaseModel):
+    """
+    Pydantic model representing a response for aggregated readings.
+
+    Attributes:
+        data (List[ReadingAggregateBucket]): The buckets, oldest first.
+        meta (ReadingAggregateMeta): The aggregation parameters.
+        status_code (int): The HTTP status code of the response.
+    """
+    data: List[ReadingAggregateBucket]
+    meta: ReadingAggregateMeta
+    status_code: int
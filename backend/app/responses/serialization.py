@@ -0,0 +1,80 @@
+from datetime import datetime
+from typing import Mapping, Type
+
+from fastapi import Response
+from pydantic import BaseModel
+
+
+def format_timestamp(value: datetime) -> str:
+    """
+    Format a timestamp the way the responses show it, e.g. '2026-10-16 12:00:00'.
+
+    Naive timestamps, as stored by the models, take the faster isoformat path,
+    which gives the same text as strftime("%Y-%m-%d %H:%M:%S").
+
+    Args:
+        value (datetime): The timestamp.
+
+    Returns:
+        str: The formatted timestamp.
+    """
+    if value.tzinfo is None:
+        return value.isoformat(sep=" ", timespec="seconds")
+    return value.strftime("%Y-%m-%d %H:%M:%S")
+
+
+def construct(model: Type[BaseModel], content: dict) -> BaseModel:
+    """
+    Build a response model from trusted values without validating them.
+
+    Dicts given for fields typed as a model, such as the pagination meta, are
+    built the same way; list items must be model instances already.
+
+    Args:
+        model (Type[BaseModel]): The response model.
+        content (dict): The field values.
+
+    Returns:
+        BaseModel: The response model instance.
+    """
+    values = {}
+    for name, value in content.items():
+        annotation = model.model_fields[name].annotation
+        if isinstance(value, dict) and isinstance(annotation, type) and issubclass(annotation, BaseModel):
+            value = construct(annotation, value)
+        values[name] = value
+    return model.model_construct(**values)
+
+
+def json_response(
+    model: Type[BaseModel],
+    content: dict,
+    status_code: int = 200,
+    headers: Mapping[str, str] = None,
+    exclude: dict = None,
+) -> Response:
+    """
+    Serialize a response built by the services, skipping FastAPI's second validation pass.
+
+    The services build their response models with model_construct from the ORM
+    rows, so validating the page again against the route's response_model only
+    costs time. The body is serialized by the same pydantic-core serializer
+    FastAPI uses for a response_model, so the bytes on the wire do not change.
+
+    Args:
+        model (Type[BaseModel]): The response model of the route.
+        content (dict): The field values of the response.
+        status_code (int): The HTTP status code.
+        headers (Mapping[str, str]): Extra headers, such as those a route set on its
+            injected Response, which FastAPI does not copy onto a returned response.
+        exclude (dict): Fields left out of the body, in pydantic's exclude format.
+
+    Returns:
+        Response: The JSON response.
+    """
+    return Response(
+        content=construct(model, content).model_dump_json(exclude=exclude),
+        status_code=status_code,
+        headers=dict(headers) if headers else None,
+        media_type="application/json",
+    )
@@ -0,0 +1,82 @@
+from typing import Dict, List, Optional, Sequence, Type
+
+from fastapi import HTTPException
+from pydantic import BaseModel
+
+
+def parse_names(value: Optional[str], allowed: Sequence[str], parameter: str) -> Optional[List[str]]:
+    """
+    Parse a comma-separated list of field or relationship names from a query parameter.
+
+    Args:
+        value (Optional[str]): The parameter value, e.g. 'device,user'.
+        allowed (Sequence[str]): The names the parameter accepts.
+        parameter (str): The name of the parameter, for the error message.
+
+    Returns:
+        Optional[List[str]]: The names in the order of allowed, or None when the
+            parameter is missing. An empty value gives an empty list.
+
+    Raises:
+        HTTPException: If a name is not allowed.
+    """
+    if value is None:
+        return None
+    names = {name.strip() for name in value.split(",") if name.strip()}
+    unknown = sorted(names - set(allowed))
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Invalid {parameter}: {', '.join(unknown)}")
+    return [name for name in allowed if name in names]
+
+
+def sparse(
+    content: dict,
+    model: Type[BaseModel],
+    relationships: Dict[str, str],
+    fields: Optional[List[str]] = None,
+    include: Optional[List[str]] = None,
+    compound: bool = False,
+) -> dict:
+    """
+    Shape a listing for the fields, include and compound query parameters.
+
+    The items of content['data'] are trimmed to the requested fields, the id
+    always being kept, and to the included relationships. In compound mode the
+    included relationships are moved out of the items into content['included'],
+    by relationship and ID, so an entity shared by many items is sent once; the
+    foreign keys linking the items to them are kept. Without any parameter the
+    listing is left as it is.
+
+    Args:
+        content (dict): The field values of the listing response, updated in place.
+        model (Type[BaseModel]): The response model of an item.
+        relationships (Dict[str, str]): The foreign key of each relationship, by name.
+        fields (Optional[List[str]]): The item fields to send, None for all.
+        include (Optional[List[str]]): The relationships to send, None for all.
+        compound (bool): Whether to send the relationships in content['included'].
+
+    Returns:
+        dict: The exclude argument serializing the listing, see json_response.
+    """
+    include = list(relationships) if include is None else include
+    excluded = {name for name in relationships if name not in include}
+
+    if fields is not None:
+        kept = set(fields) | {"id"} | set(relationships)
+        if compound:
+            kept |= {relationships[name] for name in include}
+        excluded |= {name for name in model.model_fields if name not in kept}
+
+    if compound:
+        content["included"] = {name: {} for name in include}
+        for item in content["data"]:
+            for name in include:
+                related = getattr(item, name)
+                if related is not None:
+                    content["included"][name][related.id] = related
+        excluded |= set(include)
+
+    exclude = {"data": {"__all__": excluded}} if excluded else {}
+    if not compound:
+        exclude["included"] = True
+    return exclude
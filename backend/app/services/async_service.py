@@ -0,0 +1,86 @@
+from datetime import datetime
+from typing import Callable, List, Optional, Union
+
+from fastapi import Response
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+
+
+class AsyncService:
+    """
+    Base class for the async variants of the services.
+
+    Every method of service_class is exposed as a coroutine that runs the
+    synchronous implementation without blocking the event loop. On an AsyncSession
+    the method runs through AsyncSession.run_sync, so its queries go through the
+    asyncio driver; on a regular Session it runs on the threadpool. Either way the
+    queries, validation and error handling stay in one place, shared with the
+    Lambda handlers that use the synchronous services directly.
+
+    Methods returning generators, such as the exports, must be called on the
+    synchronous service, since their rows are fetched after the call returns.
+    """
+
+    service_class = None
+
+    def __init__(self, db: Union[AsyncSession, Session]):
+        """
+        Initialize the async service.
+
+        Args:
+            db (Union[AsyncSession, Session]): The database session.
+        """
+        self.db = db
+
+    async def run(self, function: Callable):
+        """
+        Run a function taking the synchronous service without blocking the event loop.
+
+        Args:
+            function (Callable): Called with a synchronous service bound to the session.
+
+        Returns:
+            The result of the function.
+        """
+        db = self.db
+        if isinstance(db, AsyncSession):
+            return await db.run_sync(lambda session: function(self.service_class(session)))
+        return await run_in_threadpool(function, self.service_class(db))
+
+    async def find_unless_fresh(self, id: int, fresh: Callable[[List[datetime]], Optional[Response]]):
+        """
+        Answer a conditional request for a single entity in one threadpool call.
+
+        The timestamps come from modified_at and are passed to fresh, usually
+        not_modified. The entity is only looked up when fresh returns None. Both
+        lookups run in the same call so that a request never holds a pooled
+        connection while it waits for a second thread.
+
+        Args:
+            id (int): The ID of the entity.
+            fresh (Callable[[List[datetime]], Optional[Response]]): Returns a 304 response
+                when the client's copy is current, or None.
+
+        Returns:
+            The 304 response, or the entity response from find.
+        """
+        def lookup(service):
+            cached = fresh(service.modified_at(id))
+            if cached is not None:
+                return cached
+            return service.find(id)
+
+        return await self.run(lookup)
+
+    def __getattr__(self, name: str):
+        method = getattr(self.service_class, name)
+        if not callable(method):
+            raise AttributeError(name)
+
+        async def call(*args, **kwargs):
+            return await self.run(lambda service: method(service, *args, **kwargs))
+
+        call.__name__ = name
+        call.__doc__ = method.__doc__
+        return call
@@ -0,0 +1,512 @@
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional
+
+from sqlalchemy import inspect
+from sqlalchemy.orm import Session, joinedload, make_transient_to_detached
+from sqlalchemy.orm.attributes import set_committed_value
+
+from config.app import get_settings
+
+
+class LRUCache:
+    """
+    Bounded in-process cache evicting the least recently used entry, with a time to live.
+
+    Entries older than ttl seconds are dropped when they are read. The cache is
+    shared by the threads serving requests, so every operation takes a lock.
+
+    Every invalidation moves the cache to a new generation. A reader that loads a
+    row takes the generation first and passes it to set, which skips the store
+    when an invalidation happened during the load, since the row may be stale.
+    """
+
+    def __init__(self, max_size: int, ttl: float, clock: Callable[[], float] = time.monotonic):
+        """
+        Initialize the LRUCache class.
+
+        Args:
+            max_size (int): The number of entries kept, 0 to disable the cache.
+            ttl (float): Seconds an entry stays valid.
+            clock (Callable[[], float]): Monotonic time source, for tests.
+        """
+        self.max_size = max_size
+        self.ttl = ttl
+        self.clock = clock
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key) -> Optional[Any]:
+        """
+        Get an entry and mark it as recently used.
+
+        Args:
+            key: The key of the entry.
+
+        Returns:
+            Optional[Any]: The value, or None when it is missing or expired.
+        """
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None and entry[0] <= self.clock():
+                del self.entries[key]
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key, value, generation: Optional[int] = None):
+        """
+        Store an entry, evicting the least recently used one when the cache is full.
+
+        Args:
+            key: The key of the entry.
+            value: The value, which must not be None.
+            generation (Optional[int]): The generation taken before the value was loaded;
+                the value is not stored when the cache moved on since.
+        """
+        if self.max_size <= 0:
+            return
+        with self.lock:
+            if generation is not None and generation != self.generation:
+                return
+            self.entries[key] = (self.clock() + self.ttl, value)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, key):
+        """
+        Drop an entry.
+
+        Args:
+            key: The key of the entry.
+        """
+        with self.lock:
+            self.entries.pop(key, None)
+            self.generation += 1
+
+    def clear(self):
+        """
+        Drop every entry and reset the counters.
+        """
+        with self.lock:
+            self.entries.clear()
+            self.generation += 1
+            self.hits = self.misses = self.evictions = 0
+
+    def stats(self) -> dict:
+        """
+        Describe the cache usage.
+
+        Returns:
+            dict: The hits, misses, hit ratio, evictions, size, max_size and ttl.
+        """
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 3) if lookups else None,
+                "evictions": self.evictions,
+                "size": len(self.entries),
+                "max_size": self.max_size,
+                "ttl": self.ttl,
+            }
+
+
+reference_caches: Dict[str, LRUCache] = {}
+
+
+def reference_cache(model) -> LRUCache:
+    """
+    Get the cache of a reference model, keyed by primary key.
+
+    Args:
+        model: The model class, e.g. Device, Category or Location.
+
+    Returns:
+        LRUCache: The cache of the model's table, sized by CACHE_MAX_SIZE and CACHE_TTL.
+    """
+    name = model.__tablename__
+    if name not in reference_caches:
+        settings = get_settings()
+        reference_caches.setdefault(name, LRUCache(settings.CACHE_MAX_SIZE, settings.CACHE_TTL))
+    return reference_caches[name]
+
+
+def snapshot(instance) -> dict:
+    """
+    Copy the column values of an object, which is what the reference caches hold.
+
+    Args:
+        instance: The object.
+
+    Returns:
+        dict: The values by attribute name.
+    """
+    return {column.key: getattr(instance, column.key) for column in inspect(type(instance)).column_attrs}
+
+
+def cached_get(db: Session, model, id: Optional[int], *relationships: str):
+    """
+    Get a row by primary key through the cache of its model.
+
+    The cache holds the column values only. On a hit they are attached to the
+    session as a persistent object without a query. The named many-to-one
+    relationships are attached the same way from their own caches and set as
+    loaded, so reading them does not query either. On a miss the row is loaded
+    with its relationships joined, and all of them are cached, unless one of
+    the caches was invalidated during the load.
+
+    Args:
+        db (Session): The database session.
+        model: The model class.
+        id (Optional[int]): The primary key.
+        *relationships (str): Many-to-one relationships to load along.
+
+    Returns:
+        The object, or None when no row has this primary key.
+    """
+    if id is None:
+        return None
+
+    values = reference_cache(model).get(id)
+    if values is None:
+        models = [model] + [inspect(model).relationships[name].mapper.class_ for name in relationships]
+        generations = {related: reference_cache(related).generation for related in models}
+        options = [joinedload(getattr(model, name)) for name in relationships]
+        instance = db.query(model).options(*options).filter(model.id == id).first()
+        for item in [instance] + [getattr(instance, name) for name in relationships if instance is not None]:
+            if item is not None:
+                reference_cache(type(item)).set(item.id, snapshot(item), generations[type(item)])
+        return instance
+
+    instance = model(**values)
+    make_transient_to_detached(instance)
+    instance = db.merge(instance, load=False)
+    for name in relationships:
+        relationship = inspect(model).relationships[name]
+        (column,) = relationship.local_columns
+        set_committed_value(instance, name, cached_get(db, relationship.mapper.class_, values[column.key]))
+    return instance
+
+
+def invalidate(model, id: int):
+    """
+    Drop a row from the cache of its model, after it was saved, updated or deleted.
+
+    Other processes keep their copy until it expires after CACHE_TTL seconds.
+
+    Args:
+        model: The model class.
+        id (int): The primary key.
+    """
+    reference_cache(model).invalidate(id)
+
+
+def cache_stats() -> dict:
+    """
+    Describe the usage of every reference cache.
+
+    Returns:
+        dict: The stats of each cache, by table name.
+    """
+    return {name: cache.stats() for name, cache in reference_caches.items()}
+
+
+def import_redis():
+    """
+    Import the redis client, which is only needed for the shared response cache.
+
+    Returns:
+        module: The redis module, or None when it is not installed.
+    """
+    try:
+        import redis
+    except ImportError:
+        return None
+    return redis
+
+
+class MemoryBackend:
+    """
+    Response cache backend keeping the entries and versions in this process.
+
+    Writes bump the versions of this process only, so with more than one process
+    (or Lambda container) the others serve their entries until they expire.
+    """
+
+    def __init__(self, max_size: int, clock: Callable[[], float] = time.monotonic):
+        """
+        Initialize the MemoryBackend class.
+
+        Args:
+            max_size (int): The number of entries kept.
+            clock (Callable[[], float]): Monotonic time source, for tests.
+        """
+        self.entries = OrderedDict()
+        self.max_size = max_size
+        self.clock = clock
+        self.versions = {}
+        self.lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[bytes]:
+        """
+        Get a cached response body.
+
+        Args:
+            key (str): The key of the response.
+
+        Returns:
+            Optional[bytes]: The body, or None when it is missing or expired.
+        """
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None or entry[0] <= self.clock():
+                self.entries.pop(key, None)
+                return None
+            self.entries.move_to_end(key)
+            return entry[1]
+
+    def set(self, key: str, value: bytes, ttl: float):
+        """
+        Store a response body.
+
+        Args:
+            key (str): The key of the response.
+            value (bytes): The body.
+            ttl (float): Seconds the body stays valid.
+        """
+        if self.max_size <= 0:
+            return
+        with self.lock:
+            self.entries[key] = (self.clock() + ttl, value)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+
+    def version(self, namespace: str) -> Optional[int]:
+        """
+        Get the current version of a listing, which is part of the keys of its responses.
+
+        Args:
+            namespace (str): The listing, e.g. 'devices'.
+
+        Returns:
+            Optional[int]: The version, or None when it cannot be read and the cache is bypassed.
+        """
+        with self.lock:
+            return self.versions.get(namespace, 0)
+
+    def bump(self, namespace: str) -> int:
+        """
+        Move a listing to a new version, so that its cached responses are no longer used.
+
+        Args:
+            namespace (str): The listing, e.g. 'devices'.
+
+        Returns:
+            int: The new version.
+        """
+        with self.lock:
+            self.versions[namespace] = self.versions.get(namespace, 0) + 1
+            return self.versions[namespace]
+
+    def clear(self):
+        """
+        Drop every entry and version.
+        """
+        with self.lock:
+            self.entries.clear()
+            self.versions.clear()
+
+
+class RedisBackend:
+    """
+    Response cache backend shared by every process through a Redis-protocol server.
+
+    The client only needs get, set with ex and incr, as provided by redis-py. A
+    failing server never fails a request: lookups miss and stores are skipped.
+
+    A version bump that keeps failing leaves its listing pending. This process then
+    bypasses the cached responses of the listing, and bumps it again before each
+    lookup until the server takes it, so that other processes stop serving the
+    responses of the old version.
+    """
+
+    def __init__(self, client, prefix: str = "agnes:cache:", attempts: int = 3, delay: float = 0.05):
+        """
+        Initialize the RedisBackend class.
+
+        Args:
+            client: The redis client.
+            prefix (str): Prefix of every key, to share a server with other applications.
+            attempts (int): How many times a version bump is tried.
+            delay (float): Seconds before the first retry of a bump, doubled for each next one.
+        """
+        self.client = client
+        self.prefix = prefix
+        self.attempts = attempts
+        self.delay = delay
+        self.pending = set()
+        self.lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[bytes]:
+        """
+        Get a cached response body.
+
+        Args:
+            key (str): The key of the response.
+
+        Returns:
+            Optional[bytes]: The body, or None when it is missing or expired.
+        """
+        try:
+            return self.client.get(self.prefix + key)
+        except Exception as e:
+            logging.warning(f"Response cache lookup failed: {str(e)}")
+            return None
+
+    def set(self, key: str, value: bytes, ttl: float):
+        """
+        Store a response body.
+
+        Args:
+            key (str): The key of the response.
+            value (bytes): The body.
+            ttl (float): Seconds the body stays valid.
+        """
+        try:
+            self.client.set(self.prefix + key, value, ex=max(int(ttl), 1))
+        except Exception as e:
+            logging.warning(f"Response cache store failed: {str(e)}")
+
+    def version(self, namespace: str) -> Optional[int]:
+        """
+        Get the current version of a listing, which is part of the keys of its responses.
+
+        Args:
+            namespace (str): The listing, e.g. 'devices'.
+
+        Returns:
+            Optional[int]: The version, or None when it cannot be read and the cache is bypassed.
+        """
+        if namespace in self.pending and self.incr(namespace) is None:
+            return None
+        try:
+            return int(self.client.get(f"{self.prefix}version:{namespace}") or 0)
+        except Exception as e:
+            logging.warning(f"Response cache version lookup failed: {str(e)}")
+            return None
+
+    def bump(self, namespace: str) -> Optional[int]:
+        """
+        Move a listing to a new version, so that its cached responses are no longer used.
+
+        The bump is retried with a growing delay. When every attempt fails the
+        listing is left pending.
+
+        Args:
+            namespace (str): The listing, e.g. 'devices'.
+
+        Returns:
+            Optional[int]: The new version, or None when the server did not take the bump.
+        """
+        for attempt in range(self.attempts):
+            if attempt:
+                time.sleep(self.delay * 2 ** (attempt - 1))
+            version = self.incr(namespace)
+            if version is not None:
+                return version
+        return None
+
+    def incr(self, namespace: str) -> Optional[int]:
+        """
+        Try once to move a listing to a new version, keeping track of pending listings.
+
+        Args:
+            namespace (str): The listing, e.g. 'devices'.
+
+        Returns:
+            Optional[int]: The new version, or None when the server did not take the bump.
+        """
+        try:
+            version = self.client.incr(f"{self.prefix}version:{namespace}")
+        except Exception as e:
+            logging.warning(f"Response cache invalidation of {namespace} failed: {str(e)}")
+            with self.lock:
+                self.pending.add(namespace)
+            return None
+        with self.lock:
+            self.pending.discard(namespace)
+        return version
+
+    def clear(self):
+        """
+        Drop every entry and version; entries on the server expire by themselves.
+        """
+        pass
+
+
+response_backends: Dict[str, Any] = {}
+
+
+def response_cache():
+    """
+    Get the response cache backend chosen by CACHE_BACKEND.
+
+    'memory' keeps the responses in this process, 'redis' shares them through the
+    server at CACHE_URL, and 'none' disables the response cache.
+
+    Returns:
+        The backend, or None when the response cache is disabled.
+    """
+    if "default" not in response_backends:
+        settings = get_settings()
+        backend = None
+        if settings.CACHE_BACKEND == "memory":
+            backend = MemoryBackend(settings.CACHE_MAX_SIZE)
+        elif settings.CACHE_BACKEND == "redis":
+            redis = import_redis()
+            if redis is None:
+                logging.error("CACHE_BACKEND is redis but the redis package is not installed; using memory")
+                backend = MemoryBackend(settings.CACHE_MAX_SIZE)
+            else:
+                backend = RedisBackend(redis.Redis.from_url(settings.CACHE_URL))
+        response_backends["default"] = backend
+    return response_backends["default"]
+
+
+def invalidate_listings(*namespaces: str) -> List[str]:
+    """
+    Bump the versions of cached listings after a write committed, so that they miss.
+
+    The write stands when a bump fails. The failure is logged as an error and the
+    listing is bumped again later by the backend, but until then other processes
+    may serve its old responses for up to CACHE_LISTING_TTL seconds.
+
+    Args:
+        *namespaces (str): The listings whose responses changed, e.g. 'devices'.
+
+    Returns:
+        List[str]: The listings whose version could not be bumped.
+    """
+    backend = response_cache()
+    if backend is None:
+        return []
+
+    failed = [namespace for namespace in namespaces if backend.bump(namespace) is None]
+    if failed:
+        logging.error(f"Response cache invalidation failed for {', '.join(failed)}; stale listings may be served")
+    return failed
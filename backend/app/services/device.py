@@ -1,15 +1,25 @@
 import logging
-from typing import List, Tuple
+from datetime import datetime
+from typing import List, Optional, Tuple
 
 from fastapi import HTTPException
 from sqlalchemy.exc import DatabaseError
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, joinedload
 
 from app.models.device import Device
+from app.models.device_last_reading import DeviceLastReading
 from app.requests.device import DeviceCreateRequest, DeviceUpdateRequest
 from app.responses.category import CategoryResponse
-from app.responses.device import DeviceCreateResponse, DeviceResponse, DeviceUpdateResponse
+from app.responses.device import DeviceCreateResponse, DeviceLatestReading, DeviceResponse, DeviceUpdateResponse
 from app.responses.location import LocationResponse
+from app.responses.serialization import format_timestamp
+from app.services.async_service import AsyncService
+from app.services.cache import cached_get, invalidate, invalidate_listings
+from app.services.pagination import paginate_by_cursor, paginate_by_offset
+from app.services.replica import read_only
+from app.services.search import search
+
+DEVICE_RELATIONSHIPS = {"category": "category_id", "location": "location_id"}
 
 
 class DeviceService:
@@ -26,12 +36,15 @@ class DeviceService:
         """
         self.db = db
 
-    def get_by_id(self, id: int) -> Device:
+    def get_by_id(self, id: int, *options, cached: bool = False) -> Device:
         """
         Retrieve a device by their ID.
 
         Args:
             id (int): The ID of the device.
+            *options: Loader options applied to the query, which bypasses the cache.
+            cached (bool): Whether to read through the reference caches, for read-only use;
+                the category and location are then attached along.
 
         Returns:
             Device: The device object.
@@ -39,12 +52,20 @@ class DeviceService:
         Raises:
             HTTPException: If the device is not found.
         """
-        device = self.db.query(Device).filter(Device.id == id).first()
+        if cached and not options:
+            device = cached_get(self.db, Device, id, "category", "location")
+        else:
+            device = self.db.query(Device).options(*options).filter(Device.id == id).first()
         if not device:
             raise HTTPException(status_code=404, detail="Device not found")
         return device
 
-    def all(self, page: int, items_per_page: int, sort_type: str = 'asc', sort_by: str = 'id', start_date: str = None, end_date: str = None, name: str = None, description: str = None) -> Tuple[List[DeviceResponse], int, int, int, int]:
+    @read_only
+    def all(
+        self, page: int, items_per_page: int, sort_type: str = 'asc', sort_by: str = 'id',
+        start_date: str = None, end_date: str = None, name: str = None, description: str = None,
+        with_total: str = 'exact', q: str = None, include: Optional[List[str]] = None
+    ) -> Tuple[List[DeviceResponse], Optional[int], int, int, int]:
         """
         Retrieve all devices with pagination and optional date, name, and second field filters.
 
@@ -57,61 +78,79 @@ class DeviceService:
             end_date (str): The end date for the filter (YYYY-MM-DD).
             name (str): The first field filter.
             description (str): The second field filter.
+            with_total (str): How to compute the total ('exact', 'estimate' or 'none').
+            q (str): Search text matched against the name and description; ranks page results by relevance.
+            include (Optional[List[str]]): The relationships to load, see DEVICE_RELATIONSHIPS; None for all.
 
         Returns:
-            Tuple[List[DeviceResponse], int, int, int, int]: A tuple containing the list of device responses, the total number of devices, the last page number, the first item number, and the last item number.
+            Tuple[List[DeviceResponse], Optional[int], int, int, int]: A tuple containing the list of device responses,
+                the total number of devices, the last page number, the first item number, and the last item number.
 
         Raises:
             HTTPException: If there is an internal server error.
         """
         try:
-            offset = (page - 1) * items_per_page
-
             sort_field = self.get_sort_field(sort_by)
 
-            query = self.build_query(sort_field, sort_type, start_date, end_date, name, description)
+            query = self.build_query(sort_field, sort_type, start_date, end_date, name, description, q)
 
-            devices = query.offset(offset).limit(items_per_page).all()
+            devices, total_devices, last_page, first_item, last_item = paginate_by_offset(
+                query, page, items_per_page, with_total, options=self.load_options(include)
+            )
 
-            responses = [DeviceResponse(
-                id=device.id,
-                name=device.name,
-                description=device.description,
-                category_id=device.category_id,
-                location_id=device.location_id,
-                topic=device.topic,
-                channel=device.channel,
-                type=device.type,
-                visualization=device.visualization,
-                message_type=device.message_type,
-                category=CategoryResponse(
-                    id=device.category.id,
-                    name=device.category.name,
-                    description=device.category.description,
-                    created_at=device.category.created_at.strftime("%Y-%m-%d %H:%M:%S"),
-                    updated_at=device.category.updated_at.strftime("%Y-%m-%d %H:%M:%S"),
-                ),
-                location=LocationResponse(
-                    id=device.location.id,
-                    name=device.location.name,
-                    description=device.location.description,
-                    created_at=device.location.created_at.strftime("%Y-%m-%d %H:%M:%S"),
-                    updated_at=device.location.updated_at.strftime("%Y-%m-%d %H:%M:%S"),
-                ),
-                created_at=device.created_at.strftime("%Y-%m-%d %H:%M:%S"),
-                updated_at=device.updated_at.strftime("%Y-%m-%d %H:%M:%S"),
-            ) for device in devices]
-
-            total_devices = query.count()
-            last_page = (total_devices - 1) // items_per_page + 1
-            first_item = offset + 1
-            last_item = min(offset + items_per_page, total_devices)
+            responses = [self.to_response(device, include) for device in devices]
 
             return responses, total_devices, last_page, first_item, last_item
 
         except DatabaseError:
             raise HTTPException(status_code=500, detail="Internal server error")
 
+    @read_only
+    def all_by_cursor(
+        self, items_per_page: int, cursor: str = None, sort_type: str = 'asc', sort_by: str = 'id',
+        start_date: str = None, end_date: str = None, name: str = None, description: str = None,
+        q: str = None, include: Optional[List[str]] = None
+    ) -> Tuple[List[DeviceResponse], Optional[str]]:
+        """
+        Retrieve one keyset page of devices with the same filters as all().
+
+        Args:
+            items_per_page (int): The number of items per page.
+            cursor (str): The cursor returned with the previous page, empty for the first page.
+            sort_type (str): The sort type ('asc' or 'desc').
+            sort_by (str): The field to sort by.
+            start_date (str): The start date for the filter (YYYY-MM-DD).
+            end_date (str): The end date for the filter (YYYY-MM-DD).
+            name (str): The first field filter.
+            description (str): The second field filter.
+            q (str): Search text matched against the name and description.
+            include (Optional[List[str]]): The relationships to load, see DEVICE_RELATIONSHIPS; None for all.
+
+        Returns:
+            Tuple[List[DeviceResponse], Optional[str]]: A tuple containing the list of device responses and the cursor
+                of the next page.
+
+        Raises:
+            HTTPException: If q is given, the cursor is invalid or there is an internal server error.
+        """
+        if q:
+            # Keyset pages are ordered by the sort field, which would drop the relevance ranking.
+            raise HTTPException(status_code=400, detail="q cannot be combined with cursor pagination")
+
+        try:
+            sort_field = self.get_sort_field(sort_by)
+
+            query = self.build_query(sort_field, sort_type, start_date, end_date, name, description, q)
+
+            devices, next_cursor = paginate_by_cursor(
+                query.options(*self.load_options(include)), sort_field, Device.id, sort_type, cursor, items_per_page
+            )
+
+            return [self.to_response(device, include) for device in devices], next_cursor
+
+        except DatabaseError:
+            raise HTTPException(status_code=500, detail="Internal server error")
+
     def get_sort_field(self, sort_by: str):
         """
         Returns the corresponding sort field based on the given sort_by parameter.
@@ -134,7 +173,7 @@ class DeviceService:
         else:
             raise HTTPException(status_code=400, detail="Invalid sort_by field")
 
-    def build_query(self, sort_field, sort_type, start_date, end_date, name, description):
+    def build_query(self, sort_field, sort_type, start_date, end_date, name, description, q=None):
         """
         Builds a query to retrieve devices based on the provided parameters.
 
@@ -145,12 +184,16 @@ class DeviceService:
             end_date (str): The end date for filtering devices.
             name (str): The first field to filter devices by.
             description (str): The description to filter devices by.
+            q (str): Search text; matching rows are ranked first by relevance.
 
         Returns:
             sqlalchemy.orm.query.Query: The query object for retrieving devices.
         """
         query = self.db.query(Device)
 
+        if q:
+            query = search(query, Device, (Device.name, Device.description), q)
+
         if sort_type == 'asc':
             query = query.order_by(sort_field.asc())
         elif sort_type == 'desc':
@@ -172,6 +215,7 @@ class DeviceService:
 
         return query
 
+    @read_only
     def total(self) -> int:
         """
         Get the total number of devices.
@@ -181,6 +225,7 @@ class DeviceService:
         """
         return self.db.query(Device).count()
 
+    @read_only
     def find(self, id: int) -> DeviceResponse:
         """
         Find a device by their ID and return the device response.
@@ -194,8 +239,101 @@ class DeviceService:
         Raises:
             HTTPException: If the device is not found.
         """
-        device = self.get_by_id(id)
-        return DeviceResponse(
+        device = self.get_by_id(id, cached=True)
+        return self.to_response(device)
+
+    @read_only
+    def modified_at(self, id: int) -> List[datetime]:
+        """
+        Get when a device, its category and its location were last updated, for
+        conditional requests.
+
+        Args:
+            id (int): The ID of the device.
+
+        Returns:
+            List[datetime]: The updated_at of the device, its category and its location.
+
+        Raises:
+            HTTPException: If the device is not found.
+        """
+        device = self.get_by_id(id, cached=True)
+        return [device.updated_at] + [
+            related.updated_at for related in (device.category, device.location) if related is not None
+        ]
+
+    @read_only
+    def latest(self, location_id: int = None, category_id: int = None) -> List[DeviceLatestReading]:
+        """
+        Get the most recent reading of every device, optionally of one location or category.
+
+        The readings come from the last-reading table, so the whole overview is one
+        indexed join instead of a scan of the readings table.
+
+        Args:
+            location_id (int): Only the devices of this location.
+            category_id (int): Only the devices of this category.
+
+        Returns:
+            List[DeviceLatestReading]: One item per device, ordered by device ID; the
+            reading fields are None for devices without readings.
+        """
+        query = (
+            self.db.query(Device, DeviceLastReading)
+            .outerjoin(DeviceLastReading, DeviceLastReading.device_id == Device.id)
+        )
+        if location_id is not None:
+            query = query.filter(Device.location_id == location_id)
+        if category_id is not None:
+            query = query.filter(Device.category_id == category_id)
+
+        return [
+            DeviceLatestReading.model_construct(
+                device_id=device.id,
+                name=device.name,
+                category_id=device.category_id,
+                location_id=device.location_id,
+                reading_id=last.reading_id if last else None,
+                user_id=last.user_id if last else None,
+                unit=last.unit if last else None,
+                value=last.value if last else None,
+                value_num=last.value_num if last else None,
+                read_at=format_timestamp(last.read_at) if last else None,
+            )
+            for device, last in query.order_by(Device.id)
+        ]
+
+    def load_options(self, include: Optional[List[str]] = None) -> list:
+        """
+        Eager loading options for the relationships read by to_response.
+
+        Loading the category and location with joins keeps a page at a fixed
+        number of statements instead of one lazy SELECT per relationship and row.
+
+        Args:
+            include (Optional[List[str]]): The relationships to load, None for all.
+
+        Returns:
+            list: The loader options for a device query.
+        """
+        options = {"category": joinedload(Device.category), "location": joinedload(Device.location)}
+        return [option for name, option in options.items() if include is None or name in include]
+
+    def to_response(self, device: Device, include: Optional[List[str]] = None) -> DeviceResponse:
+        """
+        Build the device response, with its category and location, for a device,
+        without validation since the values come from the database; see json_response.
+
+        Args:
+            device (Device): The device object.
+            include (Optional[List[str]]): The relationships to build, None for all;
+                the others are left None and not read, so they are never loaded.
+
+        Returns:
+            DeviceResponse: The device response.
+        """
+        include = DEVICE_RELATIONSHIPS if include is None else include
+        return DeviceResponse.model_construct(
             id=device.id,
             name=device.name,
             description=device.description,
@@ -206,22 +344,16 @@ class DeviceService:
             type=device.type,
             visualization=device.visualization,
             message_type=device.message_type,
-            category=CategoryResponse(
+            category=CategoryResponse.model_construct(
                 id=device.category.id,
                 name=device.category.name,
                 description=device.category.description,
-                created_at=device.category.created_at.strftime("%Y-%m-%d %H:%M:%S"),
-                updated_at=device.category.updated_at.strftime("%Y-%m-%d %H:%M:%S"),
-            ),
-            location=LocationResponse(
+            ) if "category" in include else None,
+            location=LocationResponse.model_construct(
                 id=device.location.id,
                 name=device.location.name,
                 description=device.location.description,
-                created_at=device.location.created_at.strftime("%Y-%m-%d %H:%M:%S"),
-                updated_at=device.location.updated_at.strftime("%Y-%m-%d %H:%M:%S"),
-            ),
-            created_at=device.created_at.strftime("%Y-%m-%d %H:%M:%S"),
-            updated_at=device.updated_at.strftime("%Y-%m-%d %H:%M:%S"),
+            ) if "location" in include else None,
         )
 
     def save(self, device: DeviceCreateRequest) -> DeviceCreateResponse:
@@ -247,6 +379,8 @@ class DeviceService:
             item = Device(**data)
             self.db.add(item)
             self.db.commit()
+            invalidate(Device, item.id)
+            invalidate_listings("devices")
             self.db.refresh(item)
 
             item = self.db.query(Device).filter(Device.id == item.id).first()
@@ -288,6 +422,8 @@ class DeviceService:
             for key, value in data.items():
                 setattr(item, key, value)
             self.db.commit()
+            invalidate(Device, id)
+            invalidate_listings("devices")
             self.db.refresh(item)
             response_data = {
                 "id": item.id,
@@ -325,6 +461,8 @@ class DeviceService:
             item = self.get_by_id(id)
             self.db.delete(item)
             self.db.commit()
+            invalidate(Device, id)
+            invalidate_listings("devices")
             response_data = {
                 "id": item.id,
                 "name": item.name,
@@ -343,3 +481,11 @@ class DeviceService:
         except DatabaseError as e:
             logging.error(f"Error occurred while deleting device: {str(e)}")
             raise HTTPException(status_code=500, detail="Internal server error")
+
+
+class AsyncDeviceService(AsyncService):
+    """
+    Async variant of DeviceService, awaited by the routes.
+    """
+
+    service_class = DeviceService
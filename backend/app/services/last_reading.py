@@ -0,0 +1,136 @@
+from typing import Iterable, List
+
+from sqlalchemy import and_, func, or_
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+
+from app.models.device_last_reading import DeviceLastReading
+from app.models.partition import recent_first
+from app.models.reading import Reading
+
+LAST_READING_COLUMNS = ("reading_id", "user_id", "unit", "value", "value_num", "read_at")
+
+
+def newest_per_device(rows: Iterable[dict]) -> List[dict]:
+    """
+    Keep the most recent row of every device.
+
+    Args:
+        rows (Iterable[dict]): Rows with the DeviceLastReading columns.
+
+    Returns:
+        List[dict]: One row per device, ordered by device ID.
+    """
+    latest = {}
+    for row in rows:
+        current = latest.get(row["device_id"])
+        if row["device_id"] is not None and (
+            current is None or (row["read_at"], row["reading_id"]) > (current["read_at"], current["reading_id"])
+        ):
+            latest[row["device_id"]] = row
+    return [latest[device_id] for device_id in sorted(latest)]
+
+
+def upsert_last_readings(db: Session, rows: Iterable[dict]):
+    """
+    Record new readings as the last reading of their devices, unless a newer one is recorded.
+
+    On PostgreSQL and SQLite this is a single INSERT ... ON CONFLICT DO UPDATE
+    guarded by the reading time, so concurrent writers cannot move a device back
+    to an older reading. Other databases read and update the rows in the session.
+    The caller commits.
+
+    Args:
+        db (Session): The database session.
+        rows (Iterable[dict]): Rows with the device_id and the DeviceLastReading columns.
+    """
+    rows = newest_per_device(rows)
+    if not rows:
+        return
+
+    table = DeviceLastReading.__table__
+    dialect = db.get_bind().dialect.name
+
+    if dialect in ("postgresql", "sqlite"):
+        insert = postgresql_insert if dialect == "postgresql" else sqlite_insert
+        statement = insert(table).values(rows)
+        excluded = statement.excluded
+        newer = or_(
+            excluded.read_at > table.c.read_at,
+            and_(excluded.read_at == table.c.read_at, excluded.reading_id > table.c.reading_id),
+        )
+        db.execute(statement.on_conflict_do_update(
+            index_elements=[table.c.device_id],
+            set_={
+                **{column: excluded[column] for column in LAST_READING_COLUMNS},
+                "updated_at": func.current_timestamp(),
+            },
+            where=newer,
+        ))
+        return
+
+    existing = {
+        last.device_id: last
+        for last in db.query(DeviceLastReading)
+        .filter(DeviceLastReading.device_id.in_([row["device_id"] for row in rows]))
+        .with_for_update()
+    }
+    for row in rows:
+        last = existing.get(row["device_id"])
+        if last is None:
+            db.add(DeviceLastReading(**row))
+        elif (row["read_at"], row["reading_id"]) > (last.read_at, last.reading_id):
+            for column in LAST_READING_COLUMNS:
+                setattr(last, column, row[column])
+
+
+def last_reading_row(reading: Reading) -> dict:
+    """
+    Build the DeviceLastReading row of a reading.
+
+    Args:
+        reading (Reading): The reading, flushed so that it has an ID and created_at.
+
+    Returns:
+        dict: The row.
+    """
+    return {
+        "device_id": reading.device_id,
+        "reading_id": reading.id,
+        "user_id": reading.user_id,
+        "unit": reading.unit,
+        "value": reading.value,
+        "value_num": reading.value_num,
+        "read_at": reading.created_at,
+    }
+
+
+def refresh_last_readings(db: Session, device_ids: Iterable[int]):
+    """
+    Recompute the last reading of devices after their readings were changed or deleted.
+
+    Each device costs one lookup on the (device_id, created_at) index, over the
+    recent partitions first on PostgreSQL. The caller flushes the changes first and
+    commits afterwards.
+
+    Args:
+        db (Session): The database session.
+        device_ids (Iterable[int]): The devices to recompute.
+    """
+    for device_id in {device_id for device_id in device_ids if device_id is not None}:
+        reading = recent_first(
+            db.query(Reading)
+            .filter(Reading.device_id == device_id)
+            .order_by(Reading.created_at.desc(), Reading.id.desc()),
+            Reading.created_at,
+        )
+        last = db.get(DeviceLastReading, device_id)
+        if reading is None:
+            if last is not None:
+                db.delete(last)
+        elif last is None:
+            db.add(DeviceLastReading(**last_reading_row(reading)))
+        else:
+            for column, value in last_reading_row(reading).items():
+                setattr(last, column, value)
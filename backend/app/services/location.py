@@ -1,5 +1,6 @@
 import logging
-from typing import List, Tuple
+from datetime import datetime
+from typing import List, Optional, Tuple
 
 from fastapi import HTTPException
 from sqlalchemy.exc import DatabaseError
@@ -8,6 +9,11 @@ from sqlalchemy.orm import Session
 from app.models.location import Location
 from app.requests.location import LocationCreateRequest, LocationUpdateRequest
 from app.responses.location import LocationCreateResponse, LocationResponse, LocationUpdateResponse
+from app.services.async_service import AsyncService
+from app.services.cache import cached_get, invalidate, invalidate_listings
+from app.services.pagination import paginate_by_cursor, paginate_by_offset
+from app.services.replica import read_only
+from app.services.search import search
 
 
 class LocationService:
@@ -24,12 +30,13 @@ class LocationService:
         """
         self.db = db
 
-    def get_by_id(self, id: int) -> Location:
+    def get_by_id(self, id: int, cached: bool = False) -> Location:
         """
         Retrieve a location by their ID.
 
         Args:
             id (int): The ID of the location.
+            cached (bool): Whether to read through the reference cache, for read-only use.
 
         Returns:
             Location: The location object.
@@ -37,12 +44,20 @@ class LocationService:
         Raises:
             HTTPException: If the location is not found.
         """
-        location = self.db.query(Location).filter(Location.id == id).first()
+        if cached:
+            location = cached_get(self.db, Location, id)
+        else:
+            location = self.db.query(Location).filter(Location.id == id).first()
         if not location:
             raise HTTPException(status_code=404, detail="Location not found")
         return location
 
-    def all(self, page: int, items_per_page: int, sort_type: str = 'asc', sort_by: str = 'id', start_date: str = None, end_date: str = None, name: str = None, description: str = None) -> Tuple[List[LocationResponse], int, int, int, int]:
+    @read_only
+    def all(
+        self, page: int, items_per_page: int, sort_type: str = 'asc', sort_by: str = 'id',
+        start_date: str = None, end_date: str = None, name: str = None, description: str = None,
+        with_total: str = 'exact', q: str = None
+    ) -> Tuple[List[LocationResponse], Optional[int], int, int, int]:
         """
         Retrieve all locations with pagination and optional date, name, and second field filters.
 
@@ -55,40 +70,78 @@ class LocationService:
             end_date (str): The end date for the filter (YYYY-MM-DD).
             name (str): The first field filter.
             description (str): The second field filter.
+            with_total (str): How to compute the total ('exact', 'estimate' or 'none').
+            q (str): Search text matched against the name and description; ranks page results by relevance.
 
         Returns:
-            Tuple[List[LocationResponse], int, int, int, int]: A tuple containing the list of location responses, the total number of locations, the last page number, the first item number, and the last item number.
+            Tuple[List[LocationResponse], Optional[int], int, int, int]: A tuple containing the list of location
+                responses, the total number of locations, the last page number, the first item number, and the last item
+                number.
 
         Raises:
             HTTPException: If there is an internal server error.
         """
         try:
-            offset = (page - 1) * items_per_page
-
             sort_field = self.get_sort_field(sort_by)
 
-            query = self.build_query(sort_field, sort_type, start_date, end_date, name, description)
+            query = self.build_query(sort_field, sort_type, start_date, end_date, name, description, q)
 
-            locations = query.offset(offset).limit(items_per_page).all()
+            locations, total_locations, last_page, first_item, last_item = paginate_by_offset(
+                query, page, items_per_page, with_total
+            )
 
-            responses = [LocationResponse(
-                id=location.id,
-                name=location.name,
-                description=location.description,
-                created_at=location.created_at.strftime("%Y-%m-%d %H:%M:%S"),
-                updated_at=location.updated_at.strftime("%Y-%m-%d %H:%M:%S"),
-            ) for location in locations]
-
-            total_locations = query.count()
-            last_page = (total_locations - 1) // items_per_page + 1
-            first_item = offset + 1
-            last_item = min(offset + items_per_page, total_locations)
+            responses = [self.to_response(location) for location in locations]
 
             return responses, total_locations, last_page, first_item, last_item
 
         except DatabaseError:
             raise HTTPException(status_code=500, detail="Internal server error")
 
+    @read_only
+    def all_by_cursor(
+        self, items_per_page: int, cursor: str = None, sort_type: str = 'asc', sort_by: str = 'id',
+        start_date: str = None, end_date: str = None, name: str = None, description: str = None,
+        q: str = None
+    ) -> Tuple[List[LocationResponse], Optional[str]]:
+        """
+        Retrieve one keyset page of locations with the same filters as all().
+
+        Args:
+            items_per_page (int): The number of items per page.
+            cursor (str): The cursor returned with the previous page, empty for the first page.
+            sort_type (str): The sort type ('asc' or 'desc').
+            sort_by (str): The field to sort by.
+            start_date (str): The start date for the filter (YYYY-MM-DD).
+            end_date (str): The end date for the filter (YYYY-MM-DD).
+            name (str): The first field filter.
+            description (str): The second field filter.
+            q (str): Search text matched against the name and description.
+
+        Returns:
+            Tuple[List[LocationResponse], Optional[str]]: A tuple containing the list of location responses and the
+                cursor of the next page.
+
+        Raises:
+            HTTPException: If q is given, the cursor is invalid or there is an internal server error.
+        """
+        if q:
+            # Keyset pages are ordered by the sort field, which would drop the relevance ranking.
+            raise HTTPException(status_code=400, detail="q cannot be combined with cursor pagination")
+
+        try:
+            sort_field = self.get_sort_field(sort_by)
+
+            query = self.build_query(sort_field, sort_type, start_date, end_date, name, description, q)
+
+            locations, next_cursor = paginate_by_cursor(
+                query, sort_field, Location.id, sort_type, cursor, items_per_page
+            )
+
+            return [self.to_response(location) for location in locations], next_cursor
+
+        except DatabaseError:
+            raise HTTPException(status_code=500, detail="Internal server error")
+
     def get_sort_field(self, sort_by: str):
         """
         Returns the corresponding sort field based on the given sort_by parameter.
@@ -111,7 +164,7 @@ class LocationService:
         else:
             raise HTTPException(status_code=400, detail="Invalid sort_by field")
 
-    def build_query(self, sort_field, sort_type, start_date, end_date, name, description):
+    def build_query(self, sort_field, sort_type, start_date, end_date, name, description, q=None):
         """
         Builds a query to retrieve locations based on the provided parameters.
 
@@ -122,12 +175,16 @@ class LocationService:
             end_date (str): The end date for filtering locations.
             name (str): The first field to filter locations by.
             description (str): The description to filter locations by.
+            q (str): Search text; matching rows are ranked first by relevance.
 
         Returns:
             sqlalchemy.orm.query.Query: The query object for retrieving locations.
         """
         query = self.db.query(Location)
 
+        if q:
+            query = search(query, Location, (Location.name, Location.description), q)
+
         if sort_type == 'asc':
             query = query.order_by(sort_field.asc())
         elif sort_type == 'desc':
@@ -149,6 +206,7 @@ class LocationService:
 
         return query
 
+    @read_only
     def total(self) -> int:
         """
         Get the total number of locations.
@@ -158,6 +216,7 @@ class LocationService:
         """
         return self.db.query(Location).count()
 
+    @read_only
     def find(self, id: int) -> LocationResponse:
         """
         Find a location by their ID and return the location response.
@@ -171,13 +230,40 @@ class LocationService:
         Raises:
             HTTPException: If the location is not found.
         """
-        location = self.get_by_id(id)
-        return LocationResponse(
+        location = self.get_by_id(id, cached=True)
+        return self.to_response(location)
+
+    @read_only
+    def modified_at(self, id: int) -> List[datetime]:
+        """
+        Get when a location was last updated, for conditional requests.
+
+        Args:
+            id (int): The ID of the location.
+
+        Returns:
+            List[datetime]: The updated_at of the location.
+
+        Raises:
+            HTTPException: If the location is not found.
+        """
+        return [self.get_by_id(id, cached=True).updated_at]
+
+    def to_response(self, location: Location) -> LocationResponse:
+        """
+        Build the location response for a location, without validation since the values
+        come from the database; see json_response.
+
+        Args:
+            location (Location): The location object.
+
+        Returns:
+            LocationResponse: The location response.
+        """
+        return LocationResponse.model_construct(
             id=location.id,
             name=location.name,
             description=location.description,
-            created_at=location.created_at.strftime("%Y-%m-%d %H:%M:%S"),
-            updated_at=location.updated_at.strftime("%Y-%m-%d %H:%M:%S"),
         )
 
     def save(self, location: LocationCreateRequest) -> LocationCreateResponse:
@@ -199,6 +285,8 @@ class LocationService:
             item = Location(**data)
             self.db.add(item)
             self.db.commit()
+            invalidate(Location, item.id)
+            invalidate_listings("locations")
             self.db.refresh(item)
 
             item = self.db.query(Location).filter(Location.id == item.id).first()
@@ -232,6 +320,8 @@ class LocationService:
             for key, value in data.items():
                 setattr(item, key, value)
             self.db.commit()
+            invalidate(Location, id)
+            invalidate_listings("locations", "devices")
             self.db.refresh(item)
             response_data = {
                 "id": item.id,
@@ -262,6 +352,8 @@ class LocationService:
             item = self.get_by_id(id)
             self.db.delete(item)
             self.db.commit()
+            invalidate(Location, id)
+            invalidate_listings("locations", "devices")
             response_data = {
                 "id": item.id,
                 "name": item.name,
@@ -273,3 +365,11 @@ class LocationService:
         except DatabaseError as e:
             logging.error(f"Error occurred while deleting location: {str(e)}")
             raise HTTPException(status_code=500, detail="Internal server error")
+
+
+class AsyncLocationService(AsyncService):
+    """
+    Async variant of LocationService, awaited by the routes.
+    """
+
+    service_class = LocationService
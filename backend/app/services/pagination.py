@@ -0,0 +1,271 @@
+import base64
+import binascii
+import json
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, List, Optional, Sequence, Tuple
+
+from fastapi import HTTPException
+from sqlalchemy import DateTime, and_, or_
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.orm import Query
+from sqlalchemy.sql.expression import ClauseElement, Executable
+
+TOTAL_MODES = ("exact", "estimate", "none")
+
+ESTIMATE_TTL = 60
+ESTIMATE_CACHE_SIZE = 256
+
+_estimate_cache: "OrderedDict[Tuple[str, str], Tuple[float, int]]" = OrderedDict()
+_estimate_lock = threading.Lock()
+
+
+class explain(Executable, ClauseElement):
+    """
+    An EXPLAIN statement that returns the planner output of a SELECT as JSON.
+    """
+
+    inherit_cache = False
+
+    def __init__(self, statement):
+        self.statement = statement
+
+
+@compiles(explain, "postgresql")
+def _compile_explain(element, compiler, **kw):
+    return "EXPLAIN (FORMAT JSON) " + compiler.process(element.statement, **kw)
+
+
+def encode_cursor(sort_key: str, sort_type: str, sort_value: Any, id: int) -> str:
+    """
+    Encode the sort order, sort key and ID of a row into an opaque cursor.
+
+    Args:
+        sort_key (str): The name of the field the listing is sorted by.
+        sort_type (str): The sort type ('asc' or 'desc').
+        sort_value (Any): The value of the sort field for the row.
+        id (int): The ID of the row.
+
+    Returns:
+        str: The URL-safe cursor.
+    """
+    if isinstance(sort_value, datetime):
+        sort_value = sort_value.isoformat()
+    payload = json.dumps([sort_key, sort_type, sort_value, id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, sort_key: str, sort_type: str) -> Tuple[Any, int]:
+    """
+    Decode a cursor produced by encode_cursor for the same sort order.
+
+    Args:
+        cursor (str): The opaque cursor.
+        sort_key (str): The name of the field the listing is sorted by.
+        sort_type (str): The sort type ('asc' or 'desc').
+
+    Returns:
+        Tuple[Any, int]: The sort value and ID of the last row of the previous page.
+
+    Raises:
+        HTTPException: If the cursor is malformed or was made for another sort order.
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        cursor_key, cursor_type, sort_value, id = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        if not isinstance(id, int) or (cursor_key, cursor_type) != (sort_key, sort_type):
+            raise ValueError(id)
+        return sort_value, id
+    except (binascii.Error, UnicodeDecodeError, TypeError, ValueError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def keyset_predicate(sort_field, id_field, ascending: bool, sort_value: Any, last_id: int):
+    """
+    Build the filter selecting the rows after a (sort value, ID) pair in keyset order.
+
+    NULL sort values are ordered as the smallest values, so they come first in
+    ascending order and last in descending order.
+
+    Args:
+        sort_field: The column the listing is sorted by.
+        id_field: The primary key column used as a tie-breaker.
+        ascending (bool): Whether the listing is sorted in ascending order.
+        sort_value (Any): The sort value of the last row of the previous page.
+        last_id (int): The ID of the last row of the previous page.
+
+    Returns:
+        The filter clause.
+    """
+    after_id = id_field > last_id if ascending else id_field < last_id
+    if sort_field.key == id_field.key:
+        return after_id
+    if sort_value is None:
+        null_tail = and_(sort_field.is_(None), after_id)
+        return or_(sort_field.isnot(None), null_tail) if ascending else null_tail
+    if ascending:
+        return or_(sort_field > sort_value, and_(sort_field == sort_value, after_id))
+    return or_(sort_field < sort_value, and_(sort_field == sort_value, after_id), sort_field.is_(None))
+
+
+def paginate_by_cursor(
+    query: Query, sort_field, id_field, sort_type: str, cursor: Optional[str], items_per_page: int
+) -> Tuple[List[Any], Optional[str]]:
+    """
+    Fetch one keyset page of a query ordered by the sort field and ID.
+
+    Instead of skipping earlier rows with OFFSET, the page starts right after the
+    (sort value, ID) pair carried by the cursor, so every page costs the same
+    regardless of its depth. NULL sort values are ordered as the smallest values.
+
+    Args:
+        query (Query): The filtered query to page through.
+        sort_field: The column the listing is sorted by.
+        id_field: The primary key column used as a tie-breaker.
+        sort_type (str): The sort type ('asc' or 'desc').
+        cursor (Optional[str]): The cursor of the previous page, empty for the first page.
+        items_per_page (int): The number of items per page.
+
+    Returns:
+        Tuple[List[Any], Optional[str]]: The rows of the page and the cursor of the next
+        page, or None when there are no more rows.
+
+    Raises:
+        HTTPException: If the sort type or cursor is invalid, or the cursor was made for another sort order.
+    """
+    if sort_type not in ("asc", "desc"):
+        raise HTTPException(status_code=400, detail="Invalid sort_type")
+
+    ascending = sort_type == "asc"
+    tie_breaker = sort_field.key == id_field.key
+    mysql = query.session.get_bind().dialect.name == "mysql"
+
+    if tie_breaker:
+        order = [id_field.asc() if ascending else id_field.desc()]
+    elif ascending:
+        # MySQL already sorts NULLs first and has no NULLS FIRST/LAST syntax.
+        order = [sort_field.asc() if mysql else sort_field.asc().nulls_first(), id_field.asc()]
+    else:
+        order = [sort_field.desc() if mysql else sort_field.desc().nulls_last(), id_field.desc()]
+
+    query = query.order_by(None).order_by(*order)
+
+    if cursor:
+        sort_value, last_id = decode_cursor(cursor, sort_field.key, sort_type)
+        if isinstance(sort_field.type, DateTime) and sort_value is not None:
+            try:
+                sort_value = datetime.fromisoformat(sort_value)
+            except (TypeError, ValueError):
+                raise HTTPException(status_code=400, detail="Invalid cursor")
+
+        query = query.filter(keyset_predicate(sort_field, id_field, ascending, sort_value, last_id))
+
+    rows = query.limit(items_per_page + 1).all()
+
+    next_cursor = None
+    if len(rows) > items_per_page:
+        rows = rows[:items_per_page]
+        last = rows[-1]
+        next_cursor = encode_cursor(
+            sort_field.key, sort_type, getattr(last, sort_field.key), getattr(last, id_field.key)
+        )
+
+    return rows, next_cursor
+
+
+def estimate_total(query: Query) -> int:
+    """
+    Estimate the number of rows matched by a query without a full count.
+
+    On PostgreSQL the planner's row estimate is read with EXPLAIN. Other databases
+    have no usable estimate, so the exact count is cached per statement and
+    parameters for ESTIMATE_TTL seconds.
+
+    Args:
+        query (Query): The filtered query.
+
+    Returns:
+        int: The estimated number of rows.
+    """
+    query = query.order_by(None)
+    dialect = query.session.get_bind().dialect
+
+    if dialect.name == "postgresql":
+        plan = query.session.execute(explain(query.statement)).scalar()
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        return int(plan[0]["Plan"]["Plan Rows"])
+
+    compiled = query.statement.compile(dialect=dialect)
+    key = (str(compiled), repr(sorted(compiled.params.items())))
+    now = time.monotonic()
+
+    with _estimate_lock:
+        cached = _estimate_cache.get(key)
+        if cached and cached[0] > now:
+            _estimate_cache.move_to_end(key)
+            return cached[1]
+
+    total = query.count()
+
+    with _estimate_lock:
+        _estimate_cache[key] = (now + ESTIMATE_TTL, total)
+        _estimate_cache.move_to_end(key)
+        while len(_estimate_cache) > ESTIMATE_CACHE_SIZE:
+            _estimate_cache.popitem(last=False)
+
+    return total
+
+
+def paginate_by_offset(
+    query: Query, page: int, items_per_page: int, with_total: str = "exact", options: Sequence = ()
+) -> Tuple[List[Any], Optional[int], int, int, int]:
+    """
+    Fetch one numbered page of a query and work out the pagination details.
+
+    Args:
+        query (Query): The filtered and sorted query.
+        page (int): The page number.
+        items_per_page (int): The number of items per page.
+        with_total (str): How to compute the total: 'exact' counts every matching row,
+            'estimate' uses estimate_total, and 'none' skips the count and fetches one
+            extra row to tell whether a next page exists.
+        options (Sequence): Loader options applied to the page fetch only.
+
+    Returns:
+        Tuple[List[Any], Optional[int], int, int, int]: The rows of the page, the total
+        (None when not computed), the last page number, the first item number, and the
+        last item number. Without a total the last page is the next page when one exists.
+
+    Raises:
+        HTTPException: If the total mode is invalid.
+    """
+    if with_total not in TOTAL_MODES:
+        raise HTTPException(status_code=400, detail="Invalid with_total")
+
+    offset = (page - 1) * items_per_page
+    page_query = query.options(*options) if options else query
+    first_item = offset + 1
+
+    if with_total == "none":
+        rows = page_query.offset(offset).limit(items_per_page + 1).all()
+        has_next = len(rows) > items_per_page
+        rows = rows[:items_per_page]
+        return rows, None, page + 1 if has_next else page, first_item, offset + len(rows)
+
+    rows = page_query.offset(offset).limit(items_per_page).all()
+
+    if with_total == "exact":
+        total = query.count()
+        last_page = (total - 1) // items_per_page + 1
+        last_item = min(offset + items_per_page, total)
+    else:
+        # An estimate can lag behind the rows actually returned, so never report
+        # a last page or item before the current one.
+        total = estimate_total(query)
+        last_page = max((total - 1) // items_per_page + 1, page if rows else 0)
+        last_item = offset + len(rows)
+
+    return rows, total, last_page, first_item, last_item
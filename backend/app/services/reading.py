@@ -1,17 +1,183 @@
+import csv
+import io
+import json
 import logging
-from typing import List, Tuple
+from datetime import date, datetime, time, timedelta, timezone
+from typing import Iterator, List, Optional, Tuple
 
 from fastapi import HTTPException
+from sqlalchemy import BigInteger, case, cast, func, insert, literal_column
 from sqlalchemy.exc import DatabaseError
-from sqlalchemy.orm import Session
-
-from app.models.reading import Reading
+from sqlalchemy.orm import Session, joinedload
+
+from app.models.category import Category
+from app.models.device import Device
+from app.models.location import Location
+from app.models.partition import recent_first
+from app.models.reading import Reading, parse_number
+from app.models.user import User
 from app.requests.reading import ReadingCreateRequest, ReadingUpdateRequest
 from app.responses.category import CategoryResponse
 from app.responses.device import DeviceResponse
 from app.responses.location import LocationResponse
 from app.responses.reading import ReadingCreateResponse, ReadingResponse, ReadingUpdateResponse
+from app.responses.serialization import format_timestamp
 from app.responses.user import UserResponse
+from app.services.async_service import AsyncService
+from app.services.last_reading import last_reading_row, refresh_last_readings, upsert_last_readings
+from app.services.pagination import paginate_by_cursor, paginate_by_offset
+from app.services.replica import read_only
+from config.app import get_settings
+
+AGGREGATE_BUCKETS = {"1m": 60, "5m": 300, "15m": 900, "1h": 3600, "1d": 86400}
+AGGREGATE_FUNCTIONS = ("avg", "min", "max", "count", "last")
+
+ID_MATCH_MODES = ("exact", "substring")
+
+READING_RELATIONSHIPS = {"user": "user_id", "device": "device_id"}
+
+EXPORT_FORMATS = ("ndjson", "csv")
+EXPORT_COLUMNS = ("id", "user_id", "device_id", "unit", "value", "created_at", "updated_at")
+ARROW_COLUMNS = ("device_id", "user_id", "created_at", "value_num", "unit")
+
+
+def import_pyarrow():
+    """
+    Import pyarrow, which is only needed for the columnar exports.
+
+    Returns:
+        module: The pyarrow module.
+
+    Raises:
+        HTTPException: If pyarrow is not installed.
+    """
+    try:
+        import pyarrow
+    except ImportError:
+        raise HTTPException(status_code=501, detail="Columnar export requires pyarrow")
+    return pyarrow
+
+
+def parse_ids(value: str, field: str) -> List[int]:
+    """
+    Parse a comma-separated list of IDs from a filter value.
+
+    Args:
+        value (str): The filter value, e.g. '3' or '1,2,3'.
+        field (str): The name of the filter, used in the error message.
+
+    Returns:
+        List[int]: The IDs, without duplicates.
+
+    Raises:
+        HTTPException: If an entry is not an integer.
+    """
+    ids = []
+    for part in str(value).split(","):
+        part = part.strip()
+        if not part.isdigit():
+            raise HTTPException(status_code=400, detail=f"Invalid {field}")
+        if int(part) not in ids:
+            ids.append(int(part))
+    return ids
+
+
+def created_at_filters(start_date=None, end_date=None, dialect: str = None) -> list:
+    """
+    Build the created_at bounds of a date filter.
+
+    The bounds are a half-open datetime range, which PostgreSQL uses to prune the
+    monthly partitions of the readings table, and which the (device_id,
+    created_at) and (user_id, created_at) indexes serve on every database.
+
+    Listings without dates are bounded by listing_start_date. Exports and counts
+    without dates have no bound and read every partition.
+
+    Args:
+        start_date: The first day to include (date or YYYY-MM-DD), or None.
+        end_date: The last day to include (date or YYYY-MM-DD), or None.
+        dialect (str): The name of the database dialect.
+
+    Returns:
+        list: The filter clauses, empty without dates.
+
+    Raises:
+        HTTPException: If a date is invalid.
+    """
+    filters = []
+    for value, field in ((start_date, "start_date"), (end_date, "end_date")):
+        if not value:
+            continue
+        try:
+            day = value if isinstance(value, date) else date.fromisoformat(str(value))
+        except ValueError:
+            raise HTTPException(status_code=400, detail=f"Invalid {field}")
+        bound = datetime.combine(day if field == "start_date" else day + timedelta(days=1), time.min)
+        if dialect == "sqlite":
+            # SQLite compares the stored text, and CURRENT_TIMESTAMP has no fraction of a second.
+            bound = bound.strftime("%Y-%m-%d %H:%M:%S")
+        filters.append(Reading.created_at >= bound if field == "start_date" else Reading.created_at < bound)
+    return filters
+
+
+def listing_start_date(start_date=None, end_date=None):
+    """
+    Default the start date of a reading listing that gives no dates.
+
+    Without dates a listing covers the last READING_LISTING_DAYS days, so that
+    PostgreSQL prunes the older partitions. A listing gives any start_date, even a
+    distant one, to reach older readings.
+
+    Args:
+        start_date: The start date of the listing, or None.
+        end_date: The end date of the listing, or None.
+
+    Returns:
+        The start date to filter on, or None for no bound.
+    """
+    days = get_settings().READING_LISTING_DAYS
+    if start_date or end_date or days <= 0:
+        return start_date
+    return datetime.now(timezone.utc).date() - timedelta(days=days)
+
+
+def validate_aggregate(bucket: str, fns: List[str]):
+    """
+    Validate the bucket width and functions of an aggregation request.
+
+    Args:
+        bucket (str): The bucket width.
+        fns (List[str]): The functions to compute.
+
+    Raises:
+        HTTPException: If the bucket or a function is invalid.
+    """
+    if bucket not in AGGREGATE_BUCKETS:
+        raise HTTPException(status_code=400, detail="Invalid bucket")
+    if not fns or any(fn not in AGGREGATE_FUNCTIONS for fn in fns):
+        raise HTTPException(status_code=400, detail="Invalid fn")
+
+
+def summarize_partial(partial: dict, fns: List[str]) -> dict:
+    """
+    Turn a partial aggregate into the requested aggregate functions.
+
+    Args:
+        partial (dict): The partial with its bucket start as Unix seconds.
+        fns (List[str]): The functions to compute.
+
+    Returns:
+        dict: The bucket start and the requested functions.
+    """
+    values = {
+        "avg": partial["sum"] / partial["count"],
+        "min": partial["min"],
+        "max": partial["max"],
+        "count": partial["count"],
+        "last": partial["last_value"],
+    }
+    bucket = datetime.fromtimestamp(partial["bucket"], tz=timezone.utc)
+    return {"bucket": bucket.strftime("%Y-%m-%d %H:%M:%S"), **{fn: values[fn] for fn in fns}}
 
 
 class ReadingService:
@@ -28,12 +194,13 @@ class ReadingService:
         """
         self.db = db
 
-    def get_by_id(self, id: int) -> Reading:
+    def get_by_id(self, id: int, *options) -> Reading:
         """
-        Retrieve a reading by their ID.
+        Retrieve a reading by their ID, from the recent partitions first on PostgreSQL.
 
         Args:
             id (int): The ID of the reading.
+            *options: Loader options applied to the query.
 
         Returns:
             Reading: The reading object.
@@ -41,15 +208,22 @@ class ReadingService:
         Raises:
             HTTPException: If the reading is not found.
         """
-        reading = self.db.query(Reading).filter(Reading.id == id).first()
+        reading = recent_first(self.db.query(Reading).options(*options).filter(Reading.id == id), Reading.created_at)
         if not reading:
             raise HTTPException(status_code=404, detail="Reading not found")
         return reading
 
-    def all(self, page: int, items_per_page: int, sort_type: str = 'asc', sort_by: str = 'id', start_date: str = None, end_date: str = None, user_id: str = None, device_id: str = None) -> Tuple[List[ReadingResponse], int, int, int, int]:
+    @read_only
+    def all(
+        self, page: int, items_per_page: int, sort_type: str = 'asc', sort_by: str = 'id',
+        start_date: str = None, end_date: str = None, user_id: str = None, device_id: str = None,
+        with_total: str = 'exact', id_match: str = 'exact', include: Optional[List[str]] = None
+    ) -> Tuple[List[ReadingResponse], Optional[int], int, int, int]:
         """
         Retrieve all readings with pagination and optional date, user_id, and second field filters.
 
+        Without dates only the last READING_LISTING_DAYS days are listed, see listing_start_date.
+
         Args:
             page (int): The page number.
             items_per_page (int): The number of items per page.
@@ -57,79 +231,82 @@ class ReadingService:
             sort_by (str): The field to sort by ('created_at' or 'user_id').
             start_date (str): The start date for the filter (YYYY-MM-DD).
             end_date (str): The end date for the filter (YYYY-MM-DD).
-            user_id (str): The first field filter.
-            device_id (str): The second field filter.
+            user_id (str): The user IDs to filter by, comma-separated.
+            device_id (str): The device IDs to filter by, comma-separated.
+            with_total (str): How to compute the total ('exact', 'estimate' or 'none').
+            id_match (str): How the ID filters match ('exact', or the deprecated 'substring').
+            include (Optional[List[str]]): The relationships to load, see READING_RELATIONSHIPS; None for all.
 
         Returns:
-            Tuple[List[ReadingResponse], int, int, int, int]: A tuple containing the list of reading responses, the total number of readings, the last page number, the first item number, and the last item number.
+            Tuple[List[ReadingResponse], Optional[int], int, int, int]: A tuple containing the list of reading
+                responses, the total number of readings, the last page number, the first item number, and the last item
+                number.
 
         Raises:
             HTTPException: If there is an internal server error.
         """
         try:
-            offset = (page - 1) * items_per_page
-
             sort_field = self.get_sort_field(sort_by)
+            start_date = listing_start_date(start_date, end_date)
 
-            query = self.build_query(sort_field, sort_type, start_date, end_date, user_id, device_id)
-
-            readings = query.offset(offset).limit(items_per_page).all()
-
-            responses = [ReadingResponse(
-                id=reading.id,
-                user_id=reading.user_id,
-                device_id=reading.device_id,
-                unit=reading.unit,
-                value=reading.value,
-                created_at=reading.created_at.strftime("%Y-%m-%d %H:%M:%S"),
-                updated_at=reading.updated_at.strftime("%Y-%m-%d %H:%M:%S"),
-                user=UserResponse(
-                    id=reading.user.id,
-                    username=reading.user.username,
-                    email=reading.user.email,
-                    created_at=reading.user.created_at.strftime("%Y-%m-%d %H:%M:%S"),
-                    updated_at=reading.user.updated_at.strftime("%Y-%m-%d %H:%M:%S"),
-                ),
-                device=DeviceResponse(
-                    id=reading.device.id,
-                    name=reading.device.name,
-                    description=reading.device.description,
-                    category_id=reading.device.category_id,
-                    location_id=reading.device.location_id,
-                    topic=reading.device.topic,
-                    channel=reading.device.channel,
-                    type=reading.device.type,
-                    visualization=reading.device.visualization,
-                    message_type=reading.device.message_type,
-                    category=CategoryResponse(
-                        id=reading.device.category.id,
-                        name=reading.device.category.name,
-                        description=reading.device.category.description,
-                        created_at=reading.device.category.created_at.strftime("%Y-%m-%d %H:%M:%S"),
-                        updated_at=reading.device.category.updated_at.strftime("%Y-%m-%d %H:%M:%S"),
-                    ),
-                    location=LocationResponse(
-                        id=reading.device.location.id,
-                        name=reading.device.location.name,
-                        description=reading.device.location.description,
-                        created_at=reading.device.location.created_at.strftime("%Y-%m-%d %H:%M:%S"),
-                        updated_at=reading.device.location.updated_at.strftime("%Y-%m-%d %H:%M:%S"),
-                    ),
-                    created_at=reading.device.created_at.strftime("%Y-%m-%d %H:%M:%S"),
-                    updated_at=reading.device.updated_at.strftime("%Y-%m-%d %H:%M:%S"),
-                )
-            ) for reading in readings]
+            query = self.build_query(sort_field, sort_type, start_date, end_date, user_id, device_id, id_match)
+
+            readings, total_readings, last_page, first_item, last_item = paginate_by_offset(
+                query, page, items_per_page, with_total, options=self.load_options(include)
+            )
 
-            total_readings = query.count()
-            last_page = (total_readings - 1) // items_per_page + 1
-            first_item = offset + 1
-            last_item = min(offset + items_per_page, total_readings)
+            related = {}
+            responses = [self.to_response(reading, related, include) for reading in readings]
 
             return responses, total_readings, last_page, first_item, last_item
 
         except DatabaseError:
             raise HTTPException(status_code=500, detail="Internal server error")
 
+    @read_only
+    def all_by_cursor(
+        self, items_per_page: int, cursor: str = None, sort_type: str = 'asc', sort_by: str = 'id',
+        start_date: str = None, end_date: str = None, user_id: str = None, device_id: str = None,
+        id_match: str = 'exact', include: Optional[List[str]] = None
+    ) -> Tuple[List[ReadingResponse], Optional[str]]:
+        """
+        Retrieve one keyset page of readings with the same filters as all().
+
+        Args:
+            items_per_page (int): The number of items per page.
+            cursor (str): The cursor returned with the previous page, empty for the first page.
+            sort_type (str): The sort type ('asc' or 'desc').
+            sort_by (str): The field to sort by.
+            start_date (str): The start date for the filter (YYYY-MM-DD).
+            end_date (str): The end date for the filter (YYYY-MM-DD).
+            user_id (str): The user IDs to filter by, comma-separated.
+            device_id (str): The device IDs to filter by, comma-separated.
+            id_match (str): How the ID filters match ('exact', or the deprecated 'substring').
+            include (Optional[List[str]]): The relationships to load, see READING_RELATIONSHIPS; None for all.
+
+        Returns:
+            Tuple[List[ReadingResponse], Optional[str]]: A tuple containing the list of reading responses and the cursor
+                of the next page.
+
+        Raises:
+            HTTPException: If the cursor is invalid or there is an internal server error.
+        """
+        try:
+            sort_field = self.get_sort_field(sort_by)
+            start_date = listing_start_date(start_date, end_date)
+
+            query = self.build_query(sort_field, sort_type, start_date, end_date, user_id, device_id, id_match)
+
+            readings, next_cursor = paginate_by_cursor(
+                query.options(*self.load_options(include)), sort_field, Reading.id, sort_type, cursor, items_per_page
+            )
+
+            related = {}
+            return [self.to_response(reading, related, include) for reading in readings], next_cursor
+
+        except DatabaseError:
+            raise HTTPException(status_code=500, detail="Internal server error")
+
     def get_sort_field(self, sort_by: str):
         """
         Returns the corresponding sort field based on the given sort_by parameter.
@@ -152,21 +329,33 @@ class ReadingService:
         else:
             raise HTTPException(status_code=400, detail="Invalid sort_by field")
 
-    def build_query(self, sort_field, sort_type, start_date, end_date, user_id, device_id):
+    def build_query(self, sort_field, sort_type, start_date, end_date, user_id, device_id, id_match='exact'):
         """
         Builds a query to retrieve readings based on the provided parameters.
 
+        The user and device filters match whole IDs, and a comma-separated list
+        becomes an IN filter, so both can use the (user_id, created_at) and
+        (device_id, created_at) indexes. The 'substring' mode keeps the old LIKE
+        matching on the IDs as text; it scans every row and is deprecated.
+
         Args:
             sort_field (str): The field to sort the readings by.
             sort_type (str): The type of sorting, either 'asc' or 'desc'.
             start_date (str): The start date for filtering readings.
             end_date (str): The end date for filtering readings.
-            user_id (str): The first field to filter readings by.
-            device_id (str): The device_id to filter readings by.
+            user_id (str): The user IDs to filter readings by, comma-separated.
+            device_id (str): The device IDs to filter readings by, comma-separated.
+            id_match (str): How the ID filters match ('exact' or 'substring').
 
         Returns:
             sqlalchemy.orm.query.Query: The query object for retrieving readings.
+
+        Raises:
+            HTTPException: If the sort type, match mode or an ID is invalid.
         """
+        if id_match not in ID_MATCH_MODES:
+            raise HTTPException(status_code=400, detail="Invalid id_match")
+
         query = self.db.query(Reading)
 
         if sort_type == 'asc':
@@ -176,20 +365,323 @@ class ReadingService:
         else:
             raise HTTPException(status_code=400, detail="Invalid sort_type")
 
-        start_date = str(start_date) if start_date else ''
-        end_date = str(end_date) if end_date else ''
-
-        if start_date and end_date:
-            query = query.filter(Reading.created_at.between(start_date + ' 00:00:00', end_date + ' 23:59:59'))
+        query = query.filter(*created_at_filters(start_date, end_date, self.db.get_bind().dialect.name))
 
-        if user_id:
-            query = query.filter(Reading.user_id.like(f'%{user_id}%'))
+        if id_match == 'substring':
+            if user_id or device_id:
+                logging.warning("Substring matching of reading user_id/device_id filters is deprecated")
+            if user_id:
+                query = query.filter(Reading.user_id.like(f'%{user_id}%'))
+            if device_id:
+                query = query.filter(Reading.device_id.like(f'%{device_id}%'))
+            return query
 
-        if device_id:
-            query = query.filter(Reading.device_id.like(f'%{device_id}%'))
+        id_filters = ((Reading.user_id, user_id, 'user_id'), (Reading.device_id, device_id, 'device_id'))
+        for column, value, field in id_filters:
+            if value:
+                ids = parse_ids(value, field)
+                query = query.filter(column == ids[0] if len(ids) == 1 else column.in_(ids))
 
         return query
 
+    @read_only
+    def aggregate(
+        self, device_id: int, bucket: str, fns: List[str], start_date: str = None, end_date: str = None
+    ) -> List[dict]:
+        """
+        Aggregate the numeric readings of a device into fixed time buckets.
+
+        The readings are grouped in the database on created_at truncated to the bucket
+        width. Values that do not parse as numbers are left out of every function.
+
+        Args:
+            device_id (int): The device to aggregate.
+            bucket (str): The bucket width, one of AGGREGATE_BUCKETS.
+            fns (List[str]): The functions to compute, from AGGREGATE_FUNCTIONS.
+            start_date (str): The start date for the filter (YYYY-MM-DD).
+            end_date (str): The end date for the filter (YYYY-MM-DD).
+
+        Returns:
+            List[dict]: One dictionary per bucket, holding the bucket start and the
+            requested functions, ordered by bucket.
+
+        Raises:
+            HTTPException: If the bucket or a function is invalid, or there is an internal server error.
+        """
+        validate_aggregate(bucket, fns)
+
+        try:
+            partials = self.partials(
+                AGGREGATE_BUCKETS[bucket], device_id=device_id, start_date=start_date, end_date=end_date
+            )
+            return [summarize_partial(partial, fns) for partial in partials]
+        except DatabaseError as e:
+            logging.error(f"Error occurred while aggregating readings: {str(e)}")
+            raise HTTPException(status_code=500, detail="Internal server error")
+
+    def partials(
+        self, seconds: int, device_id: int = None, start_date: str = None, end_date: str = None,
+        after_id: int = None, upto_id: int = None, skip: Optional[List[Tuple[int, int]]] = None
+    ) -> List[dict]:
+        """
+        Compute mergeable per-device, per-bucket partial aggregates of numeric readings.
+
+        Each partial holds the count, sum, min and max of the bucket and the value,
+        timestamp and ID of its most recent reading, so partials of adjacent ranges
+        can be merged into coarser buckets or rollups.
+
+        Args:
+            seconds (int): The bucket width in seconds.
+            device_id (int): Restrict to one device.
+            start_date (str): The start date for the filter (YYYY-MM-DD).
+            end_date (str): The end date for the filter (YYYY-MM-DD).
+            after_id (int): Only include readings with a greater ID.
+            upto_id (int): Only include readings with this ID or lower.
+            skip (List[Tuple[int, int]]): Inclusive ranges of reading IDs to leave out.
+
+        Returns:
+            List[dict]: The partials, ordered by device and bucket.
+        """
+        bucket_start = self.bucket_expression(seconds).label("bucket")
+        number = Reading.value_num.label("number")
+        position = func.row_number().over(
+            partition_by=(Reading.device_id, bucket_start), order_by=(Reading.created_at.desc(), Reading.id.desc())
+        ).label("position")
+
+        rows = self.db.query(Reading.device_id, bucket_start, number, Reading.created_at, Reading.id, position)
+        rows = rows.filter(number.isnot(None))
+        if device_id is not None:
+            rows = rows.filter(Reading.device_id == device_id)
+        rows = rows.filter(*created_at_filters(start_date, end_date, self.db.get_bind().dialect.name))
+        if after_id is not None:
+            rows = rows.filter(Reading.id > after_id)
+        if upto_id is not None:
+            rows = rows.filter(Reading.id <= upto_id)
+        for first_id, last_id in skip or []:
+            rows = rows.filter(~Reading.id.between(first_id, last_id))
+        rows = rows.subquery()
+
+        latest = rows.c.position == 1
+        query = self.db.query(
+            rows.c.device_id,
+            rows.c.bucket,
+            func.count(rows.c.number).label("count"),
+            func.sum(rows.c.number).label("sum"),
+            func.min(rows.c.number).label("min"),
+            func.max(rows.c.number).label("max"),
+            func.max(case((latest, rows.c.number))).label("last_value"),
+            func.max(case((latest, rows.c.created_at))).label("last_at"),
+            func.max(case((latest, rows.c.id))).label("last_id"),
+        )
+        results = query.group_by(rows.c.device_id, rows.c.bucket).order_by(rows.c.device_id, rows.c.bucket).all()
+
+        return [{**result._asdict(), "bucket": int(result.bucket)} for result in results]
+
+    def bucket_expression(self, seconds: int):
+        """
+        Build the SQL expression for the start of a bucket, as Unix seconds.
+
+        Args:
+            seconds (int): The bucket width in seconds.
+
+        Returns:
+            The SQL expression truncating created_at to the bucket width.
+        """
+        dialect = self.db.get_bind().dialect.name
+        if dialect == "postgresql":
+            epoch = cast(func.floor(func.extract("epoch", Reading.created_at)), BigInteger)
+        elif dialect == "mysql":
+            epoch = cast(func.unix_timestamp(Reading.created_at), BigInteger)
+        elif dialect == "mssql":
+            epoch = func.datediff_big(literal_column("second"), "1970-01-01", Reading.created_at)
+        else:
+            epoch = cast(func.strftime("%s", Reading.created_at), BigInteger)
+        return (epoch // seconds) * seconds
+
+    @read_only
+    def export(
+        self, format: str, start_date: str = None, end_date: str = None, user_id: str = None,
+        device_id: str = None, batch_size: int = 1000
+    ) -> Iterator[str]:
+        """
+        Stream the readings matching the listing filters as NDJSON or CSV.
+
+        Rows are fetched as plain column tuples through a server-side cursor in
+        batches of batch_size and written straight to text, so memory use does not
+        grow with the size of the range and no response models are built. The
+        filters and format are validated before the first chunk is produced.
+
+        Args:
+            format (str): The output format ('ndjson' or 'csv').
+            start_date (str): The start date for the filter (YYYY-MM-DD).
+            end_date (str): The end date for the filter (YYYY-MM-DD).
+            user_id (str): The user IDs to filter by, comma-separated.
+            device_id (str): The device IDs to filter by, comma-separated.
+            batch_size (int): The number of rows fetched and written per chunk.
+
+        Returns:
+            Iterator[str]: The chunks of the export, ordered by reading ID.
+
+        Raises:
+            HTTPException: If the format or a filter is invalid.
+        """
+        if format not in EXPORT_FORMATS:
+            raise HTTPException(status_code=400, detail="Invalid format")
+
+        query = self.build_query(Reading.id, 'asc', start_date, end_date, user_id, device_id)
+        query = query.with_entities(*(getattr(Reading, column) for column in EXPORT_COLUMNS))
+
+        def chunks():
+            buffer = io.StringIO()
+            writer = csv.writer(buffer, lineterminator="\n")
+            if format == "csv":
+                writer.writerow(EXPORT_COLUMNS)
+
+            for count, row in enumerate(query.yield_per(batch_size), start=1):
+                row = [
+                    value.strftime("%Y-%m-%d %H:%M:%S") if isinstance(value, datetime) else value
+                    for value in row
+                ]
+                if format == "csv":
+                    writer.writerow(row)
+                else:
+                    buffer.write(json.dumps(dict(zip(EXPORT_COLUMNS, row)), separators=(",", ":")))
+                    buffer.write("\n")
+
+                if count % batch_size == 0:
+                    yield buffer.getvalue()
+                    buffer.seek(0)
+                    buffer.truncate()
+
+            if buffer.tell():
+                yield buffer.getvalue()
+
+        return chunks()
+
+    def record_batches(
+        self, start_date: str = None, end_date: str = None, user_id: str = None, device_id: str = None,
+        batch_size: int = 10000
+    ):
+        """
+        Fetch the readings matching the listing filters as Arrow record batches.
+
+        Args:
+            start_date (str): The start date for the filter (YYYY-MM-DD).
+            end_date (str): The end date for the filter (YYYY-MM-DD).
+            user_id (str): The user IDs to filter by, comma-separated.
+            device_id (str): The device IDs to filter by, comma-separated.
+            batch_size (int): The number of rows per batch.
+
+        Returns:
+            Tuple[pyarrow.Schema, Iterator[pyarrow.RecordBatch]]: The schema and the
+            batches, ordered by reading ID. Only one batch is held in memory at a time.
+
+        Raises:
+            HTTPException: If pyarrow is not installed or a filter is invalid.
+        """
+        pa = import_pyarrow()
+        schema = pa.schema([
+            ("device_id", pa.int64()),
+            ("user_id", pa.int64()),
+            ("created_at", pa.timestamp("s")),
+            ("value_num", pa.float64()),
+            ("unit", pa.string()),
+        ])
+
+        query = self.build_query(Reading.id, 'asc', start_date, end_date, user_id, device_id)
+        statement = query.with_entities(*(getattr(Reading, column) for column in ARROW_COLUMNS)).statement
+        db = self.db
+
+        def batches():
+            result = db.execute(statement, execution_options={"yield_per": batch_size})
+            for rows in result.partitions():
+                columns = list(zip(*rows))
+                yield pa.RecordBatch.from_arrays(
+                    [pa.array(values, type=field.type) for values, field in zip(columns, schema)],
+                    schema=schema,
+                )
+
+        return schema, batches()
+
+    @read_only
+    def export_arrow(
+        self, start_date: str = None, end_date: str = None, user_id: str = None, device_id: str = None,
+        batch_size: int = 10000
+    ) -> Iterator[bytes]:
+        """
+        Stream the readings matching the listing filters in the Arrow IPC stream format.
+
+        Args:
+            start_date (str): The start date for the filter (YYYY-MM-DD).
+            end_date (str): The end date for the filter (YYYY-MM-DD).
+            user_id (str): The user IDs to filter by, comma-separated.
+            device_id (str): The device IDs to filter by, comma-separated.
+            batch_size (int): The number of rows per record batch.
+
+        Returns:
+            Iterator[bytes]: The schema message, one chunk per record batch, and the end-of-stream marker.
+
+        Raises:
+            HTTPException: If pyarrow is not installed or a filter is invalid.
+        """
+        pa = import_pyarrow()
+        schema, batches = self.record_batches(start_date, end_date, user_id, device_id, batch_size)
+
+        def chunks():
+            sink = io.BytesIO()
+            writer = pa.ipc.new_stream(sink, schema)
+            for batch in batches:
+                writer.write_batch(batch)
+                yield sink.getvalue()
+                sink.seek(0)
+                sink.truncate()
+            writer.close()
+            yield sink.getvalue()
+
+        return chunks()
+
+    @read_only
+    def export_parquet(
+        self, root_path: str, start_date: str = None, end_date: str = None, user_id: str = None,
+        device_id: str = None, batch_size: int = 100000
+    ) -> int:
+        """
+        Write the readings matching the listing filters as Parquet files partitioned by day.
+
+        Each record batch is written to the date=YYYY-MM-DD directories of its
+        readings under root_path, which may be a local path or any URI pyarrow
+        supports, such as s3://bucket/prefix.
+
+        Args:
+            root_path (str): The root directory of the dataset.
+            start_date (str): The start date for the filter (YYYY-MM-DD).
+            end_date (str): The end date for the filter (YYYY-MM-DD).
+            user_id (str): The user IDs to filter by, comma-separated.
+            device_id (str): The device IDs to filter by, comma-separated.
+            batch_size (int): The number of rows per record batch.
+
+        Returns:
+            int: The number of readings written.
+
+        Raises:
+            HTTPException: If pyarrow is not installed or a filter is invalid.
+        """
+        pa = import_pyarrow()
+        import pyarrow.compute as pc
+        import pyarrow.parquet as pq
+
+        _, batches = self.record_batches(start_date, end_date, user_id, device_id, batch_size)
+
+        written = 0
+        for batch in batches:
+            table = pa.Table.from_batches([batch])
+            table = table.append_column("date", pc.strftime(table["created_at"], format="%Y-%m-%d"))
+            pq.write_to_dataset(table, root_path, partition_cols=["date"])
+            written += batch.num_rows
+
+        return written
+
+    @read_only
     def total(self) -> int:
         """
         Get the total number of readings.
@@ -199,6 +691,7 @@ class ReadingService:
         """
         return self.db.query(Reading).count()
 
+    @read_only
     def find(self, id: int) -> ReadingResponse:
         """
         Find a reading by their ID and return the reading response.
@@ -212,23 +705,95 @@ class ReadingService:
         Raises:
             HTTPException: If the reading is not found.
         """
-        reading = self.get_by_id(id)
-        return ReadingResponse(
-            id=reading.id,
-            user_id=reading.user_id,
-            device_id=reading.device_id,
-            unit=reading.unit,
-            value=reading.value,
-            created_at=reading.created_at.strftime("%Y-%m-%d %H:%M:%S"),
-            updated_at=reading.updated_at.strftime("%Y-%m-%d %H:%M:%S"),
-            user=UserResponse(
+        reading = self.get_by_id(id, *self.load_options())
+        return self.to_response(reading)
+
+    @read_only
+    def modified_at(self, id: int) -> List[datetime]:
+        """
+        Get when a reading and the user, device, category and location it embeds were
+        last updated, for conditional requests, in one indexed lookup, over the recent
+        partitions first on PostgreSQL.
+
+        Args:
+            id (int): The ID of the reading.
+
+        Returns:
+            List[datetime]: The updated_at of the reading and of the embedded entities.
+
+        Raises:
+            HTTPException: If the reading is not found.
+        """
+        row = recent_first(
+            self.db.query(
+                Reading.updated_at, User.updated_at, Device.updated_at, Category.updated_at, Location.updated_at
+            )
+            .outerjoin(User, Reading.user_id == User.id)
+            .outerjoin(Device, Reading.device_id == Device.id)
+            .outerjoin(Category, Device.category_id == Category.id)
+            .outerjoin(Location, Device.location_id == Location.id)
+            .filter(Reading.id == id),
+            Reading.created_at,
+        )
+        if row is None:
+            raise HTTPException(status_code=404, detail="Reading not found")
+        return list(row)
+
+    def load_options(self, include: Optional[List[str]] = None) -> list:
+        """
+        Eager loading options for the relationships read by to_response.
+
+        Loading the user, device, category and location with joins keeps a page
+        at a fixed number of statements instead of one lazy SELECT per
+        relationship and row.
+
+        Args:
+            include (Optional[List[str]]): The relationships to load, None for all.
+
+        Returns:
+            list: The loader options for a reading query.
+        """
+        options = {
+            "user": joinedload(Reading.user),
+            "device": joinedload(Reading.device).options(joinedload(Device.category), joinedload(Device.location)),
+        }
+        return [option for name, option in options.items() if include is None or name in include]
+
+    def to_response(
+        self, reading: Reading, related: dict = None, include: Optional[List[str]] = None
+    ) -> ReadingResponse:
+        """
+        Build the reading response, with its user and device, for a reading.
+
+        The responses are built without validation since the values come from the
+        database; see json_response. A page passes one related dict for all its
+        readings, so a user or device shared by many readings is built once.
+
+        Args:
+            reading (Reading): The reading object.
+            related (dict): The user and device responses already built for this page.
+            include (Optional[List[str]]): The relationships to build, None for all;
+                the others are left None and not read, so they are never loaded.
+
+        Returns:
+            ReadingResponse: The reading response.
+        """
+        related = {} if related is None else related
+        include = READING_RELATIONSHIPS if include is None else include
+
+        user = related.get(("user", reading.user_id))
+        if user is None and "user" in include:
+            user = related[("user", reading.user_id)] = UserResponse.model_construct(
                 id=reading.user.id,
                 username=reading.user.username,
                 email=reading.user.email,
-                created_at=reading.user.created_at.strftime("%Y-%m-%d %H:%M:%S"),
-                updated_at=reading.user.updated_at.strftime("%Y-%m-%d %H:%M:%S"),
-            ),
-            device=DeviceResponse(
+                created_at=format_timestamp(reading.user.created_at),
+                updated_at=format_timestamp(reading.user.updated_at),
+            )
+
+        device = related.get(("device", reading.device_id))
+        if device is None and "device" in include:
+            device = related[("device", reading.device_id)] = DeviceResponse.model_construct(
                 id=reading.device.id,
                 name=reading.device.name,
                 description=reading.device.description,
@@ -239,23 +804,26 @@ class ReadingService:
                 type=reading.device.type,
                 visualization=reading.device.visualization,
                 message_type=reading.device.message_type,
-                category=CategoryResponse(
+                category=CategoryResponse.model_construct(
                     id=reading.device.category.id,
                     name=reading.device.category.name,
                     description=reading.device.category.description,
-                    created_at=reading.device.category.created_at.strftime("%Y-%m-%d %H:%M:%S"),
-                    updated_at=reading.device.category.updated_at.strftime("%Y-%m-%d %H:%M:%S"),
                 ),
-                location=LocationResponse(
+                location=LocationResponse.model_construct(
                     id=reading.device.location.id,
                     name=reading.device.location.name,
                     description=reading.device.location.description,
-                    created_at=reading.device.location.created_at.strftime("%Y-%m-%d %H:%M:%S"),
-                    updated_at=reading.device.location.updated_at.strftime("%Y-%m-%d %H:%M:%S"),
                 ),
-                created_at=reading.device.created_at.strftime("%Y-%m-%d %H:%M:%S"),
-                updated_at=reading.device.updated_at.strftime("%Y-%m-%d %H:%M:%S"),
             )
+
+        return ReadingResponse.model_construct(
+            id=reading.id,
+            user_id=reading.user_id,
+            device_id=reading.device_id,
+            unit=reading.unit,
+            value=reading.value,
+            user=user,
+            device=device,
         )
 
     def save(self, reading: ReadingCreateRequest) -> ReadingCreateResponse:
@@ -269,18 +837,15 @@ class ReadingService:
             ReadingCreateResponse: The response data of the created reading.
 
         Raises:
-            HTTPException: If a reading with the same device_id already exists.
+            HTTPException: If there is an internal server error.
         """
         try:
-            existing = self.db.query(Reading).filter(Reading.device_id == reading.device_id).first()
-            if existing:
-                raise HTTPException(
-                    status_code=422, detail="Reading with this device_id already exists"
-                )
             data = reading.dict(exclude_unset=True)
 
             item = Reading(**data)
             self.db.add(item)
+            self.db.flush()
+            upsert_last_readings(self.db, [last_reading_row(item)])
             self.db.commit()
             self.db.refresh(item)
 
@@ -299,6 +864,73 @@ class ReadingService:
             logging.error(f"Error occurred while saving reading: {str(e)}")
             raise HTTPException(status_code=500, detail="Internal server error")
 
+    def save_many(self, readings: List[ReadingCreateRequest]) -> List[dict]:
+        """
+        Save a batch of readings with multi-row inserts.
+
+        The referenced devices and users are validated for the whole batch with one
+        lookup each, and items pointing at unknown records are rejected. Every remaining
+        item is written inside one transaction, together with the last reading of the
+        devices it touches. On PostgreSQL SQLAlchemy sends the rows as multi-row
+        INSERT ... RETURNING statements of up to a thousand rows each and matches the
+        returned keys to the rows. SQLite cannot match them, so it gets one INSERT per
+        row.
+
+        Args:
+            readings (List[ReadingCreateRequest]): The reading create request objects.
+
+        Returns:
+            List[dict]: The outcome of each item, in submission order.
+
+        Raises:
+            HTTPException: If there is an internal server error.
+        """
+        try:
+            device_ids = {reading.device_id for reading in readings}
+            user_ids = {reading.user_id for reading in readings}
+
+            known_devices = {id for (id,) in self.db.query(Device.id).filter(Device.id.in_(device_ids))}
+            known_users = {id for (id,) in self.db.query(User.id).filter(User.id.in_(user_ids))}
+
+            results = []
+            rows = []
+            for index, reading in enumerate(readings):
+                if reading.device_id not in known_devices:
+                    results.append({"index": index, "status": "rejected", "detail": "Device not found"})
+                elif reading.user_id not in known_users:
+                    results.append({"index": index, "status": "rejected", "detail": "User not found"})
+                else:
+                    result = {"index": index, "status": "created"}
+                    results.append(result)
+                    rows.append((result, reading.dict()))
+
+            if rows:
+                inserted = self.db.execute(
+                    insert(Reading).returning(Reading.id, Reading.created_at, sort_by_parameter_order=True),
+                    [data for _, data in rows],
+                ).all()
+
+                last_readings = []
+                for (result, data), (id, created_at) in zip(rows, inserted):
+                    result["id"] = id
+                    last_readings.append({
+                        "device_id": data["device_id"],
+                        "reading_id": id,
+                        "user_id": data["user_id"],
+                        "unit": data["unit"],
+                        "value": data["value"],
+                        "value_num": parse_number(data["value"]),
+                        "read_at": created_at,
+                    })
+                upsert_last_readings(self.db, last_readings)
+                self.db.commit()
+
+            return results
+        except DatabaseError as e:
+            self.db.rollback()
+            logging.error(f"Error occurred while saving readings: {str(e)}")
+            raise HTTPException(status_code=500, detail="Internal server error")
+
     def update(self, id: int, reading: ReadingUpdateRequest) -> ReadingUpdateResponse:
         """
         Update a reading in the database.
@@ -313,9 +945,12 @@ class ReadingService:
         try:
             item = self.get_by_id(id)
             data = reading.dict(exclude_unset=True)
+            device_ids = {item.device_id}
 
             for key, value in data.items():
                 setattr(item, key, value)
+            self.db.flush()
+            refresh_last_readings(self.db, device_ids | {item.device_id})
             self.db.commit()
             self.db.refresh(item)
             response_data = {
@@ -348,6 +983,8 @@ class ReadingService:
         try:
             item = self.get_by_id(id)
             self.db.delete(item)
+            self.db.flush()
+            refresh_last_readings(self.db, [item.device_id])
             self.db.commit()
             response_data = {
                 "id": item.id,
@@ -362,3 +999,11 @@ class ReadingService:
         except DatabaseError as e:
             logging.error(f"Error occurred while deleting reading: {str(e)}")
             raise HTTPException(status_code=500, detail="Internal server error")
+
+
+class AsyncReadingService(AsyncService):
+    """
+    Async variant of ReadingService, awaited by the routes.
+    """
+
+    service_class = ReadingService
@@ -0,0 +1,99 @@
+import functools
+import inspect
+from contextlib import contextmanager
+from typing import Iterator
+
+from sqlalchemy.orm import Session
+
+READ_ONLY = "read_only"
+PRIMARY = "primary"
+READ_CONSISTENCIES = ("eventual", "strong")
+
+
+@contextmanager
+def replica_reads(db: Session) -> Iterator[Session]:
+    """
+    Route the queries of a session to a read replica for the duration of a block.
+
+    Blocks can be nested. Flushes and INSERT, UPDATE and DELETE statements always
+    go to the primary, and sessions without replicas, or objects standing in for a
+    session, are unaffected.
+
+    Args:
+        db (Session): The session, or an AsyncSession.
+
+    Yields:
+        Session: The same session.
+    """
+    info = getattr(db, "info", None)
+    if not isinstance(info, dict):
+        yield db
+        return
+
+    info[READ_ONLY] = info.get(READ_ONLY, 0) + 1
+    try:
+        yield db
+    finally:
+        info[READ_ONLY] -= 1
+
+
+def use_primary(db: Session) -> Session:
+    """
+    Send every later query of a session to the primary, to read its own writes.
+
+    Sessions switch to the primary by themselves after their first write, so this
+    is only needed to see writes made by earlier requests or other processes.
+
+    Args:
+        db (Session): The session, or an AsyncSession.
+
+    Returns:
+        Session: The same session.
+    """
+    db.info[PRIMARY] = True
+    return db
+
+
+def read_only(method):
+    """
+    Mark a service method as read-only, so that its queries may use a read replica.
+
+    Generators returned by the method, such as the exports, keep reading from the
+    replica while they are consumed.
+
+    Args:
+        method: The service method, whose instance has a db attribute.
+
+    Returns:
+        The wrapped method.
+    """
+
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with replica_reads(self.db):
+            result = method(self, *args, **kwargs)
+        if inspect.isgenerator(result):
+            return replica_generator(self.db, result)
+        return result
+
+    return wrapper
+
+
+def replica_generator(db: Session, generator: Iterator) -> Iterator:
+    """
+    Consume a generator with the replica routing of a session enabled.
+
+    Args:
+        db (Session): The session the generator queries.
+        generator (Iterator): The generator.
+
+    Yields:
+        The items of the generator.
+    """
+    while True:
+        with replica_reads(db):
+            try:
+                item = next(generator)
+            except StopIteration:
+                return
+        yield item
@@ -0,0 +1,215 @@
+import logging
+import time
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional
+
+from fastapi import HTTPException
+from sqlalchemy import or_, select, text, true
+from sqlalchemy.exc import DatabaseError
+from sqlalchemy.orm import Session
+
+from app.models.device import Device
+from app.models.partition import add_months, monthly_partitions
+from app.models.reading import Reading
+from app.models.reading_rollup import ReadingRollup
+from app.models.retention_policy import RetentionPolicy
+from app.services.rollup import ROLLUP_WIDTHS, RollupService
+
+RETENTION_BATCH_SIZE = 5000
+
+
+def report(target: str, category_id: Optional[int], rows: int, seconds: float) -> dict:
+    """
+    Describe the rows removed by one step of a retention run and log it.
+
+    Args:
+        target (str): What was removed, e.g. 'readings' or 'rollups_3600'.
+        category_id (Optional[int]): The category of the policy, None for the default policy.
+        rows (int): The number of rows removed.
+        seconds (float): The time the step took.
+
+    Returns:
+        dict: The target, category, rows, seconds and rows per second.
+    """
+    rows_per_second = rows / seconds if seconds > 0 else float(rows)
+    logging.info(
+        f"Retention removed {rows} {target} rows for category {category_id} "
+        f"in {seconds:.2f}s ({rows_per_second:.0f} rows/s)"
+    )
+    return {
+        "target": target,
+        "category_id": category_id,
+        "rows": rows,
+        "seconds": round(seconds, 3),
+        "rows_per_second": round(rows_per_second, 1),
+    }
+
+
+class RetentionService:
+    """
+    Service class applying the retention policies to readings and rollups.
+
+    Raw readings are only removed once the rollups hold them, that is up to the
+    rollup watermark, so charts keep their history at the rollup resolution. Rows
+    are deleted in batches of batch_size, each in its own short transaction, so no
+    lock is held for long. On a partitioned readings table, monthly partitions
+    older than every policy are dropped whole instead.
+    """
+
+    def __init__(self, db: Session):
+        """
+        Initialize the RetentionService class.
+
+        Args:
+            db (Session): The database session.
+        """
+        self.db = db
+
+    def apply(self, now: datetime = None, batch_size: int = RETENTION_BATCH_SIZE, pause: float = 0) -> List[dict]:
+        """
+        Remove the readings and rollups that are older than their policy allows.
+
+        Args:
+            now (datetime): The current naive UTC time, for tests.
+            batch_size (int): The number of rows deleted per transaction.
+            pause (float): Seconds to sleep between batches, to leave room for other traffic.
+
+        Returns:
+            List[dict]: One report per step, see report().
+
+        Raises:
+            HTTPException: If there is an internal server error.
+        """
+        now = now or datetime.now(timezone.utc).replace(tzinfo=None)
+        try:
+            policies = self.db.query(RetentionPolicy).order_by(RetentionPolicy.id).all()
+            watermark = RollupService(self.db).watermark()
+            if watermark is None:
+                logging.warning("Raw readings are kept until the reading rollups have been refreshed")
+
+            reports = self.drop_partitions(policies, now, watermark)
+            categorized = [policy.category_id for policy in policies if policy.category_id is not None]
+
+            for policy in policies:
+                in_scope = self.devices_filter(policy, categorized)
+
+                if policy.raw_days is not None and watermark is not None:
+                    cutoff = now - timedelta(days=policy.raw_days)
+                    filters = [Reading.created_at < cutoff, Reading.id <= watermark, in_scope(Reading.device_id)]
+                    reports.append(self.purge(Reading, filters, "readings", policy.category_id, batch_size, pause))
+
+                for width in ROLLUP_WIDTHS:
+                    days = policy.rollup_days(width)
+                    if days is None:
+                        continue
+                    filters = [
+                        ReadingRollup.width == width,
+                        ReadingRollup.bucket_start < now - timedelta(days=days),
+                        in_scope(ReadingRollup.device_id),
+                    ]
+                    reports.append(
+                        self.purge(ReadingRollup, filters, f"rollups_{width}", policy.category_id, batch_size, pause)
+                    )
+
+            return reports
+        except DatabaseError as e:
+            self.db.rollback()
+            logging.error(f"Error occurred while applying the retention policies: {str(e)}")
+            raise HTTPException(status_code=500, detail="Internal server error")
+
+    def devices_filter(self, policy: RetentionPolicy, categorized: List[int]):
+        """
+        Build a filter restricting a device ID column to the devices a policy covers.
+
+        Args:
+            policy (RetentionPolicy): The policy.
+            categorized (List[int]): The categories that have a policy of their own.
+
+        Returns:
+            Callable: A function turning a device ID column into a filter clause.
+        """
+        if policy.category_id is not None:
+            devices = select(Device.id).where(Device.category_id == policy.category_id)
+            return lambda column: column.in_(devices)
+
+        if not categorized:
+            return lambda column: true()
+
+        devices = select(Device.id).where(or_(Device.category_id.is_(None), Device.category_id.notin_(categorized)))
+        return lambda column: or_(column.is_(None), column.in_(devices))
+
+    def purge(
+        self, model, filters: list, target: str, category_id: Optional[int], batch_size: int, pause: float
+    ) -> dict:
+        """
+        Delete the rows of a model matching some filters, batch_size rows per transaction.
+
+        Each batch selects the next IDs in order and deletes them together with the
+        original filters, which keeps the created_at bound for partition pruning.
+
+        Args:
+            model: The model class, with an id column.
+            filters (list): The filter clauses of the rows to delete.
+            target (str): The name of the target in the report.
+            category_id (Optional[int]): The category of the policy.
+            batch_size (int): The number of rows deleted per transaction.
+            pause (float): Seconds to sleep between batches.
+
+        Returns:
+            dict: The report of the step.
+        """
+        start = time.perf_counter()
+        deleted = 0
+
+        while True:
+            ids = [row.id for row in self.db.query(model.id).filter(*filters).order_by(model.id).limit(batch_size)]
+            if not ids:
+                break
+            deleted += self.db.query(model).filter(model.id.in_(ids), *filters).delete(synchronize_session=False)
+            self.db.commit()
+            if len(ids) < batch_size:
+                break
+            if pause:
+                time.sleep(pause)
+
+        self.db.commit()
+        return report(target, category_id, deleted, time.perf_counter() - start)
+
+    def drop_partitions(self, policies: List[RetentionPolicy], now: datetime, watermark: Optional[int]) -> List[dict]:
+        """
+        Drop the monthly reading partitions that every policy has expired.
+
+        A partition is dropped when the default policy and every category policy
+        limit the raw readings, the whole month is older than the longest of them,
+        and all its readings are in the rollups. Other tables are left alone.
+
+        Args:
+            policies (List[RetentionPolicy]): All retention policies.
+            now (datetime): The current naive UTC time.
+            watermark (Optional[int]): The rollup watermark.
+
+        Returns:
+            List[dict]: One report per dropped partition, with the estimated row count.
+        """
+        has_default = any(policy.category_id is None for policy in policies)
+        if watermark is None or not has_default or any(policy.raw_days is None for policy in policies):
+            return []
+
+        cutoff = now - timedelta(days=max(policy.raw_days for policy in policies))
+        reports = []
+
+        for name, month in monthly_partitions(self.db.connection(), Reading.__tablename__):
+            if datetime.combine(add_months(month, 1), datetime.min.time()) > cutoff:
+                break
+            if (self.db.execute(text(f"SELECT max(id) FROM {name}")).scalar() or 0) > watermark:
+                break
+
+            start = time.perf_counter()
+            rows = self.db.execute(
+                text("SELECT reltuples::bigint FROM pg_class WHERE relname = :name"), {"name": name}
+            ).scalar()
+            self.db.execute(text(f"DROP TABLE {name}"))
+            self.db.commit()
+            reports.append(report(f"partition {name}", None, max(rows or 0, 0), time.perf_counter() - start))
+
+        return reports
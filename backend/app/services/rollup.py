@@ -0,0 +1,430 @@
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Tuple
+
+from fastapi import HTTPException
+from sqlalchemy import func, select, text
+from sqlalchemy.exc import DatabaseError
+from sqlalchemy.orm import Session
+
+from app.models.reading import Reading
+from app.models.reading_rollup import ReadingRollup
+from app.models.rollup_gap import RollupGap
+from app.models.rollup_watermark import RollupWatermark
+from app.services.async_service import AsyncService
+from app.services.reading import AGGREGATE_BUCKETS, ReadingService, summarize_partial, validate_aggregate
+from app.services.replica import read_only
+
+ROLLUP_WIDTHS = (60, 3600, 86400)
+ROLLUP_NAME = "readings"
+ROLLUP_GAP_SECONDS = 3600
+ROLLUP_LOCK_KEY = 0x726F6C6C7570
+
+
+def to_epoch(value: datetime) -> int:
+    """
+    Convert a naive UTC datetime into Unix seconds.
+
+    Args:
+        value (datetime): The datetime.
+
+    Returns:
+        int: The Unix seconds.
+    """
+    return int(value.replace(tzinfo=timezone.utc).timestamp())
+
+
+def from_epoch(seconds: int) -> datetime:
+    """
+    Convert Unix seconds into a naive UTC datetime.
+
+    Args:
+        seconds (int): The Unix seconds.
+
+    Returns:
+        datetime: The datetime.
+    """
+    return datetime.fromtimestamp(seconds, tz=timezone.utc).replace(tzinfo=None)
+
+
+def missing_ranges(ids: List[int], after_id: int, upto_id: int) -> List[Tuple[int, int]]:
+    """
+    List the IDs of a range that are not in a sorted list, as inclusive ranges.
+
+    Args:
+        ids (List[int]): The IDs present, in ascending order.
+        after_id (int): The range starts after this ID.
+        upto_id (int): The range ends with this ID.
+
+    Returns:
+        List[Tuple[int, int]]: The first and last ID of each run of missing IDs.
+    """
+    ranges = []
+    expected = after_id + 1
+    for id in ids:
+        if id > expected:
+            ranges.append((expected, id - 1))
+        expected = id + 1
+    if expected <= upto_id:
+        ranges.append((expected, upto_id))
+    return ranges
+
+
+def utcnow() -> datetime:
+    """
+    The current time as a naive UTC datetime, as stored by the models.
+
+    Returns:
+        datetime: The current time.
+    """
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def merge_partial(into: dict, partial: dict):
+    """
+    Merge a partial aggregate into another covering the same bucket.
+
+    Args:
+        into (dict): The partial that is updated in place.
+        partial (dict): The partial to merge.
+    """
+    into["count"] += partial["count"]
+    into["sum"] += partial["sum"]
+    into["min"] = min(into["min"], partial["min"])
+    into["max"] = max(into["max"], partial["max"])
+    if (partial["last_at"], partial["last_id"]) > (into["last_at"], into["last_id"]):
+        into["last_value"] = partial["last_value"]
+        into["last_at"] = partial["last_at"]
+        into["last_id"] = partial["last_id"]
+
+
+class RollupService:
+    """
+    Service class for maintaining and querying the reading rollups.
+
+    The rollups hold per-device partial aggregates at 1 minute, 1 hour and 1 day
+    widths. They are refreshed incrementally from a watermark on the reading ID, so
+    a refresh only reads readings inserted since the previous one. Updates and
+    deletes of readings that were already rolled up are not reflected.
+
+    A transaction can commit a reading after a refresh passed its ID. The IDs a
+    refresh finds missing below the watermark are therefore kept as gaps, and the
+    readings that appear there later are folded in by the next refreshes. A gap
+    expires after ROLLUP_GAP_SECONDS, when its IDs are taken as rolled back.
+
+    Every refresh transaction holds a lock on the rollups, so overlapping refreshes
+    fold each ID range once.
+    """
+
+    def __init__(self, db: Session):
+        """
+        Initialize the RollupService class.
+
+        Args:
+            db (Session): The database session.
+        """
+        self.db = db
+
+    def watermark(self) -> int:
+        """
+        Retrieve the highest reading ID up to which every reading is folded into the rollups.
+
+        Readings may still appear in the gaps below the last refreshed ID, so the
+        watermark stops before the first gap.
+
+        Returns:
+            int: The reading ID, or None when the rollups were never refreshed.
+        """
+        watermark = self.db.get(RollupWatermark, ROLLUP_NAME)
+        if not watermark:
+            return None
+        first_gap = self.db.query(func.min(RollupGap.first_id)).filter(RollupGap.name == ROLLUP_NAME).scalar()
+        if first_gap is None:
+            return watermark.last_reading_id
+        return min(watermark.last_reading_id, first_gap - 1)
+
+    def gaps(self) -> List[Tuple[int, int]]:
+        """
+        List the open gaps of the rollups.
+
+        Returns:
+            List[Tuple[int, int]]: The first and last reading ID of each gap, in ID order.
+        """
+        gaps = self.db.query(RollupGap.first_id, RollupGap.last_id).filter(RollupGap.name == ROLLUP_NAME)
+        return [tuple(gap) for gap in gaps.order_by(RollupGap.first_id)]
+
+    def lock(self) -> RollupWatermark:
+        """
+        Lock the rollups until the end of the transaction and read the watermark.
+
+        PostgreSQL takes a transaction-level advisory lock, which also covers the
+        first refresh when there is no watermark row yet, and SQLite takes the
+        database write lock with BEGIN IMMEDIATE. A concurrent refresh waits for the
+        lock and then sees the watermark this transaction commits.
+
+        Returns:
+            RollupWatermark: The watermark, added to the session when missing.
+        """
+        dialect = self.db.get_bind().dialect.name
+        if dialect == "postgresql":
+            self.db.execute(select(func.pg_advisory_xact_lock(ROLLUP_LOCK_KEY)))
+        elif dialect == "sqlite":
+            # BEGIN IMMEDIATE must open the transaction, so nothing may be pending.
+            self.db.commit()
+            self.db.execute(text("BEGIN IMMEDIATE"))
+
+        query = self.db.query(RollupWatermark).filter(RollupWatermark.name == ROLLUP_NAME)
+        watermark = query.with_for_update().populate_existing().one_or_none()
+        if not watermark:
+            watermark = RollupWatermark(name=ROLLUP_NAME, last_reading_id=0)
+            self.db.add(watermark)
+        return watermark
+
+    def refresh(self, batch_size: int = 10000, gap_seconds: int = ROLLUP_GAP_SECONDS) -> int:
+        """
+        Fold the readings inserted since the last refresh into the rollups.
+
+        The readings that appeared in the open gaps are folded in first. New readings
+        are then processed in ID order, batch_size at a time, and each batch is
+        committed together with the new watermark and the gaps it found. Each
+        transaction holds the lock taken by lock(), and the watermark is read again
+        under it, so a concurrent refresh never folds the same IDs.
+
+        Args:
+            batch_size (int): The number of reading IDs processed per transaction.
+            gap_seconds (int): Seconds after which a gap is given up.
+
+        Returns:
+            int: The number of reading IDs processed, counting the readings found in gaps.
+
+        Raises:
+            HTTPException: If there is an internal server error.
+        """
+        try:
+            reading_service = ReadingService(self.db)
+            processed = self.fill_gaps(reading_service, gap_seconds)
+            max_id = self.db.query(func.max(Reading.id)).scalar() or 0
+
+            while True:
+                watermark = self.lock()
+                after_id = watermark.last_reading_id
+                if after_id >= max_id:
+                    break
+                upto_id = min(max_id, after_id + batch_size)
+                found_at = utcnow()
+                self.db.add_all(
+                    RollupGap(name=ROLLUP_NAME, first_id=first_id, last_id=last_id, created_at=found_at)
+                    for first_id, last_id in self.fold(reading_service, after_id, upto_id)
+                )
+                watermark.last_reading_id = upto_id
+                watermark.updated_at = func.current_timestamp()
+                self.db.commit()
+                processed += upto_id - after_id
+
+            self.db.commit()
+            return processed
+        except DatabaseError as e:
+            self.db.rollback()
+            logging.error(f"Error occurred while refreshing the reading rollups: {str(e)}")
+            raise HTTPException(status_code=500, detail="Internal server error")
+
+    def fold(self, reading_service: ReadingService, after_id: int, upto_id: int) -> List[Tuple[int, int]]:
+        """
+        Merge the readings of an ID range into the rollups.
+
+        The IDs present are read first and the missing ones are left out of the
+        partials, so a reading committed in between stays in a gap and is folded
+        exactly once.
+
+        Args:
+            reading_service (ReadingService): The reading service of the session.
+            after_id (int): The range starts after this ID.
+            upto_id (int): The range ends with this ID.
+
+        Returns:
+            List[Tuple[int, int]]: The ranges of IDs that held no reading.
+        """
+        ids = self.db.query(Reading.id).filter(Reading.id > after_id, Reading.id <= upto_id).order_by(Reading.id)
+        ids = [id for (id,) in ids]
+        missing = missing_ranges(ids, after_id, upto_id)
+        if ids:
+            for width in ROLLUP_WIDTHS:
+                partials = reading_service.partials(width, after_id=after_id, upto_id=upto_id, skip=missing)
+                self.merge_rollups(width, partials)
+        return missing
+
+    def fill_gaps(self, reading_service: ReadingService, gap_seconds: int) -> int:
+        """
+        Fold the readings that appeared in the open gaps into the rollups.
+
+        Gaps are narrowed to the IDs still missing, and dropped once older than
+        gap_seconds. The gaps are read and committed under the lock.
+
+        Args:
+            reading_service (ReadingService): The reading service of the session.
+            gap_seconds (int): Seconds after which a gap is given up.
+
+        Returns:
+            int: The number of readings found in the gaps.
+        """
+        self.lock()
+        expired = utcnow() - timedelta(seconds=gap_seconds)
+        found = 0
+        for gap in self.db.query(RollupGap).filter(RollupGap.name == ROLLUP_NAME).order_by(RollupGap.first_id).all():
+            missing = self.fold(reading_service, gap.first_id - 1, gap.last_id)
+            found += gap.last_id - gap.first_id + 1 - sum(last_id - first_id + 1 for first_id, last_id in missing)
+            if missing == [(gap.first_id, gap.last_id)] and gap.created_at >= expired:
+                continue
+
+            self.db.delete(gap)
+            if gap.created_at >= expired:
+                self.db.add_all(
+                    RollupGap(name=ROLLUP_NAME, first_id=first_id, last_id=last_id, created_at=gap.created_at)
+                    for first_id, last_id in missing
+                )
+        self.db.commit()
+        return found
+
+    def merge_rollups(self, width: int, partials: List[dict]):
+        """
+        Merge partial aggregates into the rollup rows of one width.
+
+        Args:
+            width (int): The bucket width in seconds.
+            partials (List[dict]): The partials, as returned by ReadingService.partials.
+        """
+        if not partials:
+            return
+
+        buckets = [from_epoch(partial["bucket"]) for partial in partials]
+        existing = self.db.query(ReadingRollup).filter(
+            ReadingRollup.width == width,
+            ReadingRollup.device_id.in_({partial["device_id"] for partial in partials}),
+            ReadingRollup.bucket_start.between(min(buckets), max(buckets)),
+        )
+        rollups = {(rollup.device_id, rollup.bucket_start): rollup for rollup in existing}
+
+        for partial, bucket_start in zip(partials, buckets):
+            rollup = rollups.get((partial["device_id"], bucket_start))
+            if rollup is None:
+                self.db.add(ReadingRollup(
+                    device_id=partial["device_id"],
+                    width=width,
+                    bucket_start=bucket_start,
+                    count=partial["count"],
+                    sum=partial["sum"],
+                    min=partial["min"],
+                    max=partial["max"],
+                    last_value=partial["last_value"],
+                    last_at=partial["last_at"],
+                    last_reading_id=partial["last_id"],
+                ))
+                continue
+
+            merged = self.to_partial(rollup)
+            merge_partial(merged, partial)
+            rollup.count = merged["count"]
+            rollup.sum = merged["sum"]
+            rollup.min = merged["min"]
+            rollup.max = merged["max"]
+            rollup.last_value = merged["last_value"]
+            rollup.last_at = merged["last_at"]
+            rollup.last_reading_id = merged["last_id"]
+            rollup.updated_at = func.current_timestamp()
+
+    @read_only
+    def aggregate(
+        self, device_id: int, bucket: str, fns: List[str], start_date: str = None, end_date: str = None
+    ) -> List[dict]:
+        """
+        Aggregate the numeric readings of a device into time buckets using the rollups.
+
+        The coarsest rollup width that divides the bucket is read and folded into the
+        requested buckets, and readings newer than the watermark or in its gaps are
+        aggregated from the readings table and merged in. Before the first refresh every bucket is
+        computed from the readings table.
+
+        Args:
+            device_id (int): The ID of the device.
+            bucket (str): The bucket width (1m, 5m, 15m, 1h or 1d).
+            fns (List[str]): The functions to compute (avg, min, max, count or last).
+            start_date (str): The start date for the filter (YYYY-MM-DD).
+            end_date (str): The end date for the filter (YYYY-MM-DD).
+
+        Returns:
+            List[dict]: One entry per bucket with the bucket start and the requested functions.
+
+        Raises:
+            HTTPException: If the bucket or a function is invalid, or there is an internal server error.
+        """
+        validate_aggregate(bucket, fns)
+        reading_service = ReadingService(self.db)
+
+        try:
+            watermark = self.db.get(RollupWatermark, ROLLUP_NAME)
+            if watermark is None:
+                return reading_service.aggregate(device_id, bucket, fns, start_date=start_date, end_date=end_date)
+
+            seconds = AGGREGATE_BUCKETS[bucket]
+            width = max(width for width in ROLLUP_WIDTHS if seconds % width == 0)
+
+            query = self.db.query(ReadingRollup).filter(
+                ReadingRollup.width == width, ReadingRollup.device_id == device_id
+            )
+            if start_date:
+                query = query.filter(ReadingRollup.bucket_start >= str(start_date) + ' 00:00:00')
+            if end_date:
+                query = query.filter(ReadingRollup.bucket_start <= str(end_date) + ' 23:59:59')
+
+            merged: Dict[int, dict] = {}
+            partials = [self.to_partial(rollup) for rollup in query]
+            # Read the readings above the watermark and in the gaps, skipping the
+            # ranges between the gaps, which are in the rollups already.
+            gaps = self.gaps()
+            ends = [first_id - 1 for first_id, _ in gaps[1:]] + [watermark.last_reading_id]
+            folded = [(last_id + 1, end) for (_, last_id), end in zip(gaps, ends) if last_id < end]
+            partials += reading_service.partials(
+                seconds, device_id=device_id, start_date=start_date, end_date=end_date,
+                after_id=gaps[0][0] - 1 if gaps else watermark.last_reading_id, skip=folded
+            )
+            for partial in partials:
+                start = partial["bucket"] // seconds * seconds
+                if start in merged:
+                    merge_partial(merged[start], partial)
+                else:
+                    merged[start] = {**partial, "bucket": start}
+
+            return [summarize_partial(merged[start], fns) for start in sorted(merged)]
+        except DatabaseError as e:
+            logging.error(f"Error occurred while aggregating reading rollups: {str(e)}")
+            raise HTTPException(status_code=500, detail="Internal server error")
+
+    def to_partial(self, rollup: ReadingRollup) -> dict:
+        """
+        Convert a rollup row into a partial aggregate.
+
+        Args:
+            rollup (ReadingRollup): The rollup row.
+
+        Returns:
+            dict: The partial with its bucket start as Unix seconds.
+        """
+        return {
+            "device_id": rollup.device_id,
+            "bucket": to_epoch(rollup.bucket_start),
+            "count": rollup.count,
+            "sum": rollup.sum,
+            "min": rollup.min,
+            "max": rollup.max,
+            "last_value": rollup.last_value,
+            "last_at": rollup.last_at,
+            "last_id": rollup.last_reading_id,
+        }
+
+
+class AsyncRollupService(AsyncService):
+    """
+    Async variant of RollupService, awaited by the routes.
+    """
+
+    service_class = RollupService
@@ -0,0 +1,67 @@
+from typing import Sequence
+
+from sqlalchemy import column, func, literal_column, or_, table
+from sqlalchemy.orm import Query
+
+from app.models.search import search_table_name
+
+MIN_TRIGRAM_LENGTH = 3
+
+
+def escape_like(text: str) -> str:
+    """
+    Escape the LIKE wildcards in a search text.
+
+    Args:
+        text (str): The search text.
+
+    Returns:
+        str: The text with backslash-escaped wildcards.
+    """
+    return text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def search(query: Query, model, columns: Sequence, q: str) -> Query:
+    """
+    Restrict a query to rows whose text columns contain the search text, best matches first.
+
+    On PostgreSQL the match is an ILIKE served by the pg_trgm GIN indexes and rows
+    are ranked by trigram similarity. On SQLite the match goes through the FTS5
+    trigram table and rows are ranked by bm25. Texts shorter than a trigram, and
+    other databases, fall back to an unranked LIKE.
+
+    The ranking is added as the first ORDER BY term, so it must be applied before
+    the listing's own sort, which then breaks ties.
+
+    Args:
+        query (Query): The query on the model.
+        model: The model class, whose table was registered with register_search_index.
+        columns (Sequence): The indexed columns of the model.
+        q (str): The search text.
+
+    Returns:
+        Query: The filtered and ranked query.
+    """
+    q = q.strip()
+    dialect = query.session.get_bind().dialect.name
+    pattern = f"%{escape_like(q)}%"
+
+    if dialect == "postgresql":
+        query = query.filter(or_(*(field.ilike(pattern, escape="\\") for field in columns)))
+        if len(q) >= MIN_TRIGRAM_LENGTH:
+            rank = func.greatest(*(func.similarity(field, q) for field in columns))
+            query = query.order_by(rank.desc())
+        return query
+
+    if dialect == "sqlite" and len(q) >= MIN_TRIGRAM_LENGTH:
+        name = search_table_name(model.__table__.name)
+        fts = table(name, column("rowid"), column("rank"))
+        phrase = '"' + q.replace('"', '""') + '"'
+        matches = (
+            query.session.query(fts.c.rowid.label("id"), fts.c.rank.label("rank"))
+            .filter(literal_column(name).op("MATCH")(phrase))
+            .subquery()
+        )
+        return query.join(matches, matches.c.id == model.id).order_by(matches.c.rank)
+
+    return query.filter(or_(*(field.like(pattern, escape="\\") for field in columns)))
@@ -1,5 +1,6 @@
 import logging
-from typing import List, Tuple, Union
+from datetime import datetime
+from typing import List, Optional, Tuple, Union
 
 from fastapi import HTTPException
 from sqlalchemy.exc import DatabaseError
@@ -7,7 +8,12 @@ from sqlalchemy.orm import Session
 
 from app.models.user import User
 from app.requests.user import UserCreateRequest, UserUpdateRequest
+from app.responses.serialization import format_timestamp
 from app.responses.user import UserCreateResponse, UserResponse, UserUpdateResponse
+from app.services.async_service import AsyncService
+from app.services.pagination import paginate_by_cursor, paginate_by_offset
+from app.services.replica import read_only
+from app.services.search import search
 
 
 class UserService:
@@ -42,6 +48,7 @@ class UserService:
             raise HTTPException(status_code=404, detail="User not found")
         return user
 
+    @read_only
     def all(
         self,
         page: int,
@@ -52,7 +59,9 @@ class UserService:
         end_date: str = None,
         username: str = None,
         email: str = None,
-    ) -> Tuple[List[UserResponse], int, int, int, int]:
+        with_total: str = "exact",
+        q: str = None,
+    ) -> Tuple[List[UserResponse], Optional[int], int, int, int]:
         """
         Retrieve all users with pagination and optional date, username, and email filters.
 
@@ -65,46 +74,88 @@ class UserService:
             end_date (str): The end date for the filter (YYYY-MM-DD).
             username (str): The username filter.
             email (str): The email filter.
+            with_total (str): How to compute the total ('exact', 'estimate' or 'none').
+            q (str): Search text matched against the username and email; ranks page results by relevance.
 
         Returns:
-            Tuple[List[UserResponse], int, int, int, int]: A tuple containing the list of user responses,
+            Tuple[List[UserResponse], Optional[int], int, int, int]: A tuple containing the list of user responses,
             the total number of users, the last page number, the first item number, and the last item number.
 
         Raises:
             HTTPException: If there is an internal server error.
         """
         try:
-            offset = (page - 1) * items_per_page
-
             sort_field = self.get_sort_field(sort_by)
 
             query = self.build_query(
-                sort_field, sort_type, start_date, end_date, username, email
+                sort_field, sort_type, start_date, end_date, username, email, q
             )
 
-            users = query.offset(offset).limit(items_per_page).all()
-
-            responses = [
-                UserResponse(
-                    id=user.id,
-                    username=user.username,
-                    email=user.email,
-                    created_at=user.created_at.strftime("%Y-%m-%d %H:%M:%S"),
-                    updated_at=user.updated_at.strftime("%Y-%m-%d %H:%M:%S"),
-                )
-                for user in users
-            ]
+            users, total_users, last_page, first_item, last_item = paginate_by_offset(
+                query, page, items_per_page, with_total
+            )
 
-            total_users = query.count()
-            last_page = (total_users - 1) // items_per_page + 1
-            first_item = offset + 1
-            last_item = min(offset + items_per_page, total_users)
+            responses = [self.to_response(user) for user in users]
 
             return responses, total_users, last_page, first_item, last_item
 
         except DatabaseError:
             raise HTTPException(status_code=500, detail="Internal server error")
 
+    @read_only
+    def all_by_cursor(
+        self,
+        items_per_page: int,
+        cursor: str = None,
+        sort_type: str = "asc",
+        sort_by: str = "id",
+        start_date: str = None,
+        end_date: str = None,
+        username: str = None,
+        email: str = None,
+        q: str = None,
+    ) -> Tuple[List[UserResponse], Optional[str]]:
+        """
+        Retrieve one keyset page of users with the same filters as all().
+
+        Args:
+            items_per_page (int): The number of items per page.
+            cursor (str): The cursor returned with the previous page, empty for the first page.
+            sort_type (str): The sort type ('asc' or 'desc').
+            sort_by (str): The field to sort by.
+            start_date (str): The start date for the filter (YYYY-MM-DD).
+            end_date (str): The end date for the filter (YYYY-MM-DD).
+            username (str): The username filter.
+            email (str): The email filter.
+            q (str): Search text matched against the username and email.
+
+        Returns:
+            Tuple[List[UserResponse], Optional[str]]: A tuple containing the list of user responses and the cursor of
+                the next page.
+
+        Raises:
+            HTTPException: If q is given, the cursor is invalid or there is an internal server error.
+        """
+        if q:
+            # Keyset pages are ordered by the sort field, which would drop the relevance ranking.
+            raise HTTPException(status_code=400, detail="q cannot be combined with cursor pagination")
+
+        try:
+            sort_field = self.get_sort_field(sort_by)
+
+            query = self.build_query(
+                sort_field, sort_type, start_date, end_date, username, email, q
+            )
+
+            users, next_cursor = paginate_by_cursor(
+                query, sort_field, User.id, sort_type, cursor, items_per_page
+            )
+
+            return [self.to_response(user) for user in users], next_cursor
+
+        except DatabaseError:
+            raise HTTPException(status_code=500, detail="Internal server error")
+
     def get_sort_field(self, sort_by: str):
         """
         Returns the corresponding sort field based on the given sort_by parameter.
@@ -127,7 +178,7 @@ class UserService:
         else:
             raise HTTPException(status_code=400, detail="Invalid sort_by field")
 
-    def build_query(self, sort_field, sort_type, start_date, end_date, username, email):
+    def build_query(self, sort_field, sort_type, start_date, end_date, username, email, q=None):
         """
         Builds a query to retrieve users based on the provided parameters.
 
@@ -138,12 +189,16 @@ class UserService:
             end_date (str): The end date for filtering users.
             username (str): The username to filter users by.
             email (str): The email to filter users by.
+            q (str): Search text; matching rows are ranked first by relevance.
 
         Returns:
             sqlalchemy.orm.query.Query: The query object for retrieving users.
         """
         query = self.db.query(User)
 
+        if q:
+            query = search(query, User, (User.username, User.email), q)
+
         if sort_type == "asc":
             query = query.order_by(sort_field.asc())
         elif sort_type == "desc":
@@ -169,6 +224,7 @@ class UserService:
 
         return query
 
+    @read_only
     def total(self) -> int:
         """
         Get the total number of users.
@@ -178,6 +234,7 @@ class UserService:
         """
         return self.db.query(User).count()
 
+    @read_only
     def find(self, id: int) -> UserResponse:
         """
         Find a user by their ID and return the user response.
@@ -192,12 +249,44 @@ class UserService:
             HTTPException: If the user is not found.
         """
         user = self.get_by_id(id)
-        return UserResponse(
+        return self.to_response(user)
+
+    @read_only
+    def modified_at(self, id: int) -> List[datetime]:
+        """
+        Get when a user was last updated, for conditional requests.
+
+        Args:
+            id (int): The ID of the user.
+
+        Returns:
+            List[datetime]: The updated_at of the user.
+
+        Raises:
+            HTTPException: If the user is not found.
+        """
+        updated_at = self.db.query(User.updated_at).filter(User.id == id).scalar()
+        if updated_at is None:
+            raise HTTPException(status_code=404, detail="User not found")
+        return [updated_at]
+
+    def to_response(self, user: User) -> UserResponse:
+        """
+        Build the user response for a user, without validation since the values
+        come from the database; see json_response.
+
+        Args:
+            user (User): The user object.
+
+        Returns:
+            UserResponse: The user response.
+        """
+        return UserResponse.model_construct(
             id=user.id,
             username=user.username,
             email=user.email,
-            created_at=user.created_at.strftime("%Y-%m-%d %H:%M:%S"),
-            updated_at=user.updated_at.strftime("%Y-%m-%d %H:%M:%S"),
+            created_at=format_timestamp(user.created_at),
+            updated_at=format_timestamp(user.updated_at),
         )
 
     def save(self, user: UserCreateRequest) -> UserCreateResponse:
@@ -312,3 +401,11 @@ class UserService:
         response_data = deleted_users
 
         return response_data
+
+
+class AsyncUserService(AsyncService):
+    """
+    Async variant of UserService, awaited by the routes.
+    """
+
+    service_class = UserService
@@ -31,6 +31,39 @@ class Settings(BaseSettings):
         DB_NAME (str): Name of the database.
         DB_USERNAME (str): Username for the database.
         DB_PASSWORD (str): Password for the database.
+        DB_READ_HOST (str): Comma-separated hosts of read replicas. Read-only queries are
+            spread over them and writes stay on DB_HOST. Empty to read from DB_HOST.
+        DB_ASYNC (bool): Whether routes use the async engine (aiosqlite, asyncpg, aiomysql).
+        DB_POOL_MODE (str): Connection pool kind: 'queue' keeps up to DB_POOL_SIZE connections
+            open, 'null' opens one connection per checkout (for Lambda or an external pooler
+            such as RDS Proxy or PgBouncer), and 'static' reuses a single connection.
+        DB_POOL_SIZE (int): Number of connections kept open by the queue pool.
+        DB_MAX_OVERFLOW (int): Extra connections the queue pool may open under load. The
+            threadpool running the routes' queries is capped at DB_POOL_SIZE + DB_MAX_OVERFLOW
+            threads, so raise both to serve more requests at once.
+        DB_POOL_RECYCLE (int): Seconds after which a connection is replaced, -1 to never recycle.
+        DB_POOL_PRE_PING (bool): Whether to test connections on checkout and replace stale ones.
+        DB_POOL_TIMEOUT (float): Seconds to wait for a free connection before giving up.
+        DB_SESSION_LEAK_SECONDS (float): Seconds after which a session that is still open is
+            logged as a leak, 0 to disable the check.
+        CACHE_MAX_SIZE (int): Entries kept per reference cache (devices, categories and
+            locations by ID), 0 to disable the caches.
+        CACHE_TTL (float): Seconds a cached entry stays valid. Writes invalidate the entry in
+            their own process only, so other processes may serve it for up to this long.
+        CACHE_BACKEND (str): Where listing responses are cached: 'memory' in this process,
+            'redis' shared through CACHE_URL (needs the redis package), or 'none'.
+        CACHE_URL (str): URL of the Redis-protocol server, e.g. redis://localhost:6379/0.
+        CACHE_LISTING_TTL (float): Seconds a cached listing response is served for. Writes
+            through the services invalidate it at once when the backend is shared.
+        CACHE_MAX_AGE (int): The Cache-Control max-age of listing responses; 0 makes clients
+            revalidate with their ETag every time.
+        READING_LISTING_DAYS (int): Days of readings a listing covers when it gives neither
+            start_date nor end_date, so that PostgreSQL reads only the recent partitions; 0
+            lists every reading.
+        COMPRESSION_MIN_SIZE (int): The smallest response body compressed, in bytes.
+        COMPRESSION_ENCODINGS (str): Comma-separated encodings offered in order of preference
+            (zstd, br, gzip); zstd and br need the zstandard and brotli packages. Empty to
+            disable compression.
     """
 
     ALLOWED_ORIGINS: str
@@ -43,6 +76,24 @@ class Settings(BaseSettings):
     DB_NAME: str
     DB_USERNAME: str
     DB_PASSWORD: str
+    DB_READ_HOST: str = ""
+    DB_ASYNC: bool = False
+    DB_POOL_MODE: str = "queue"
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_RECYCLE: int = 1800
+    DB_POOL_PRE_PING: bool = True
+    DB_POOL_TIMEOUT: float = 30
+    DB_SESSION_LEAK_SECONDS: float = 60
+    CACHE_MAX_SIZE: int = 1024
+    CACHE_TTL: float = 60
+    CACHE_BACKEND: str = "memory"
+    CACHE_URL: str = ""
+    CACHE_LISTING_TTL: float = 30
+    CACHE_MAX_AGE: int = 0
+    READING_LISTING_DAYS: int = 31
+    COMPRESSION_MIN_SIZE: int = 500
+    COMPRESSION_ENCODINGS: str = "zstd,br,gzip"
 
     class Config:
         env_file = ".env"
@@ -1,16 +1,238 @@
-from sqlalchemy import create_engine
+import itertools
+import logging
+import threading
+import time
+import weakref
+from typing import AsyncIterator, Dict, Iterator, List, Optional, Type, Union
+
+from fastapi import Header
+from sqlalchemy import create_engine, event
 from sqlalchemy.engine import Engine
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import Session as SQLAlchemySession
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool, NullPool, Pool, QueuePool, StaticPool
+from sqlalchemy.sql.dml import UpdateBase
+from starlette.concurrency import run_in_threadpool
 
+from app.services.replica import PRIMARY, READ_ONLY, use_primary
 from config.app import get_settings
 
+POOL_MODES = ("queue", "null", "static")
+
+
+class PoolMetrics:
+    """
+    Counters describing how an engine's connection pool is used.
+
+    Attributes:
+        checkouts (int): Connections handed out by the pool.
+        checkins (int): Connections returned to the pool.
+        connects (int): New database connections opened.
+        timeouts (int): Checkouts that gave up after DB_POOL_TIMEOUT.
+        wait_seconds_total (float): Time spent waiting for the pool across all checkouts.
+        wait_seconds_max (float): The longest single wait.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.checkouts = 0
+            self.checkins = 0
+            self.connects = 0
+            self.timeouts = 0
+            self.wait_seconds_total = 0.0
+            self.wait_seconds_max = 0.0
+
+    def record_wait(self, seconds: float, timed_out: bool = False):
+        with self._lock:
+            self.wait_seconds_total += seconds
+            self.wait_seconds_max = max(self.wait_seconds_max, seconds)
+            if timed_out:
+                self.timeouts += 1
+
+    def count(self, name: str):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    def snapshot(self, pool: Pool) -> dict:
+        """
+        Combine the counters with the current state of the pool.
+
+        Args:
+            pool (Pool): The pool the counters belong to.
+
+        Returns:
+            dict: The pool class, the counters and, for queue pools, the size,
+            connections checked out and overflow in use.
+        """
+        with self._lock:
+            data = {
+                "pool": getattr(type(pool), "pool_class", type(pool)).__name__,
+                "checkouts": self.checkouts,
+                "checkins": self.checkins,
+                "connects": self.connects,
+                "timeouts": self.timeouts,
+                "wait_seconds_total": round(self.wait_seconds_total, 6),
+                "wait_seconds_max": round(self.wait_seconds_max, 6),
+            }
+        if isinstance(pool, QueuePool):
+            data.update(size=pool.size(), checked_out=pool.checkedout(), overflow=max(pool.overflow(), 0))
+        return data
+
+
+pool_metrics: Dict[str, PoolMetrics] = {}
+
+
+def metered_pool_class(pool_class: Type[Pool], metrics: PoolMetrics) -> Type[Pool]:
+    """
+    Subclass a pool class so that the time spent waiting for a connection is recorded.
+
+    Args:
+        pool_class (Type[Pool]): The pool class.
+        metrics (PoolMetrics): The metrics to record into.
+
+    Returns:
+        Type[Pool]: The metered pool class.
+    """
+
+    class MeteredPool(pool_class):
+        def _do_get(self):
+            start = time.perf_counter()
+            timed_out = False
+            try:
+                return super()._do_get()
+            except PoolTimeoutError:
+                timed_out = True
+                raise
+            finally:
+                metrics.record_wait(time.perf_counter() - start, timed_out)
+
+    MeteredPool.__name__ = f"Metered{pool_class.__name__}"
+    MeteredPool.pool_class = pool_class
+    return MeteredPool
+
+
+def pool_options(name: str, queue_pool_class: Type[Pool] = QueuePool) -> dict:
+    """
+    Build the create_engine pool arguments from the DB_POOL_* settings.
+
+    Args:
+        name (str): The name the engine's metrics are published under.
+        queue_pool_class (Type[Pool]): The pool class used in 'queue' mode.
+
+    Returns:
+        dict: The keyword arguments for create_engine or create_async_engine.
+
+    Raises:
+        ValueError: If DB_POOL_MODE is not supported.
+    """
+    settings = get_settings()
+    mode = settings.DB_POOL_MODE
+    if mode not in POOL_MODES:
+        raise ValueError(f"Unsupported pool mode: {mode}")
+
+    metrics = pool_metrics.setdefault(name, PoolMetrics())
+    pool_class = {"queue": queue_pool_class, "null": NullPool, "static": StaticPool}[mode]
+    options = {
+        "poolclass": metered_pool_class(pool_class, metrics),
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+    }
+    if mode == "queue":
+        options.update(
+            pool_size=settings.DB_POOL_SIZE,
+            max_overflow=settings.DB_MAX_OVERFLOW,
+            pool_timeout=settings.DB_POOL_TIMEOUT,
+        )
+    return options
+
+
+def threadpool_limit() -> Optional[int]:
+    """
+    The most threads the routes may run service calls on at once.
+
+    With the synchronous engine every service call runs on the threadpool and
+    may hold a pooled connection. A queue pool smaller than the threadpool lets
+    threads holding a connection queue behind threads waiting for one, until
+    DB_POOL_TIMEOUT. The threadpool must therefore not exceed
+    DB_POOL_SIZE + DB_MAX_OVERFLOW.
+
+    Returns:
+        Optional[int]: The pool capacity, or None when the pool does not bound the
+            threadpool: null and static pools never wait, and DB_ASYNC does not use
+            the threadpool for queries.
+    """
+    settings = get_settings()
+    if settings.DB_ASYNC or settings.DB_POOL_MODE != "queue":
+        return None
+    return max(settings.DB_POOL_SIZE + settings.DB_MAX_OVERFLOW, 1)
+
 
-def create_database_engine() -> Engine:
+def instrument_engine(name: str, engine: Engine) -> Engine:
+    """
+    Count the checkouts, checkins and new connections of an engine's pool.
+
+    Args:
+        name (str): The name the engine's metrics are published under.
+        engine (Engine): The engine, or the sync_engine of an async engine.
+
+    Returns:
+        Engine: The same engine.
+    """
+    metrics = pool_metrics.setdefault(name, PoolMetrics())
+    event.listen(engine, "checkout", lambda *args: metrics.count("checkouts"))
+    event.listen(engine, "checkin", lambda *args: metrics.count("checkins"))
+    event.listen(engine, "connect", lambda *args: metrics.count("connects"))
+    return engine
+
+
+def database_url(url_formats: dict, host: Optional[str] = None) -> str:
     settings = get_settings()
     database_type = settings.DB_TYPE
     database = settings.DB_NAME
 
+    if database_type not in url_formats:
+        raise ValueError(f"Unsupported database type: {database_type}")
+
+    database_url = url_formats[database_type]
+    if database_type != "sqlite":
+        database_url = database_url.format(
+            username=settings.DB_USERNAME,
+            password=settings.DB_PASSWORD,
+            host=host or settings.DB_HOST,
+            port=settings.DB_PORT,
+            database=database,
+            driver=settings.DB_DRIVER,
+        )
+    return database_url
+
+
+def read_hosts() -> List[str]:
+    """
+    List the read replica hosts configured in DB_READ_HOST.
+
+    SQLite has no replicas, so the setting is ignored for it.
+
+    Returns:
+        List[str]: The hosts, empty when reads go to the primary.
+    """
+    settings = get_settings()
+    hosts = [host.strip() for host in settings.DB_READ_HOST.split(",") if host.strip()]
+    if hosts and settings.DB_TYPE == "sqlite":
+        logging.warning("DB_READ_HOST is ignored for SQLite databases")
+        return []
+    return hosts
+
+
+def create_database_engine(name: str = "primary", host: Optional[str] = None) -> Engine:
+    settings = get_settings()
+    database = settings.DB_NAME
+
     # Mapping for different database types to their URL formats
     url_formats = {
         "sqlite": f"sqlite:///./database/{database}.db",
@@ -19,30 +241,294 @@ def create_database_engine() -> Engine:
         "mssql": "mssql+pyodbc://{username}:{password}@{host}:{port}/{database}?driver={driver}",
     }
 
-    if database_type in url_formats:
-        database_url = url_formats[database_type]
-        if database_type != "sqlite":
-            database_url = database_url.format(
-                username=settings.DB_USERNAME,
-                password=settings.DB_PASSWORD,
-                host=settings.DB_HOST,
-                port=settings.DB_PORT,
-                database=database,
-                driver=settings.DB_DRIVER,
-            )
-        return create_engine(
-            database_url,
-            connect_args={"check_same_thread": False}
-            if database_type == "sqlite"
-            else {},
-        )
+    engine = create_engine(
+        database_url(url_formats, host),
+        connect_args={"check_same_thread": False}
+        if settings.DB_TYPE == "sqlite"
+        else {},
+        **pool_options(name),
+    )
+    return instrument_engine(name, engine)
+
+
+def create_async_database_engine(name: str = "async", host: Optional[str] = None) -> Optional[AsyncEngine]:
+    settings = get_settings()
+    if not settings.DB_ASYNC:
+        return None
 
-    raise ValueError(f"Unsupported database type: {database_type}")
+    database = settings.DB_NAME
+
+    # The same databases through their asyncio drivers
+    url_formats = {
+        "sqlite": f"sqlite+aiosqlite:///./database/{database}.db",
+        "psql": "postgresql+asyncpg://{username}:{password}@{host}:{port}/{database}",
+        "mysql": "mysql+aiomysql://{username}:{password}@{host}:{port}/{database}",
+        "mssql": "mssql+aioodbc://{username}:{password}@{host}:{port}/{database}?driver={driver}",
+    }
+
+    engine = create_async_engine(database_url(url_formats, host), **pool_options(name, AsyncAdaptedQueuePool))
+    instrument_engine(name, engine.sync_engine)
+    return engine
+
+
+class SessionLeakDetector:
+    """
+    Keeps track of open sessions and logs the ones left open for too long.
+
+    Sessions register themselves when created and unregister when closed. Each
+    time a session is opened, at most once per check interval, every session open
+    for longer than the threshold is logged once as a leak.
+    """
+
+    def __init__(self, threshold: float, interval: float = 5.0):
+        self.threshold = threshold
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._sessions: Dict[int, tuple] = {}
+        self._reported = set()
+        self._last_check = 0.0
+
+    def opened(self, session: SQLAlchemySession):
+        key = id(session)
+        now = time.monotonic()
+        with self._lock:
+            reference = weakref.ref(session, lambda _: self.closed(key))
+            self._sessions[key] = (reference, now, threading.current_thread().name)
+        if self.threshold and now - self._last_check >= self.interval:
+            self.check(now)
+
+    def closed(self, key: int):
+        with self._lock:
+            self._sessions.pop(key, None)
+            self._reported.discard(key)
+
+    def open_sessions(self) -> int:
+        with self._lock:
+            return len(self._sessions)
+
+    def check(self, now: Optional[float] = None) -> int:
+        """
+        Log every session open for longer than the threshold that was not reported yet.
+
+        Args:
+            now (Optional[float]): The current monotonic time.
+
+        Returns:
+            int: The number of sessions currently over the threshold.
+        """
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            self._last_check = now
+            leaked = [
+                (key, now - opened_at, thread)
+                for key, (_, opened_at, thread) in self._sessions.items()
+                if now - opened_at > self.threshold
+            ]
+            new = [item for item in leaked if item[0] not in self._reported]
+            self._reported.update(key for key, _, _ in new)
+
+        for key, age, thread in new:
+            logging.warning(f"Database session {key:#x} opened in thread {thread} still open after {age:.1f}s")
+        return len(leaked)
+
+
+session_leak_detector = SessionLeakDetector(get_settings().DB_SESSION_LEAK_SECONDS)
+
+
+class TrackedSession(SQLAlchemySession):
+    """
+    Session registered with the leak detector from creation until close.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        session_leak_detector.opened(self)
+
+    def close(self):
+        try:
+            super().close()
+        finally:
+            session_leak_detector.closed(id(self))
+
+
+class RoutingSession(TrackedSession):
+    """
+    Tracked session that sends read-only work to a read replica.
+
+    Queries run inside a read-only service method, see app.services.replica, go to
+    the replica picked for the session when replicas are configured. Everything
+    else goes to the primary, and after its first write, or once use_primary was
+    called, the session reads from the primary too so it sees its own writes.
+    """
+
+    def get_bind(self, mapper=None, clause=None, **kw):
+        replicas = self.info.get("replicas")
+        if replicas is None or self.info.get(PRIMARY) or self._flushing:
+            return super().get_bind(mapper, clause=clause, **kw)
+
+        if isinstance(clause, UpdateBase):
+            self.info[PRIMARY] = True
+            return super().get_bind(mapper, clause=clause, **kw)
+
+        if not self.info.get(READ_ONLY):
+            return super().get_bind(mapper, clause=clause, **kw)
+
+        if "replica" not in self.info:
+            self.info["replica"] = next(replicas)
+        return self.info["replica"]
+
+
+@event.listens_for(RoutingSession, "after_flush")
+def _read_own_writes(session, flush_context):
+    session.info[PRIMARY] = True
+
+
+def replica_info(engines: List[Engine]) -> dict:
+    """
+    Build the session info that routes read-only work to a set of replicas.
+
+    Each session picks a replica round-robin on its first read-only query and
+    keeps it until closed.
+
+    Args:
+        engines (List[Engine]): The replica engines.
+
+    Returns:
+        dict: The session info, empty without replicas.
+    """
+    return {"replicas": itertools.cycle(engines)} if engines else {}
 
 
 engine = create_database_engine()
-Session = sessionmaker(bind=engine)
+read_engines = [create_database_engine(f"replica-{index}", host) for index, host in enumerate(read_hosts())]
+Session = sessionmaker(bind=engine, class_=RoutingSession, info=replica_info(read_engines))
+
+async_engine = create_async_database_engine()
+async_read_engines = (
+    [create_async_database_engine(f"async-replica-{index}", host) for index, host in enumerate(read_hosts())]
+    if async_engine
+    else []
+)
+AsyncSessionLocal = (
+    async_sessionmaker(
+        async_engine,
+        expire_on_commit=False,
+        sync_session_class=RoutingSession,
+        info=replica_info([item.sync_engine for item in async_read_engines]),
+    )
+    if async_engine
+    else None
+)
+
+
+def get_pool_metrics() -> Dict[str, dict]:
+    """
+    Report the pool metrics of every engine.
+
+    Returns:
+        Dict[str, dict]: The metrics snapshot of each engine, by name.
+    """
+    engines = {"primary": engine}
+    engines.update((f"replica-{index}", item) for index, item in enumerate(read_engines))
+    if async_engine is not None:
+        engines["async"] = async_engine.sync_engine
+        engines.update((f"async-replica-{index}", item.sync_engine) for index, item in enumerate(async_read_engines))
+    metrics = {name: pool_metrics[name].snapshot(item.pool) for name, item in engines.items()}
+    metrics["sessions"] = {
+        "open": session_leak_detector.open_sessions(),
+        "leaked": session_leak_detector.check(),
+    }
+    return metrics
 
 
-def get_session() -> SQLAlchemySession:
+def create_session() -> SQLAlchemySession:
+    """
+    Open a session outside of a request, for handlers, seeders and scripts.
+
+    The caller owns the session and must close it, for example with
+    `with create_session() as db:`.
+
+    Returns:
+        Session: The new session.
+    """
     return Session()
+
+
+def get_session(
+    read_consistency: Optional[str] = Header(
+        None,
+        alias="X-Read-Consistency",
+        pattern="^(eventual|strong)$",
+        description="'strong' reads from the primary instead of a read replica",
+    ),
+) -> Iterator[SQLAlchemySession]:
+    """
+    Provide a session for the duration of one request.
+
+    The transaction is rolled back if the request fails, and the session is
+    always closed afterwards so its connection goes back to the pool.
+
+    Args:
+        read_consistency (Optional[str]): The X-Read-Consistency header. With 'strong'
+            the request reads its own and earlier writes from the primary.
+
+    Yields:
+        Session: The session.
+    """
+    db = Session()
+    if read_consistency == "strong":
+        use_primary(db)
+    try:
+        yield db
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+async def get_async_session(
+    read_consistency: Optional[str] = Header(
+        None,
+        alias="X-Read-Consistency",
+        pattern="^(eventual|strong)$",
+        description="'strong' reads from the primary instead of a read replica",
+    ),
+) -> AsyncIterator[Union[AsyncSession, SQLAlchemySession]]:
+    """
+    Provide the database session of a request to the async routes.
+
+    With DB_ASYNC enabled this is an AsyncSession on the async engine. Otherwise it
+    is a regular session, whose queries the async services run on the threadpool,
+    as are its rollback and close, so neither blocks the event loop. The Lambda handlers, seeders and Alembic keep
+    using the synchronous engine through create_session.
+
+    Args:
+        read_consistency (Optional[str]): The X-Read-Consistency header. With 'strong'
+            the request reads its own and earlier writes from the primary.
+
+    Yields:
+        Union[AsyncSession, Session]: The session, rolled back if the request fails
+        and always closed afterwards.
+    """
+    if AsyncSessionLocal is None:
+        db = Session()
+        if read_consistency == "strong":
+            use_primary(db)
+        try:
+            yield db
+        except Exception:
+            await run_in_threadpool(db.rollback)
+            raise
+        finally:
+            await run_in_threadpool(db.close)
+        return
+
+    async with AsyncSessionLocal() as db:
+        if read_consistency == "strong":
+            use_primary(db)
+        try:
+            yield db
+        except Exception:
+            await db.rollback()
+            raise
@@ -0,0 +1,158 @@
+"""partition_readings_by_month
+
+Revision ID: 0aeab9c15c6a
+Revises: a05f9813affb
+Create Date: 2026-10-16 18:12:44.503917
+
+On PostgreSQL the readings table is renamed to dev_agnes_readings_unpartitioned
+and a partitioned dev_agnes_readings takes its place, with its indexes, in one
+short transaction. New readings go to the partitioned table from then on.
+
+The old rows are then copied by ID range, COPY_BATCH_SIZE at a time, each batch
+in its own transaction. Locks are held only for one batch, and the WAL can be
+archived and checkpointed as the copy goes, so the application can keep running.
+Older readings show up as their batch commits; run the upgrade at a quiet time
+if listings must stay complete meanwhile. The old table is dropped once every
+row is copied.
+
+If the copy is interrupted, run the upgrade again. It finds the old table
+still present and resumes after the highest ID already copied.
+"""
+from datetime import date
+
+from alembic import op
+import sqlalchemy as sa
+
+from app.models.partition import (
+    PARTITION_MONTHS_AHEAD,
+    add_months,
+    default_partition_statement,
+    month_start,
+    partition_months,
+    partition_statement,
+)
+
+
+# revision identifiers, used by Alembic.
+revision = '0aeab9c15c6a'
+down_revision = 'a05f9813affb'
+branch_labels = None
+depends_on = None
+
+TABLE = "dev_agnes_readings"
+OLD_TABLE = "dev_agnes_readings_unpartitioned"
+COLUMNS = "id, user_id, device_id, unit, value, value_num, created_at, updated_at"
+COPY_BATCH_SIZE = 50000
+INDEXES = {
+    "ix_dev_agnes_readings_id": ["id"],
+    "ix_dev_agnes_readings_device_id_created_at": ["device_id", "created_at"],
+    "ix_dev_agnes_readings_user_id_created_at": ["user_id", "created_at"],
+}
+
+
+def set_aside() -> None:
+    # The new table reuses the names of the primary key and indexes.
+    op.rename_table(TABLE, OLD_TABLE)
+    op.execute(f"ALTER INDEX {TABLE}_pkey RENAME TO {OLD_TABLE}_pkey")
+    drop_indexes()
+
+
+def drop_indexes() -> None:
+    for name in INDEXES:
+        op.execute(f"DROP INDEX IF EXISTS {name}")
+
+
+def create_indexes(table_name: str) -> None:
+    for name, columns in INDEXES.items():
+        op.create_index(name, table_name, columns)
+
+
+def copy_rows(source: str, target: str) -> None:
+    """
+    Copy the rows of source into target by ID range, each batch in its own transaction.
+
+    The copy starts after the highest ID of target that source holds too, so an
+    interrupted copy resumes where it stopped. Rows inserted meanwhile take IDs
+    above those of source and are left alone.
+    """
+    connection = op.get_bind()
+    last_id = connection.execute(sa.text(f"SELECT max(id) FROM {source}")).scalar() or 0
+    copied = connection.execute(
+        sa.text(f"SELECT max(id) FROM {target} WHERE id <= :last_id"), {"last_id": last_id}
+    ).scalar() or 0
+
+    with op.get_context().autocommit_block():
+        while copied < last_id:
+            upto = min(copied + COPY_BATCH_SIZE, last_id)
+            connection.execute(sa.text(
+                f"INSERT INTO {target} ({COLUMNS}) SELECT {COLUMNS} FROM {source} "
+                "WHERE id > :after AND id <= :upto"
+            ), {"after": copied, "upto": upto})
+            copied = upto
+
+
+def create_partitioned_table() -> None:
+    connection = op.get_bind()
+    set_aside()
+
+    op.execute(f"""
+        CREATE TABLE {TABLE} (
+            id INTEGER NOT NULL DEFAULT nextval('{TABLE}_id_seq'),
+            user_id INTEGER,
+            device_id INTEGER,
+            unit VARCHAR(50),
+            value VARCHAR(50),
+            value_num DOUBLE PRECISION,
+            created_at TIMESTAMP WITHOUT TIME ZONE NOT NULL,
+            updated_at TIMESTAMP WITHOUT TIME ZONE NOT NULL,
+            PRIMARY KEY (id, created_at)
+        ) PARTITION BY RANGE (created_at)
+    """)
+    op.execute(f"ALTER SEQUENCE {TABLE}_id_seq OWNED BY {TABLE}.id")
+
+    oldest = connection.execute(sa.text(f"SELECT min(created_at) FROM {OLD_TABLE}")).scalar()
+    current = month_start(date.today())
+    op.execute(default_partition_statement(TABLE))
+    for month in partition_months(oldest or current, add_months(current, PARTITION_MONTHS_AHEAD)):
+        op.execute(partition_statement(TABLE, month))
+
+    # The indexes come first, since the table takes new readings while the old ones are copied.
+    create_indexes(TABLE)
+
+
+def upgrade() -> None:
+    # Range partitioning is PostgreSQL only; other databases keep the single table.
+    connection = op.get_bind()
+    if connection.dialect.name != "postgresql":
+        return
+
+    if not sa.inspect(connection).has_table(OLD_TABLE):
+        create_partitioned_table()
+    copy_rows(OLD_TABLE, TABLE)
+    op.drop_table(OLD_TABLE)
+
+
+def downgrade() -> None:
+    connection = op.get_bind()
+    if connection.dialect.name != "postgresql":
+        return
+
+    set_aside()
+
+    op.execute(f"""
+        CREATE TABLE {TABLE} (
+            id INTEGER NOT NULL DEFAULT nextval('{TABLE}_id_seq') PRIMARY KEY,
+            user_id INTEGER,
+            device_id INTEGER,
+            unit VARCHAR(50),
+            value VARCHAR(50),
+            value_num DOUBLE PRECISION,
+            created_at TIMESTAMP WITHOUT TIME ZONE NOT NULL,
+            updated_at TIMESTAMP WITHOUT TIME ZONE NOT NULL
+        )
+    """)
+    op.execute(f"ALTER SEQUENCE {TABLE}_id_seq OWNED BY {TABLE}.id")
+    create_indexes(TABLE)
+
+    copy_rows(OLD_TABLE, TABLE)
+    op.execute(f"DROP TABLE {OLD_TABLE} CASCADE")
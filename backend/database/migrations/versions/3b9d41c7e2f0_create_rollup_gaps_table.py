@@ -0,0 +1,31 @@
+"""create_rollup_gaps_table
+
+Revision ID: 3b9d41c7e2f0
+Revises: 5518316924a8
+Create Date: 2026-10-16 21:05:12.418306
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3b9d41c7e2f0'
+down_revision = '5518316924a8'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "dev_agnes_rollup_gaps",
+        sa.Column("id", sa.Integer, primary_key=True),
+        sa.Column("name", sa.String(50), nullable=False, index=True),
+        sa.Column("first_id", sa.Integer, nullable=False),
+        sa.Column("last_id", sa.Integer, nullable=False),
+        sa.Column("created_at", sa.DateTime, nullable=False),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("dev_agnes_rollup_gaps")
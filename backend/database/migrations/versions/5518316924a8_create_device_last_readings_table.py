@@ -0,0 +1,49 @@
+"""create_device_last_readings_table
+
+Revision ID: 5518316924a8
+Revises: 615f69e92d95
+Create Date: 2026-10-16 20:21:37.664102
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5518316924a8'
+down_revision = '615f69e92d95'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "dev_agnes_device_last_readings",
+        sa.Column("device_id", sa.Integer, sa.ForeignKey("dev_agnes_devices.id"), primary_key=True),
+        sa.Column("reading_id", sa.Integer, nullable=False),
+        sa.Column("user_id", sa.Integer),
+        sa.Column("unit", sa.String),
+        sa.Column("value", sa.String),
+        sa.Column("value_num", sa.Double),
+        sa.Column("read_at", sa.DateTime, nullable=False),
+        sa.Column("updated_at", sa.DateTime, default=sa.func.now(), nullable=False),
+    )
+
+    # Backfill from the newest reading of every device.
+    op.execute("""
+        INSERT INTO dev_agnes_device_last_readings
+            (device_id, reading_id, user_id, unit, value, value_num, read_at, updated_at)
+        SELECT device_id, id, user_id, unit, value, value_num, created_at, CURRENT_TIMESTAMP
+        FROM (
+            SELECT readings.*, row_number() OVER (
+                PARTITION BY device_id ORDER BY created_at DESC, id DESC
+            ) AS position
+            FROM dev_agnes_readings AS readings
+            WHERE device_id IS NOT NULL
+        ) AS ranked
+        WHERE position = 1
+    """)
+
+
+def downgrade() -> None:
+    op.drop_table("dev_agnes_device_last_readings")
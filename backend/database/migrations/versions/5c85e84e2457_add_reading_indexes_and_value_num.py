@@ -0,0 +1,109 @@
+"""add_reading_indexes_and_value_num
+
+Revision ID: 5c85e84e2457
+Revises: ca3f98de0f0d
+Create Date: 2026-10-16 14:03:27.816402
+
+On PostgreSQL value_num is backfilled by ID range, BACKFILL_CHUNK_SIZE rows at a
+time, each chunk committed on its own, and the indexes are then built with
+CREATE INDEX CONCURRENTLY, so writes to the readings go on throughout. If the
+upgrade is interrupted, drop any index left invalid and run it again; it skips
+the rows already backfilled and the indexes already built.
+"""
+import re
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5c85e84e2457'
+down_revision = 'ca3f98de0f0d'
+branch_labels = None
+depends_on = None
+
+TABLE = "dev_agnes_readings"
+BACKFILL_CHUNK_SIZE = 10000
+NUMBER_PATTERN = re.compile(r"^[-+]?([0-9]+\.?[0-9]*|\.[0-9]+)([eE][-+]?[0-9]+)?$")
+INDEXES = {
+    "ix_dev_agnes_readings_device_id_created_at": ["device_id", "created_at"],
+    "ix_dev_agnes_readings_user_id_created_at": ["user_id", "created_at"],
+}
+
+readings = sa.table(
+    "dev_agnes_readings",
+    sa.column("id", sa.Integer),
+    sa.column("value", sa.String),
+    sa.column("value_num", sa.Double),
+)
+
+
+def parse_number(value):
+    if value is None:
+        return None
+    value = value.strip()
+    return float(value) if NUMBER_PATTERN.match(value) else None
+
+
+def backfill(connection) -> None:
+    # Backfill by primary key range so each UPDATE touches a bounded number of rows.
+    max_id = connection.execute(sa.select(sa.func.max(readings.c.id))).scalar() or 0
+    update = readings.update().where(readings.c.id == sa.bindparam("row_id")).values(value_num=sa.bindparam("number"))
+
+    for start in range(0, max_id, BACKFILL_CHUNK_SIZE):
+        rows = connection.execute(
+            sa.select(readings.c.id, readings.c.value).where(
+                readings.c.id > start, readings.c.id <= start + BACKFILL_CHUNK_SIZE
+            )
+        ).all()
+        parameters = [
+            {"row_id": id, "number": number}
+            for id, value in rows
+            if (number := parse_number(value)) is not None
+        ]
+        if parameters:
+            connection.execute(update, parameters)
+
+
+def backfill_postgresql(connection) -> None:
+    """
+    Backfill value_num with one UPDATE per ID range, each committing on its own.
+
+    Must run in an autocommit block. The pattern is NUMBER_PATTERN, and numbers
+    beyond the range of a double are left NULL.
+    """
+    max_id = connection.execute(sa.select(sa.func.max(readings.c.id))).scalar() or 0
+    update = sa.text(f"""
+        UPDATE {TABLE} SET value_num = CAST(CAST(btrim(value) AS NUMERIC) AS DOUBLE PRECISION)
+        WHERE id > :after AND id <= :upto AND value_num IS NULL
+            AND btrim(value) ~ :pattern AND abs(CAST(btrim(value) AS NUMERIC)) < 1e308
+    """)
+
+    for start in range(0, max_id, BACKFILL_CHUNK_SIZE):
+        connection.execute(
+            update, {"after": start, "upto": start + BACKFILL_CHUNK_SIZE, "pattern": NUMBER_PATTERN.pattern}
+        )
+
+
+def upgrade() -> None:
+    connection = op.get_bind()
+    if "value_num" not in {column["name"] for column in sa.inspect(connection).get_columns(TABLE)}:
+        op.add_column(TABLE, sa.Column("value_num", sa.Double, nullable=True))
+
+    if connection.dialect.name != "postgresql":
+        for name, columns in INDEXES.items():
+            op.create_index(name, TABLE, columns)
+        backfill(connection)
+        return
+
+    # Commit the column first, then each chunk and index on its own, so no lock is held for the whole run.
+    with op.get_context().autocommit_block():
+        backfill_postgresql(connection)
+        for name, columns in INDEXES.items():
+            op.create_index(name, TABLE, columns, postgresql_concurrently=True, if_not_exists=True)
+
+
+def downgrade() -> None:
+    op.drop_index("ix_dev_agnes_readings_user_id_created_at", table_name="dev_agnes_readings")
+    op.drop_index("ix_dev_agnes_readings_device_id_created_at", table_name="dev_agnes_readings")
+    op.drop_column("dev_agnes_readings", "value_num")
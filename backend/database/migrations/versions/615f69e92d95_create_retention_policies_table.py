@@ -0,0 +1,34 @@
+"""create_retention_policies_table
+
+Revision ID: 615f69e92d95
+Revises: 0aeab9c15c6a
+Create Date: 2026-10-16 19:34:08.126594
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '615f69e92d95'
+down_revision = '0aeab9c15c6a'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "dev_agnes_retention_policies",
+        sa.Column("id", sa.Integer, primary_key=True, index=True),
+        sa.Column("category_id", sa.Integer, unique=True),
+        sa.Column("raw_days", sa.Integer),
+        sa.Column("minute_rollup_days", sa.Integer),
+        sa.Column("hour_rollup_days", sa.Integer),
+        sa.Column("day_rollup_days", sa.Integer),
+        sa.Column("created_at", sa.DateTime, default=sa.func.now(), nullable=False),
+        sa.Column("updated_at", sa.DateTime, default=sa.func.now(), nullable=False),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("dev_agnes_retention_policies")
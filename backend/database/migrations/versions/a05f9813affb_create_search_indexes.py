@@ -0,0 +1,38 @@
+"""create_search_indexes
+
+Revision ID: a05f9813affb
+Revises: 5c85e84e2457
+Create Date: 2026-10-16 16:41:09.275130
+
+"""
+from alembic import op
+
+from app.models.search import drop_search_index_statements, search_index_statements
+
+
+# revision identifiers, used by Alembic.
+revision = 'a05f9813affb'
+down_revision = '5c85e84e2457'
+branch_labels = None
+depends_on = None
+
+SEARCHABLE = {
+    "dev_agnes_devices": ("name", "description"),
+    "dev_agnes_categories": ("name", "description"),
+    "dev_agnes_locations": ("name", "description"),
+    "users": ("username", "email"),
+}
+
+
+def upgrade() -> None:
+    dialect = op.get_bind().dialect.name
+    for table_name, columns in SEARCHABLE.items():
+        for statement in search_index_statements(dialect, table_name, columns):
+            op.execute(statement)
+
+
+def downgrade() -> None:
+    dialect = op.get_bind().dialect.name
+    for table_name, columns in SEARCHABLE.items():
+        for statement in drop_search_index_statements(dialect, table_name, columns):
+            op.execute(statement)
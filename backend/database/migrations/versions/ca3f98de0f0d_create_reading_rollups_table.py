@@ -0,0 +1,47 @@
+"""create_reading_rollups_table
+
+Revision ID: ca3f98de0f0d
+Revises: bea95596b108
+Create Date: 2026-10-16 09:12:41.503218
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'ca3f98de0f0d'
+down_revision = 'bea95596b108'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "dev_agnes_reading_rollups",
+        sa.Column("id", sa.Integer, primary_key=True, index=True),
+        sa.Column("device_id", sa.Integer, nullable=False),
+        sa.Column("width", sa.Integer, nullable=False),
+        sa.Column("bucket_start", sa.DateTime, nullable=False),
+        sa.Column("count", sa.Integer, nullable=False, default=0),
+        sa.Column("sum", sa.Float, nullable=False, default=0),
+        sa.Column("min", sa.Float),
+        sa.Column("max", sa.Float),
+        sa.Column("last_value", sa.Float),
+        sa.Column("last_at", sa.DateTime),
+        sa.Column("last_reading_id", sa.Integer),
+        sa.Column("created_at", sa.DateTime, default=sa.func.now(), nullable=False),
+        sa.Column("updated_at", sa.DateTime, default=sa.func.now(), nullable=False),
+        sa.UniqueConstraint("device_id", "width", "bucket_start", name="uq_dev_agnes_reading_rollups_bucket"),
+    )
+    op.create_table(
+        "dev_agnes_rollup_watermarks",
+        sa.Column("name", sa.String(50), primary_key=True),
+        sa.Column("last_reading_id", sa.Integer, nullable=False, default=0),
+        sa.Column("updated_at", sa.DateTime, default=sa.func.now(), nullable=False),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("dev_agnes_rollup_watermarks")
+    op.drop_table("dev_agnes_reading_rollups")
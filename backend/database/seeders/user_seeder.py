@@ -3,11 +3,11 @@ from datetime import datetime, timedelta
 from faker import Faker
 
 from app.models.user import User
-from config.database import get_session
+from config.database import create_session
 
 
 def run():
-    db = get_session()
+    db = create_session()
     fake = Faker()
 
     current_time = datetime.now()
@@ -30,3 +30,5 @@ def run():
         db.add(user)
         db.commit()
         db.refresh(user)
+
+    db.close()
@@ -0,0 +1,30 @@
+from app.models.partition import PARTITION_MONTHS_AHEAD, ensure_partitions
+from app.models.reading import Reading
+from config.database import create_session
+
+
+def main(event, context):
+    """
+    Create the upcoming monthly partitions of the readings table from a scheduled AWS Lambda invocation.
+
+    This function is designed to be used as an AWS Lambda handler triggered by a
+    schedule, at least monthly. It creates the missing partitions from the current
+    month up to "months_ahead" months later, so new readings never fall into the
+    default partition. On databases other than PostgreSQL it does nothing.
+
+    Parameters:
+    - event (dict): The AWS Lambda event object, optionally with a "months_ahead".
+    - context (LambdaContext): The AWS Lambda context object.
+
+    Returns:
+    - dict: A dictionary with a status code of 200 and the names of the partitions created.
+    """
+    db = create_session()
+    try:
+        months_ahead = int(event.get("months_ahead", PARTITION_MONTHS_AHEAD))
+        created = ensure_partitions(db.connection(), Reading.__tablename__, months_ahead)
+        db.commit()
+    finally:
+        db.close()
+
+    return {"StatusCode": 200, "Created": created}
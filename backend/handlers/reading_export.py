@@ -0,0 +1,34 @@
+from app.services.reading import ReadingService
+from config.database import create_session
+
+
+def main(event, context):
+    """
+    Export a range of readings as Parquet files partitioned by day.
+
+    This function is designed to be used as an AWS Lambda handler, for example on
+    a nightly schedule. The event names the destination and the same filters as
+    the readings listing, and the export is written with the ReadingService class.
+
+    Parameters:
+    - event (dict): The AWS Lambda event object with a "path" (local path or
+      s3:// URI) and optional "start_date", "end_date", "user_id" and "device_id".
+    - context (LambdaContext): The AWS Lambda context object.
+
+    Returns:
+    - dict: A dictionary with a status code of 200 and the number of readings written.
+    """
+    db = create_session()
+    try:
+        reading_service = ReadingService(db)
+        written = reading_service.export_parquet(
+            event["path"],
+            start_date=event.get("start_date"),
+            end_date=event.get("end_date"),
+            user_id=event.get("user_id"),
+            device_id=event.get("device_id"),
+        )
+    finally:
+        db.close()
+
+    return {"StatusCode": 200, "Written": written}
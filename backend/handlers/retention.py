@@ -0,0 +1,46 @@
+import argparse
+import json
+import logging
+
+from app.services.retention import RETENTION_BATCH_SIZE, RetentionService
+from config.database import create_session
+
+
+def main(event, context):
+    """
+    Apply the reading retention policies from a scheduled AWS Lambda invocation.
+
+    This function is designed to be used as an AWS Lambda handler triggered by a
+    schedule, after the rollup refresh. It removes the readings and rollups that
+    are older than their category's retention policy using the RetentionService
+    class, and reports how many rows each step removed and how fast.
+
+    Parameters:
+    - event (dict): The AWS Lambda event object, optionally with a "batch_size" and a "pause" in seconds.
+    - context (LambdaContext): The AWS Lambda context object.
+
+    Returns:
+    - dict: A dictionary with a status code of 200 and the report of each step.
+    """
+    db = create_session()
+    try:
+        retention_service = RetentionService(db)
+        reports = retention_service.apply(
+            batch_size=int(event.get("batch_size", RETENTION_BATCH_SIZE)),
+            pause=float(event.get("pause", 0)),
+        )
+    finally:
+        db.close()
+
+    return {"StatusCode": 200, "Reports": reports}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Apply the reading retention policies.")
+    parser.add_argument("--batch-size", type=int, default=RETENTION_BATCH_SIZE, help="rows deleted per transaction")
+    parser.add_argument("--pause", type=float, default=0, help="seconds to sleep between batches")
+    arguments = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    result = main({"batch_size": arguments.batch_size, "pause": arguments.pause}, None)
+    print(json.dumps(result["Reports"], indent=2))
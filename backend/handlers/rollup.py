@@ -0,0 +1,31 @@
+from app.services.rollup import ROLLUP_GAP_SECONDS, RollupService
+from config.database import create_session
+
+
+def main(event, context):
+    """
+    Refresh the reading rollups from a scheduled AWS Lambda invocation.
+
+    This function is designed to be used as an AWS Lambda handler triggered by a
+    schedule. It folds the readings inserted since the previous run into the
+    rollups using the RollupService class.
+
+    Parameters:
+    - event (dict): The AWS Lambda event object, optionally with a "batch_size" and a
+      "gap_seconds".
+    - context (LambdaContext): The AWS Lambda context object.
+
+    Returns:
+    - dict: A dictionary with a status code of 200 and the number of readings processed.
+    """
+    db = create_session()
+    try:
+        rollup_service = RollupService(db)
+        processed = rollup_service.refresh(
+            batch_size=int(event.get("batch_size", 10000)),
+            gap_seconds=int(event.get("gap_seconds", ROLLUP_GAP_SECONDS)),
+        )
+    finally:
+        db.close()
+
+    return {"StatusCode": 200, "Processed": processed}
@@ -1,11 +1,17 @@
+import os
 import sys
+from contextlib import asynccontextmanager
 
+from anyio import to_thread
 from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.templating import Jinja2Templates
 from mangum import Mangum
 
+from app.middleware.compression import CompressionMiddleware
+from app.middleware.listing_cache import ListingCacheMiddleware
 from config.app import get_settings
+from config.database import threadpool_limit
 from routes import health, users, categories, locations, devices, readings
 
 sys.path.append(".")
@@ -60,6 +66,22 @@ else:
     root_path = "/"
 
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Cap the threadpool at the connection pool capacity, so that threads holding a
+    connection never wait behind threads waiting for one.
+
+    Args:
+        app (FastAPI): The application.
+    """
+    limit = threadpool_limit()
+    if limit is not None:
+        limiter = to_thread.current_default_thread_limiter()
+        limiter.total_tokens = min(limiter.total_tokens, limit)
+    yield
+
+
 app = FastAPI(
     title="Agnes",
     description=description,
@@ -73,12 +95,19 @@ app = FastAPI(
     openapi_tags=tags_metadata,
     root_path=root_path,
     debug=settings.APP_DEBUG,
+    lifespan=lifespan,
 )
 
 
 allowed_origins = settings.ALLOWED_ORIGINS
 
 
+# Added before CORSMiddleware so that cached responses get the CORS headers too.
+app.add_middleware(
+    ListingCacheMiddleware,
+    ttl=settings.CACHE_LISTING_TTL,
+    max_age=settings.CACHE_MAX_AGE,
+)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=allowed_origins,
@@ -86,6 +115,14 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+# Added last so that it wraps the listing cache, which stores uncompressed bodies.
+app.add_middleware(
+    CompressionMiddleware,
+    minimum_size=settings.COMPRESSION_MIN_SIZE,
+    encodings=[name.strip() for name in settings.COMPRESSION_ENCODINGS.split(",") if name.strip()],
+    # Mangum collects the whole response for Lambda, so flushing each chunk would only cost ratio.
+    flush_chunks="AWS_LAMBDA_FUNCTION_NAME" not in os.environ,
+)
 
 
 app.include_router(health.route)
@@ -1,7 +1,7 @@
 import logging
 from typing import List, Optional
 
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
 from sqlalchemy.orm import Session
 
 from app.models.category import Category
@@ -10,17 +10,31 @@ from app.responses.category import (
     PaginatedCategoryResponse,
     SingleCategoryResponse
 )
-from app.services.category import CategoryService
-from config.database import get_session
+from app.responses.conditional import not_modified
+from app.responses.serialization import json_response
+from app.services.category import AsyncCategoryService
+from config.database import get_async_session
 from datetime import date
 
-category_service = CategoryService(db=None)
 
 route = APIRouter(
     prefix="/api", tags=["Categories"], responses={404: {"description": "Not found"}}
 )
 
 
+def get_category_service(db: Session = Depends(get_async_session)) -> AsyncCategoryService:
+    """
+    Provide a CategoryService bound to the session of the current request.
+
+    Args:
+        db (Session): SQLAlchemy database session.
+
+    Returns:
+        AsyncCategoryService: The service instance of this request.
+    """
+    return AsyncCategoryService(db)
+
+
 @route.get("/categories", status_code=200, response_model=PaginatedCategoryResponse)
 async def get_categories(
     page: Optional[int] = Query(1, description="page number", gt=0),
@@ -31,7 +45,10 @@ async def get_categories(
     description: Optional[str] = Query(None, description="second field filter"),
     start_date: Optional[date] = Query(None, description="start date filter"),
     end_date: Optional[date] = Query(None, description="end date filter"),
-    db: Session = Depends(get_session),
+    cursor: Optional[str] = Query(None, description="keyset cursor, empty for the first page"),
+    with_total: Optional[str] = Query('exact', description="total mode (exact, estimate or none)"),
+    q: Optional[str] = Query(None, description="search text, ranked by relevance"),
+    category_service: AsyncCategoryService = Depends(get_category_service),
 ):
     """
     Get a list of categories with pagination and optional filters.
@@ -45,22 +62,43 @@ async def get_categories(
         end_date (date): End date filter.
         name (str): First field filter.
         description (str): Second field filter.
-        db (Session): SQLAlchemy database session.
+        cursor (str): Keyset cursor; switches to cursor pagination when given.
+        with_total (str): Total mode; 'estimate' and 'none' skip the full count.
+        q (str): Search text; page results are ranked by relevance. Not allowed with a cursor.
+        category_service (AsyncCategoryService): Category service of the request.
 
     Returns:
         List[CategoryResponse]: List of category objects.
     """
     try:
-        category_service.db = db
-        items, total, last_page, first_item, last_item = category_service.all(
+        if cursor is not None:
+            items, next_cursor = await category_service.all_by_cursor(
+                items_per_page, cursor, sort_type=sort_type, sort_by=sort_by,
+                start_date=start_date, end_date=end_date, name=name, description=description, q=q
+            )
+
+            if not items:
+                raise ValueError("No categories found")
+
+            return json_response(PaginatedCategoryResponse, {
+                "data": items,
+                "meta": {
+                    "items_per_page": items_per_page,
+                    "next_cursor": next_cursor,
+                    "has_next": next_cursor is not None,
+                },
+                "status_code": 200,
+            })
+
+        items, total, last_page, first_item, last_item = await category_service.all(
             page, items_per_page, sort_type=sort_type, sort_by=sort_by,
-            start_date=start_date, end_date=end_date, name=name, description=description
+            start_date=start_date, end_date=end_date, name=name, description=description, with_total=with_total, q=q
         )
 
         if not items:
             raise ValueError("No categories found")
 
-        return {
+        return json_response(PaginatedCategoryResponse, {
             "data": items,
             "meta": {
                 "current_page": page,
@@ -69,46 +107,63 @@ async def get_categories(
                 "last_item": last_item,
                 "items_per_page": items_per_page,
                 "total": total,
+                "has_next": page < last_page,
             },
             "status_code": 200,
-        }
+        })
     except ValueError as e:
         raise HTTPException(status_code=404, detail=f"{e}")
+    except HTTPException as e:
+        raise e
     except Exception as e:
         logging.error(e)
         raise HTTPException(status_code=500, detail="Internal server error")
 
 
 @route.get("/categories/{id}", status_code=200, response_model=SingleCategoryResponse)
-async def get_category(id: int, db: Session = Depends(get_session)):
+async def get_category(
+    id: int,
+    request: Request,
+    response: Response,
+    category_service: AsyncCategoryService = Depends(get_category_service),
+):
     """
     Get a category by their unique identifier.
 
     Args:
         id (int): The unique identifier of the category.
-        db (Session): SQLAlchemy database session.
+        request (Request): The request, for its If-None-Match and If-Modified-Since headers.
+        response (Response): The response, which gets the ETag and Last-Modified headers.
+        category_service (AsyncCategoryService): Category service of the request.
 
     Returns:
-        CategoryResponse: Category object.
+        CategoryResponse: Category object, or an empty 304 response when the client's copy is current.
     """
     try:
-        category_service.db = db
-        category = category_service.find(id)
+        category = await category_service.find_unless_fresh(
+            id, lambda timestamps: not_modified(request, response, id, timestamps)
+        )
+        if isinstance(category, Response):
+            return category
         if not category:
             raise HTTPException(status_code=404, detail="Category not found")
-        return {"data": category, "status_code": 200}
+        return json_response(SingleCategoryResponse, {"data": category, "status_code": 200}, headers=response.headers)
+    except HTTPException as e:
+        raise e
     except Exception as e:
         raise HTTPException(status_code=500, detail="Internal server error")
 
 
 @route.post("/categories", status_code=201, response_model=SingleCategoryResponse)
-async def create_category(category: CategoryCreateRequest, db: Session = Depends(get_session)):
+async def create_category(
+    category: CategoryCreateRequest, category_service: AsyncCategoryService = Depends(get_category_service)
+):
     """
     Create a new category.
 
     Args:
         category (CategoryCreateRequest): Category creation request.
-        db (Session): SQLAlchemy database session.
+        category_service (AsyncCategoryService): Category service of the request.
 
     Returns:
         CategoryCreateResponse: Created category object.
@@ -118,8 +173,7 @@ async def create_category(category: CategoryCreateRequest, db: Session = Depends
 
     """
     try:
-        category_service.db = db
-        created_category = category_service.save(category)
+        created_category = await category_service.save(category)
         return {"data": created_category, "status_code": 201}
     except Exception as e:
         raise HTTPException(status_code=500, detail="Internal server error")
@@ -127,7 +181,7 @@ async def create_category(category: CategoryCreateRequest, db: Session = Depends
 
 @route.put("/categories/{id}", status_code=200, response_model=SingleCategoryResponse)
 async def update_category(
-    id: int, category: CategoryUpdateRequest, db: Session = Depends(get_session)
+    id: int, category: CategoryUpdateRequest, category_service: AsyncCategoryService = Depends(get_category_service)
 ):
     """
     Update an existing category's information.
@@ -135,7 +189,7 @@ async def update_category(
     Args:
         id (int): The unique identifier of the category to update.
         category (CategoryUpdateRequest): Category update request.
-        db (Session): SQLAlchemy database session.
+        category_service (AsyncCategoryService): Category service of the request.
 
     Returns:
         CategoryUpdateResponse: Updated category object.
@@ -146,8 +200,7 @@ async def update_category(
                        or if there is an internal server error (status_code=500).
     """
     try:
-        category_service.db = db
-        updated_category = category_service.update(id, category)
+        updated_category = await category_service.update(id, category)
         if not updated_category:
             raise HTTPException(status_code=404, detail="Category not found")
         return {"data": updated_category, "status_code": 200}
@@ -158,13 +211,13 @@ async def update_category(
 
 
 @route.delete("/categories/{id}", status_code=200, response_model=SingleCategoryResponse)
-async def delete_category(id: int, db: Session = Depends(get_session)):
+async def delete_category(id: int, category_service: AsyncCategoryService = Depends(get_category_service)):
     """
     Delete a category by their unique identifier.
 
     Args:
         id (int): The unique identifier of the category to delete.
-        db (Session): SQLAlchemy database session.
+        category_service (AsyncCategoryService): Category service of the request.
 
     Returns:
         dict: A dictionary containing the deleted category data and the status code.
@@ -173,9 +226,8 @@ async def delete_category(id: int, db: Session = Depends(get_session)):
         HTTPException: If the category is not found or if there is an internal server error.
     """
     try:
-        category_service.db = db
 
-        category = category_service.delete(id)
+        category = await category_service.delete(id)
 
         if not category:
             raise HTTPException(status_code=500, detail="Failed to delete category")
@@ -1,26 +1,43 @@
 import logging
 from typing import List, Optional
 
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
 from sqlalchemy.orm import Session
 
 from app.models.device import Device
 from app.requests.device import DeviceCreateRequest, DeviceUpdateRequest
+from app.responses.conditional import not_modified
 from app.responses.device import (
+    DeviceLatestResponse,
+    DeviceResponse,
     PaginatedDeviceResponse,
     SingleDeviceResponse
 )
-from app.services.device import DeviceService
-from config.database import get_session
+from app.responses.serialization import json_response
+from app.responses.sparse import parse_names, sparse
+from app.services.device import DEVICE_RELATIONSHIPS, AsyncDeviceService
+from config.database import get_async_session
 from datetime import date
 
-device_service = DeviceService(db=None)
 
 route = APIRouter(
     prefix="/api", tags=["Devices"], responses={404: {"description": "Not found"}}
 )
 
 
+def get_device_service(db: Session = Depends(get_async_session)) -> AsyncDeviceService:
+    """
+    Provide a DeviceService bound to the session of the current request.
+
+    Args:
+        db (Session): SQLAlchemy database session.
+
+    Returns:
+        AsyncDeviceService: The service instance of this request.
+    """
+    return AsyncDeviceService(db)
+
+
 @route.get("/devices", status_code=200, response_model=PaginatedDeviceResponse)
 async def get_devices(
     page: Optional[int] = Query(1, description="page number", gt=0),
@@ -31,7 +48,13 @@ async def get_devices(
     description: Optional[str] = Query(None, description="second field filter"),
     start_date: Optional[date] = Query(None, description="start date filter"),
     end_date: Optional[date] = Query(None, description="end date filter"),
-    db: Session = Depends(get_session),
+    cursor: Optional[str] = Query(None, description="keyset cursor, empty for the first page"),
+    with_total: Optional[str] = Query('exact', description="total mode (exact, estimate or none)"),
+    q: Optional[str] = Query(None, description="search text, ranked by relevance"),
+    fields: Optional[str] = Query(None, description="device fields to send, e.g. id,name,category_id"),
+    include: Optional[str] = Query(None, description="relationships to embed (category, location), all when missing"),
+    compound: Optional[bool] = Query(False, description="send the relationships once in an included map"),
+    device_service: AsyncDeviceService = Depends(get_device_service),
 ):
     """
     Get a list of devices with pagination and optional filters.
@@ -45,22 +68,55 @@ async def get_devices(
         end_date (date): End date filter.
         name (str): First field filter.
         description (str): Second field filter.
-        db (Session): SQLAlchemy database session.
+        cursor (str): Keyset cursor; switches to cursor pagination when given.
+        with_total (str): Total mode; 'estimate' and 'none' skip the full count.
+        q (str): Search text; page results are ranked by relevance. Not allowed with a cursor.
+        fields (str): Device fields to send, comma-separated; the id is always sent.
+        include (str): Relationships to load and send, comma-separated; empty for none.
+        compound (bool): Send the included relationships once, by ID, in an included map
+            instead of inside every device.
+        device_service (AsyncDeviceService): Device service of the request.
 
     Returns:
         List[DeviceResponse]: List of device objects.
     """
     try:
-        device_service.db = db
-        items, total, last_page, first_item, last_item = device_service.all(
+        field_names = [name for name in DeviceResponse.model_fields if name not in DEVICE_RELATIONSHIPS]
+        fieldset = parse_names(fields, field_names, "fields")
+        relationships = parse_names(include, list(DEVICE_RELATIONSHIPS), "include")
+
+        if cursor is not None:
+            items, next_cursor = await device_service.all_by_cursor(
+                items_per_page, cursor, sort_type=sort_type, sort_by=sort_by,
+                start_date=start_date, end_date=end_date, name=name, description=description, q=q,
+                include=relationships
+            )
+
+            if not items:
+                raise ValueError("No devices found")
+
+            content = {
+                "data": items,
+                "meta": {
+                    "items_per_page": items_per_page,
+                    "next_cursor": next_cursor,
+                    "has_next": next_cursor is not None,
+                },
+                "status_code": 200,
+            }
+            exclude = sparse(content, DeviceResponse, DEVICE_RELATIONSHIPS, fieldset, relationships, compound)
+            return json_response(PaginatedDeviceResponse, content, exclude=exclude)
+
+        items, total, last_page, first_item, last_item = await device_service.all(
             page, items_per_page, sort_type=sort_type, sort_by=sort_by,
-            start_date=start_date, end_date=end_date, name=name, description=description
+            start_date=start_date, end_date=end_date, name=name, description=description, with_total=with_total, q=q,
+            include=relationships
         )
 
         if not items:
             raise ValueError("No devices found")
 
-        return {
+        content = {
             "data": items,
             "meta": {
                 "current_page": page,
@@ -69,46 +125,92 @@ async def get_devices(
                 "last_item": last_item,
                 "items_per_page": items_per_page,
                 "total": total,
+                "has_next": page < last_page,
             },
             "status_code": 200,
         }
+        exclude = sparse(content, DeviceResponse, DEVICE_RELATIONSHIPS, fieldset, relationships, compound)
+        return json_response(PaginatedDeviceResponse, content, exclude=exclude)
     except ValueError as e:
         raise HTTPException(status_code=404, detail=f"{e}")
+    except HTTPException as e:
+        raise e
+    except Exception as e:
+        logging.error(e)
+        raise HTTPException(status_code=500, detail="Internal server error")
+
+
+@route.get("/devices/latest", status_code=200, response_model=DeviceLatestResponse)
+async def get_latest_readings(
+    location_id: Optional[int] = Query(None, description="only the devices of this location"),
+    category_id: Optional[int] = Query(None, description="only the devices of this category"),
+    device_service: AsyncDeviceService = Depends(get_device_service),
+):
+    """
+    Get the most recent reading of every device.
+
+    Args:
+        location_id (int): Only the devices of this location.
+        category_id (int): Only the devices of this category.
+        device_service (AsyncDeviceService): Device service of the request.
+
+    Returns:
+        DeviceLatestResponse: One item per device with its most recent reading.
+    """
+    try:
+        items = await device_service.latest(location_id=location_id, category_id=category_id)
+        return json_response(DeviceLatestResponse, {"data": items, "status_code": 200})
+    except HTTPException as e:
+        raise e
     except Exception as e:
         logging.error(e)
         raise HTTPException(status_code=500, detail="Internal server error")
 
 
 @route.get("/devices/{id}", status_code=200, response_model=SingleDeviceResponse)
-async def get_device(id: int, db: Session = Depends(get_session)):
+async def get_device(
+    id: int,
+    request: Request,
+    response: Response,
+    device_service: AsyncDeviceService = Depends(get_device_service),
+):
     """
     Get a device by their unique identifier.
 
     Args:
         id (int): The unique identifier of the device.
-        db (Session): SQLAlchemy database session.
+        request (Request): The request, for its If-None-Match and If-Modified-Since headers.
+        response (Response): The response, which gets the ETag and Last-Modified headers.
+        device_service (AsyncDeviceService): Device service of the request.
 
     Returns:
-        DeviceResponse: Device object.
+        DeviceResponse: Device object, or an empty 304 response when the client's copy is current.
     """
     try:
-        device_service.db = db
-        device = device_service.find(id)
+        device = await device_service.find_unless_fresh(
+            id, lambda timestamps: not_modified(request, response, id, timestamps)
+        )
+        if isinstance(device, Response):
+            return device
         if not device:
             raise HTTPException(status_code=404, detail="Device not found")
-        return {"data": device, "status_code": 200}
+        return json_response(SingleDeviceResponse, {"data": device, "status_code": 200}, headers=response.headers)
+    except HTTPException as e:
+        raise e
     except Exception as e:
         raise HTTPException(status_code=500, detail="Internal server error")
 
 
 @route.post("/devices", status_code=201, response_model=SingleDeviceResponse)
-async def create_device(device: DeviceCreateRequest, db: Session = Depends(get_session)):
+async def create_device(
+    device: DeviceCreateRequest, device_service: AsyncDeviceService = Depends(get_device_service)
+):
     """
     Create a new device.
 
     Args:
         device (DeviceCreateRequest): Device creation request.
-        db (Session): SQLAlchemy database session.
+        device_service (AsyncDeviceService): Device service of the request.
 
     Returns:
         DeviceCreateResponse: Created device object.
@@ -118,8 +220,7 @@ async def create_device(device: DeviceCreateRequest, db: Session = Depends(get_s
 
     """
     try:
-        device_service.db = db
-        created_device = device_service.save(device)
+        created_device = await device_service.save(device)
         return {"data": created_device, "status_code": 201}
     except Exception as e:
         raise HTTPException(status_code=500, detail="Internal server error")
@@ -127,7 +228,7 @@ async def create_device(device: DeviceCreateRequest, db: Session = Depends(get_s
 
 @route.put("/devices/{id}", status_code=200, response_model=SingleDeviceResponse)
 async def update_device(
-    id: int, device: DeviceUpdateRequest, db: Session = Depends(get_session)
+    id: int, device: DeviceUpdateRequest, device_service: AsyncDeviceService = Depends(get_device_service)
 ):
     """
     Update an existing device's information.
@@ -135,7 +236,7 @@ async def update_device(
     Args:
         id (int): The unique identifier of the device to update.
         device (DeviceUpdateRequest): Device update request.
-        db (Session): SQLAlchemy database session.
+        device_service (AsyncDeviceService): Device service of the request.
 
     Returns:
         DeviceUpdateResponse: Updated device object.
@@ -146,8 +247,7 @@ async def update_device(
                        or if there is an internal server error (status_code=500).
     """
     try:
-        device_service.db = db
-        updated_device = device_service.update(id, device)
+        updated_device = await device_service.update(id, device)
         if not updated_device:
             raise HTTPException(status_code=404, detail="Device not found")
         return {"data": updated_device, "status_code": 200}
@@ -158,13 +258,13 @@ async def update_device(
 
 
 @route.delete("/devices/{id}", status_code=200, response_model=SingleDeviceResponse)
-async def delete_device(id: int, db: Session = Depends(get_session)):
+async def delete_device(id: int, device_service: AsyncDeviceService = Depends(get_device_service)):
     """
     Delete a device by their unique identifier.
 
     Args:
         id (int): The unique identifier of the device to delete.
-        db (Session): SQLAlchemy database session.
+        device_service (AsyncDeviceService): Device service of the request.
 
     Returns:
         dict: A dictionary containing the deleted device data and the status code.
@@ -173,9 +273,8 @@ async def delete_device(id: int, db: Session = Depends(get_session)):
         HTTPException: If the device is not found or if there is an internal server error.
     """
     try:
-        device_service.db = db
 
-        device = device_service.delete(id)
+        device = await device_service.delete(id)
 
         if not device:
             raise HTTPException(status_code=500, detail="Failed to delete device")
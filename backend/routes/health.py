@@ -1,5 +1,8 @@
 from fastapi import APIRouter
 
+from app.services.cache import cache_stats
+from config.database import get_pool_metrics
+
 route = APIRouter(
     prefix="/api", tags=["Health Check"], responses={404: {"description": "Not found"}}
 )
@@ -25,3 +28,38 @@ async def health_check():
         "message": "OK",
         "status_code": 200,
     }
+
+
+@route.get("/health-check/pool")
+async def pool_health_check():
+    """
+    Endpoint for inspecting the database connection pools.
+
+    For every engine it reports the pool class, how many connections were checked
+    out, returned and opened, how often and how long requests waited for a free
+    connection, and for queue pools the current size, connections in use and overflow.
+
+    Returns:
+        dict: A dictionary with the metrics of each engine under 'data'.
+    """
+    return {
+        "data": get_pool_metrics(),
+        "status_code": 200,
+    }
+
+
+@route.get("/health-check/cache")
+async def cache_health_check():
+    """
+    Endpoint for inspecting the in-process reference caches.
+
+    For the device, category and location caches of this process it reports the
+    hits, misses, hit ratio, evictions and current size.
+
+    Returns:
+        dict: A dictionary with the stats of each cache under 'data'.
+    """
+    return {
+        "data": cache_stats(),
+        "status_code": 200,
+    }
@@ -1,26 +1,40 @@
 import logging
 from typing import List, Optional
 
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
 from sqlalchemy.orm import Session
 
 from app.models.location import Location
 from app.requests.location import LocationCreateRequest, LocationUpdateRequest
+from app.responses.conditional import not_modified
 from app.responses.location import (
     PaginatedLocationResponse,
     SingleLocationResponse
 )
-from app.services.location import LocationService
-from config.database import get_session
+from app.responses.serialization import json_response
+from app.services.location import AsyncLocationService
+from config.database import get_async_session
 from datetime import date
 
-location_service = LocationService(db=None)
 
 route = APIRouter(
     prefix="/api", tags=["Locations"], responses={404: {"description": "Not found"}}
 )
 
 
+def get_location_service(db: Session = Depends(get_async_session)) -> AsyncLocationService:
+    """
+    Provide a LocationService bound to the session of the current request.
+
+    Args:
+        db (Session): SQLAlchemy database session.
+
+    Returns:
+        AsyncLocationService: The service instance of this request.
+    """
+    return AsyncLocationService(db)
+
+
 @route.get("/locations", status_code=200, response_model=PaginatedLocationResponse)
 async def get_locations(
     page: Optional[int] = Query(1, description="page number", gt=0),
@@ -31,7 +45,10 @@ async def get_locations(
     description: Optional[str] = Query(None, description="second field filter"),
     start_date: Optional[date] = Query(None, description="start date filter"),
     end_date: Optional[date] = Query(None, description="end date filter"),
-    db: Session = Depends(get_session),
+    cursor: Optional[str] = Query(None, description="keyset cursor, empty for the first page"),
+    with_total: Optional[str] = Query('exact', description="total mode (exact, estimate or none)"),
+    q: Optional[str] = Query(None, description="search text, ranked by relevance"),
+    location_service: AsyncLocationService = Depends(get_location_service),
 ):
     """
     Get a list of locations with pagination and optional filters.
@@ -45,22 +62,43 @@ async def get_locations(
         end_date (date): End date filter.
         name (str): First field filter.
         description (str): Second field filter.
-        db (Session): SQLAlchemy database session.
+        cursor (str): Keyset cursor; switches to cursor pagination when given.
+        with_total (str): Total mode; 'estimate' and 'none' skip the full count.
+        q (str): Search text; page results are ranked by relevance. Not allowed with a cursor.
+        location_service (AsyncLocationService): Location service of the request.
 
     Returns:
         List[LocationResponse]: List of location objects.
     """
     try:
-        location_service.db = db
-        items, total, last_page, first_item, last_item = location_service.all(
+        if cursor is not None:
+            items, next_cursor = await location_service.all_by_cursor(
+                items_per_page, cursor, sort_type=sort_type, sort_by=sort_by,
+                start_date=start_date, end_date=end_date, name=name, description=description, q=q
+            )
+
+            if not items:
+                raise ValueError("No locations found")
+
+            return json_response(PaginatedLocationResponse, {
+                "data": items,
+                "meta": {
+                    "items_per_page": items_per_page,
+                    "next_cursor": next_cursor,
+                    "has_next": next_cursor is not None,
+                },
+                "status_code": 200,
+            })
+
+        items, total, last_page, first_item, last_item = await location_service.all(
             page, items_per_page, sort_type=sort_type, sort_by=sort_by,
-            start_date=start_date, end_date=end_date, name=name, description=description
+            start_date=start_date, end_date=end_date, name=name, description=description, with_total=with_total, q=q
         )
 
         if not items:
             raise ValueError("No locations found")
 
-        return {
+        return json_response(PaginatedLocationResponse, {
             "data": items,
             "meta": {
                 "current_page": page,
@@ -69,46 +107,63 @@ async def get_locations(
                 "last_item": last_item,
                 "items_per_page": items_per_page,
                 "total": total,
+                "has_next": page < last_page,
             },
             "status_code": 200,
-        }
+        })
     except ValueError as e:
         raise HTTPException(status_code=404, detail=f"{e}")
+    except HTTPException as e:
+        raise e
     except Exception as e:
         logging.error(e)
         raise HTTPException(status_code=500, detail="Internal server error")
 
 
 @route.get("/locations/{id}", status_code=200, response_model=SingleLocationResponse)
-async def get_location(id: int, db: Session = Depends(get_session)):
+async def get_location(
+    id: int,
+    request: Request,
+    response: Response,
+    location_service: AsyncLocationService = Depends(get_location_service),
+):
     """
     Get a location by their unique identifier.
 
     Args:
         id (int): The unique identifier of the location.
-        db (Session): SQLAlchemy database session.
+        request (Request): The request, for its If-None-Match and If-Modified-Since headers.
+        response (Response): The response, which gets the ETag and Last-Modified headers.
+        location_service (AsyncLocationService): Location service of the request.
 
     Returns:
-        LocationResponse: Location object.
+        LocationResponse: Location object, or an empty 304 response when the client's copy is current.
     """
     try:
-        location_service.db = db
-        location = location_service.find(id)
+        location = await location_service.find_unless_fresh(
+            id, lambda timestamps: not_modified(request, response, id, timestamps)
+        )
+        if isinstance(location, Response):
+            return location
         if not location:
             raise HTTPException(status_code=404, detail="Location not found")
-        return {"data": location, "status_code": 200}
+        return json_response(SingleLocationResponse, {"data": location, "status_code": 200}, headers=response.headers)
+    except HTTPException as e:
+        raise e
     except Exception as e:
         raise HTTPException(status_code=500, detail="Internal server error")
 
 
 @route.post("/locations", status_code=201, response_model=SingleLocationResponse)
-async def create_location(location: LocationCreateRequest, db: Session = Depends(get_session)):
+async def create_location(
+    location: LocationCreateRequest, location_service: AsyncLocationService = Depends(get_location_service)
+):
     """
     Create a new location.
 
     Args:
         location (LocationCreateRequest): Location creation request.
-        db (Session): SQLAlchemy database session.
+        location_service (AsyncLocationService): Location service of the request.
 
     Returns:
         LocationCreateResponse: Created location object.
@@ -118,8 +173,7 @@ async def create_location(location: LocationCreateRequest, db: Session = Depends
 
     """
     try:
-        location_service.db = db
-        created_location = location_service.save(location)
+        created_location = await location_service.save(location)
         return {"data": created_location, "status_code": 201}
     except Exception as e:
         raise HTTPException(status_code=500, detail="Internal server error")
@@ -127,7 +181,7 @@ async def create_location(location: LocationCreateRequest, db: Session = Depends
 
 @route.put("/locations/{id}", status_code=200, response_model=SingleLocationResponse)
 async def update_location(
-    id: int, location: LocationUpdateRequest, db: Session = Depends(get_session)
+    id: int, location: LocationUpdateRequest, location_service: AsyncLocationService = Depends(get_location_service)
 ):
     """
     Update an existing location's information.
@@ -135,7 +189,7 @@ async def update_location(
     Args:
         id (int): The unique identifier of the location to update.
         location (LocationUpdateRequest): Location update request.
-        db (Session): SQLAlchemy database session.
+        location_service (AsyncLocationService): Location service of the request.
 
     Returns:
         LocationUpdateResponse: Updated location object.
@@ -146,8 +200,7 @@ async def update_location(
                        or if there is an internal server error (status_code=500).
     """
     try:
-        location_service.db = db
-        updated_location = location_service.update(id, location)
+        updated_location = await location_service.update(id, location)
         if not updated_location:
             raise HTTPException(status_code=404, detail="Location not found")
         return {"data": updated_location, "status_code": 200}
@@ -158,13 +211,13 @@ async def update_location(
 
 
 @route.delete("/locations/{id}", status_code=200, response_model=SingleLocationResponse)
-async def delete_location(id: int, db: Session = Depends(get_session)):
+async def delete_location(id: int, location_service: AsyncLocationService = Depends(get_location_service)):
     """
     Delete a location by their unique identifier.
 
     Args:
         id (int): The unique identifier of the location to delete.
-        db (Session): SQLAlchemy database session.
+        location_service (AsyncLocationService): Location service of the request.
 
     Returns:
         dict: A dictionary containing the deleted location data and the status code.
@@ -173,9 +226,8 @@ async def delete_location(id: int, db: Session = Depends(get_session)):
         HTTPException: If the location is not found or if there is an internal server error.
     """
     try:
-        location_service.db = db
 
-        location = location_service.delete(id)
+        location = await location_service.delete(id)
 
         if not location:
             raise HTTPException(status_code=500, detail="Failed to delete location")
@@ -1,37 +1,85 @@
 import logging
 from typing import List, Optional
 
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 
 from app.models.reading import Reading
-from app.requests.reading import ReadingCreateRequest, ReadingUpdateRequest
+from app.requests.reading import ReadingBatchCreateRequest, ReadingCreateRequest, ReadingUpdateRequest
+from app.responses.conditional import not_modified
 from app.responses.reading import (
     PaginatedReadingResponse,
+    ReadingAggregateResponse,
+    ReadingBatchResponse,
+    ReadingResponse,
     SingleReadingResponse
 )
-from app.services.reading import ReadingService
-from config.database import get_session
+from app.responses.serialization import json_response
+from app.responses.sparse import parse_names, sparse
+from app.services.reading import READING_RELATIONSHIPS, AsyncReadingService, ReadingService
+from app.services.rollup import AsyncRollupService
+from config.database import get_async_session, get_session
 from datetime import date
 
-reading_service = ReadingService(db=None)
+
+EXPORT_MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+    "arrow": "application/vnd.apache.arrow.stream",
+}
 
 route = APIRouter(
     prefix="/api", tags=["Readings"], responses={404: {"description": "Not found"}}
 )
 
 
+def get_reading_service(db: Session = Depends(get_async_session)) -> AsyncReadingService:
+    """
+    Provide a ReadingService bound to the session of the current request.
+
+    Args:
+        db (Session): SQLAlchemy database session.
+
+    Returns:
+        AsyncReadingService: The service instance of this request.
+    """
+    return AsyncReadingService(db)
+
+
+def get_rollup_service(db: Session = Depends(get_async_session)) -> AsyncRollupService:
+    """
+    Provide a RollupService bound to the session of the current request.
+
+    Args:
+        db (Session): SQLAlchemy database session.
+
+    Returns:
+        AsyncRollupService: The service instance of this request.
+    """
+    return AsyncRollupService(db)
+
+
 @route.get("/readings", status_code=200, response_model=PaginatedReadingResponse)
 async def get_readings(
     page: Optional[int] = Query(1, description="page number", gt=0),
     items_per_page: Optional[int] = Query(10, description="items per page", gt=0),
     sort_type: Optional[str] = Query('asc', description="sort type (asc or desc)"),
     sort_by: Optional[str] = Query('id', description="sort by field"),
-    user_id: Optional[str] = Query(None, description="first field filter"),
-    device_id: Optional[str] = Query(None, description="second field filter"),
-    start_date: Optional[date] = Query(None, description="start date filter"),
+    user_id: Optional[str] = Query(None, description="user ids filter, e.g. 1 or 1,2,3"),
+    device_id: Optional[str] = Query(None, description="device ids filter, e.g. 1 or 1,2,3"),
+    start_date: Optional[date] = Query(
+        None, description="start date filter; without dates only the last READING_LISTING_DAYS days are listed"
+    ),
     end_date: Optional[date] = Query(None, description="end date filter"),
-    db: Session = Depends(get_session),
+    cursor: Optional[str] = Query(None, description="keyset cursor, empty for the first page"),
+    with_total: Optional[str] = Query('exact', description="total mode (exact, estimate or none)"),
+    id_match: Optional[str] = Query('exact', description="id filter matching (exact, or the deprecated substring)"),
+    fields: Optional[str] = Query(None, description="reading fields to send, e.g. id,value,device_id"),
+    include: Optional[str] = Query(None, description="relationships to embed (device, user), all when missing"),
+    compound: Optional[bool] = Query(False, description="send the relationships once in an included map"),
+    response: Response = None,
+    reading_service: AsyncReadingService = Depends(get_reading_service),
 ):
     """
     Get a list of readings with pagination and optional filters.
@@ -43,24 +91,62 @@ async def get_readings(
         sort_type (str): Sort type (asc or desc).
         start_date (date): Start date filter.
         end_date (date): End date filter.
-        user_id (str): First field filter.
-        device_id (str): Second field filter.
-        db (Session): SQLAlchemy database session.
+        user_id (str): User IDs filter, comma-separated.
+        device_id (str): Device IDs filter, comma-separated.
+        cursor (str): Keyset cursor; switches to cursor pagination when given.
+        with_total (str): Total mode; 'estimate' and 'none' skip the full count.
+        id_match (str): ID filter matching; 'substring' is deprecated and flagged
+            with a Deprecation response header.
+        fields (str): Reading fields to send, comma-separated; the id is always sent.
+        include (str): Relationships to load and send, comma-separated; empty for none.
+        compound (bool): Send the included relationships once, by ID, in an included map
+            instead of inside every reading.
+        response (Response): The outgoing response, used to set headers.
+        reading_service (AsyncReadingService): Reading service of the request.
 
     Returns:
         List[ReadingResponse]: List of reading objects.
     """
     try:
-        reading_service.db = db
-        items, total, last_page, first_item, last_item = reading_service.all(
+        if id_match == 'substring':
+            response.headers["Deprecation"] = "true"
+
+        field_names = [name for name in ReadingResponse.model_fields if name not in READING_RELATIONSHIPS]
+        fieldset = parse_names(fields, field_names, "fields")
+        relationships = parse_names(include, list(READING_RELATIONSHIPS), "include")
+
+        if cursor is not None:
+            items, next_cursor = await reading_service.all_by_cursor(
+                items_per_page, cursor, sort_type=sort_type, sort_by=sort_by,
+                start_date=start_date, end_date=end_date, user_id=user_id, device_id=device_id, id_match=id_match,
+                include=relationships
+            )
+
+            if not items:
+                raise ValueError("No readings found")
+
+            content = {
+                "data": items,
+                "meta": {
+                    "items_per_page": items_per_page,
+                    "next_cursor": next_cursor,
+                    "has_next": next_cursor is not None,
+                },
+                "status_code": 200,
+            }
+            exclude = sparse(content, ReadingResponse, READING_RELATIONSHIPS, fieldset, relationships, compound)
+            return json_response(PaginatedReadingResponse, content, headers=response.headers, exclude=exclude)
+
+        items, total, last_page, first_item, last_item = await reading_service.all(
             page, items_per_page, sort_type=sort_type, sort_by=sort_by,
-            start_date=start_date, end_date=end_date, user_id=user_id, device_id=device_id
+            start_date=start_date, end_date=end_date, user_id=user_id, device_id=device_id, with_total=with_total,
+            id_match=id_match, include=relationships
         )
 
         if not items:
             raise ValueError("No readings found")
 
-        return {
+        content = {
             "data": items,
             "meta": {
                 "current_page": page,
@@ -69,46 +155,167 @@ async def get_readings(
                 "last_item": last_item,
                 "items_per_page": items_per_page,
                 "total": total,
+                "has_next": page < last_page,
             },
             "status_code": 200,
         }
+        exclude = sparse(content, ReadingResponse, READING_RELATIONSHIPS, fieldset, relationships, compound)
+        return json_response(PaginatedReadingResponse, content, headers=response.headers, exclude=exclude)
     except ValueError as e:
         raise HTTPException(status_code=404, detail=f"{e}")
+    except HTTPException as e:
+        raise e
+    except Exception as e:
+        logging.error(e)
+        raise HTTPException(status_code=500, detail="Internal server error")
+
+
+@route.get(
+    "/readings/aggregate",
+    status_code=200,
+    response_model=ReadingAggregateResponse,
+    response_model_exclude_unset=True,
+)
+async def get_reading_aggregates(
+    device_id: int = Query(..., description="device to aggregate"),
+    bucket: Optional[str] = Query('1h', description="bucket width (1m, 5m, 15m, 1h or 1d)"),
+    fn: Optional[str] = Query('avg', description="comma-separated functions (avg, min, max, count, last)"),
+    start_date: Optional[date] = Query(None, description="start date filter"),
+    end_date: Optional[date] = Query(None, description="end date filter"),
+    rollup_service: AsyncRollupService = Depends(get_rollup_service),
+):
+    """
+    Get the readings of a device aggregated into time buckets.
+
+    Buckets are served from the reading rollups, topped up with the readings
+    inserted since their last refresh.
+
+    Args:
+        device_id (int): The device to aggregate.
+        bucket (str): Bucket width.
+        fn (str): Comma-separated aggregate functions.
+        start_date (date): Start date filter.
+        end_date (date): End date filter.
+        rollup_service (AsyncRollupService): Rollup service of the request.
+
+    Returns:
+        ReadingAggregateResponse: One entry per bucket with the requested functions.
+    """
+    try:
+        fns = [name.strip() for name in fn.split(",") if name.strip()]
+        buckets = await rollup_service.aggregate(device_id, bucket, fns, start_date=start_date, end_date=end_date)
+
+        return {
+            "data": buckets,
+            "meta": {
+                "device_id": device_id,
+                "bucket": bucket,
+                "fn": fns,
+            },
+            "status_code": 200,
+        }
+    except HTTPException as e:
+        raise e
+    except Exception as e:
+        logging.error(e)
+        raise HTTPException(status_code=500, detail="Internal server error")
+
+
+@route.get("/readings/export", status_code=200, response_class=StreamingResponse)
+async def export_readings(
+    format: Optional[str] = Query('ndjson', description="export format (ndjson, csv or arrow)"),
+    user_id: Optional[str] = Query(None, description="user ids filter, e.g. 1 or 1,2,3"),
+    device_id: Optional[str] = Query(None, description="device ids filter, e.g. 1 or 1,2,3"),
+    start_date: Optional[date] = Query(None, description="start date filter"),
+    end_date: Optional[date] = Query(None, description="end date filter"),
+    db: Session = Depends(get_session),
+):
+    """
+    Stream every reading matching the filters as NDJSON, CSV or an Arrow IPC stream.
+
+    The Arrow stream carries device_id, user_id, created_at, value_num and unit
+    and needs pyarrow; without it the route answers 501. The rows are fetched
+    while the response streams, so the export uses the synchronous service,
+    which the streaming response iterates on the threadpool.
+
+    Args:
+        format (str): Export format (ndjson, csv or arrow).
+        user_id (str): User IDs filter, comma-separated.
+        device_id (str): Device IDs filter, comma-separated.
+        start_date (date): Start date filter.
+        end_date (date): End date filter.
+        db (Session): SQLAlchemy database session.
+
+    Returns:
+        StreamingResponse: The readings, one per line, ordered by ID.
+    """
+    try:
+        export_service = ReadingService(db)
+        if format == "arrow":
+            chunks = export_service.export_arrow(
+                start_date=start_date, end_date=end_date, user_id=user_id, device_id=device_id
+            )
+        else:
+            chunks = export_service.export(
+                format, start_date=start_date, end_date=end_date, user_id=user_id, device_id=device_id
+            )
+        media_type = EXPORT_MEDIA_TYPES[format]
+        return StreamingResponse(
+            chunks,
+            media_type=media_type,
+            headers={"Content-Disposition": f"attachment; filename=readings.{format}"},
+        )
+    except HTTPException as e:
+        raise e
     except Exception as e:
         logging.error(e)
         raise HTTPException(status_code=500, detail="Internal server error")
 
 
 @route.get("/readings/{id}", status_code=200, response_model=SingleReadingResponse)
-async def get_reading(id: int, db: Session = Depends(get_session)):
+async def get_reading(
+    id: int,
+    request: Request,
+    response: Response,
+    reading_service: AsyncReadingService = Depends(get_reading_service),
+):
     """
     Get a reading by their unique identifier.
 
     Args:
         id (int): The unique identifier of the reading.
-        db (Session): SQLAlchemy database session.
+        request (Request): The request, for its If-None-Match and If-Modified-Since headers.
+        response (Response): The response, which gets the ETag and Last-Modified headers.
+        reading_service (AsyncReadingService): Reading service of the request.
 
     Returns:
-        ReadingResponse: Reading object.
+        ReadingResponse: Reading object, or an empty 304 response when the client's copy is current.
     """
     try:
-        reading_service.db = db
-        reading = reading_service.find(id)
+        reading = await reading_service.find_unless_fresh(
+            id, lambda timestamps: not_modified(request, response, id, timestamps)
+        )
+        if isinstance(reading, Response):
+            return reading
         if not reading:
             raise HTTPException(status_code=404, detail="Reading not found")
-        return {"data": reading, "status_code": 200}
+        return json_response(SingleReadingResponse, {"data": reading, "status_code": 200}, headers=response.headers)
+    except HTTPException as e:
+        raise e
     except Exception as e:
         raise HTTPException(status_code=500, detail="Internal server error")
 
 
 @route.post("/readings", status_code=201, response_model=SingleReadingResponse)
-async def create_reading(reading: ReadingCreateRequest, db: Session = Depends(get_session)):
+async def create_reading(
+    reading: ReadingCreateRequest, reading_service: AsyncReadingService = Depends(get_reading_service)
+):
     """
     Create a new reading.
 
     Args:
         reading (ReadingCreateRequest): Reading creation request.
-        db (Session): SQLAlchemy database session.
+        reading_service (AsyncReadingService): Reading service of the request.
 
     Returns:
         ReadingCreateResponse: Created reading object.
@@ -118,16 +325,49 @@ async def create_reading(reading: ReadingCreateRequest, db: Session = Depends(ge
 
     """
     try:
-        reading_service.db = db
-        created_reading = reading_service.save(reading)
+        created_reading = await reading_service.save(reading)
         return {"data": created_reading, "status_code": 201}
     except Exception as e:
         raise HTTPException(status_code=500, detail="Internal server error")
 
 
+@route.post("/readings/batch", status_code=201, response_model=ReadingBatchResponse)
+async def create_readings(
+    batch: ReadingBatchCreateRequest, reading_service: AsyncReadingService = Depends(get_reading_service)
+):
+    """
+    Create many readings in a single transaction.
+
+    Args:
+        batch (ReadingBatchCreateRequest): Batch of reading creation requests.
+        reading_service (AsyncReadingService): Reading service of the request.
+
+    Returns:
+        ReadingBatchResponse: The outcome of every submitted reading.
+
+    Raises:
+        HTTPException: If there is an internal server error.
+    """
+    try:
+        results = await reading_service.save_many(batch.readings)
+        created = sum(1 for result in results if result["status"] == "created")
+        return {
+            "data": results,
+            "meta": {
+                "total": len(results),
+                "created": created,
+                "rejected": len(results) - created,
+            },
+            "status_code": 201,
+        }
+    except Exception as e:
+        logging.error(e)
+        raise HTTPException(status_code=500, detail="Internal server error")
+
+
 @route.put("/readings/{id}", status_code=200, response_model=SingleReadingResponse)
 async def update_reading(
-    id: int, reading: ReadingUpdateRequest, db: Session = Depends(get_session)
+    id: int, reading: ReadingUpdateRequest, reading_service: AsyncReadingService = Depends(get_reading_service)
 ):
     """
     Update an existing reading's information.
@@ -135,7 +375,7 @@ async def update_reading(
     Args:
         id (int): The unique identifier of the reading to update.
         reading (ReadingUpdateRequest): Reading update request.
-        db (Session): SQLAlchemy database session.
+        reading_service (AsyncReadingService): Reading service of the request.
 
     Returns:
         ReadingUpdateResponse: Updated reading object.
@@ -146,8 +386,7 @@ async def update_reading(
                        or if there is an internal server error (status_code=500).
     """
     try:
-        reading_service.db = db
-        updated_reading = reading_service.update(id, reading)
+        updated_reading = await reading_service.update(id, reading)
         if not updated_reading:
             raise HTTPException(status_code=404, detail="Reading not found")
         return {"data": updated_reading, "status_code": 200}
@@ -158,13 +397,13 @@ async def update_reading(
 
 
 @route.delete("/readings/{id}", status_code=200, response_model=SingleReadingResponse)
-async def delete_reading(id: int, db: Session = Depends(get_session)):
+async def delete_reading(id: int, reading_service: AsyncReadingService = Depends(get_reading_service)):
     """
     Delete a reading by their unique identifier.
 
     Args:
         id (int): The unique identifier of the reading to delete.
-        db (Session): SQLAlchemy database session.
+        reading_service (AsyncReadingService): Reading service of the request.
 
     Returns:
         dict: A dictionary containing the deleted reading data and the status code.
@@ -173,9 +412,8 @@ async def delete_reading(id: int, db: Session = Depends(get_session)):
         HTTPException: If the reading is not found or if there is an internal server error.
     """
     try:
-        reading_service.db = db
 
-        reading = reading_service.delete(id)
+        reading = await reading_service.delete(id)
 
         if not reading:
             raise HTTPException(status_code=500, detail="Failed to delete reading")
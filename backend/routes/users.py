@@ -2,21 +2,35 @@ import logging
 from datetime import date
 from typing import Optional
 
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
 from sqlalchemy.orm import Session
 
 from app.requests.user import UserCreateRequest, UserUpdateRequest
+from app.responses.conditional import not_modified
 from app.responses.user import PaginatedUserResponse, SingleUserResponse
-from app.services.user import UserService
-from config.database import get_session
+from app.responses.serialization import json_response
+from app.services.user import AsyncUserService
+from config.database import get_async_session
 
-user_service = UserService(db=None)
 
 route = APIRouter(
     prefix="/api", tags=["Users"], responses={404: {"description": "Not found"}}
 )
 
 
+def get_user_service(db: Session = Depends(get_async_session)) -> AsyncUserService:
+    """
+    Provide a UserService bound to the session of the current request.
+
+    Args:
+        db (Session): SQLAlchemy database session.
+
+    Returns:
+        AsyncUserService: The service instance of this request.
+    """
+    return AsyncUserService(db)
+
+
 @route.get("/users", status_code=200, response_model=PaginatedUserResponse)
 async def get_users(
     page: Optional[int] = Query(1, description="page number", gt=0),
@@ -27,7 +41,10 @@ async def get_users(
     email: Optional[str] = Query(None, description="email filter"),
     start_date: Optional[date] = Query(None, description="start date filter"),
     end_date: Optional[date] = Query(None, description="end date filter"),
-    db: Session = Depends(get_session),
+    cursor: Optional[str] = Query(None, description="keyset cursor, empty for the first page"),
+    with_total: Optional[str] = Query("exact", description="total mode (exact, estimate or none)"),
+    q: Optional[str] = Query(None, description="search text, ranked by relevance"),
+    user_service: AsyncUserService = Depends(get_user_service),
 ):
     """
     Get a list of users with pagination and optional filters.
@@ -41,14 +58,39 @@ async def get_users(
         end_date (date): End date filter.
         username (str): Username filter.
         email (str): Email filter.
-        db (Session): SQLAlchemy database session.
+        cursor (str): Keyset cursor; switches to cursor pagination when given.
+        with_total (str): Total mode; 'estimate' and 'none' skip the full count.
+        q (str): Search text; page results are ranked by relevance. Not allowed with a cursor.
+        user_service (AsyncUserService): User service of the request.
 
     Returns:
         List[UserResponse]: List of user objects.
     """
     try:
-        user_service.db = db
-        items, total, last_page, first_item, last_item = user_service.all(
+        if cursor is not None:
+            items, next_cursor = await user_service.all_by_cursor(
+                items_per_page,
+                cursor,
+                sort_type=sort_type,
+                sort_by=sort_by,
+                start_date=start_date,
+                end_date=end_date,
+                username=username,
+                email=email,
+                q=q,
+            )
+
+            return json_response(PaginatedUserResponse, {
+                "data": items,
+                "meta": {
+                    "items_per_page": items_per_page,
+                    "next_cursor": next_cursor,
+                    "has_next": next_cursor is not None,
+                },
+                "status_code": 200 if items else 404,
+            })
+
+        items, total, last_page, first_item, last_item = await user_service.all(
             page,
             items_per_page,
             sort_type=sort_type,
@@ -57,10 +99,12 @@ async def get_users(
             end_date=end_date,
             username=username,
             email=email,
+            with_total=with_total,
+            q=q,
         )
 
         if not items:
-            return {
+            return json_response(PaginatedUserResponse, {
                 "data": [],
                 "meta": {
                     "current_page": 0,
@@ -71,9 +115,9 @@ async def get_users(
                     "total": 0,
                 },
                 "status_code": 404,
-            }
+            })
 
-        return {
+        return json_response(PaginatedUserResponse, {
             "data": items,
             "meta": {
                 "current_page": page,
@@ -82,34 +126,47 @@ async def get_users(
                 "last_item": last_item,
                 "items_per_page": items_per_page,
                 "total": total,
+                "has_next": page < last_page,
             },
             "status_code": 200,
-        }
+        })
     except ValueError as e:
         raise HTTPException(status_code=404, detail=f"{e}")
+    except HTTPException as e:
+        raise e
     except Exception as e:
         logging.error(e)
         raise HTTPException(status_code=500, detail="Internal server error")
 
 
 @route.get("/users/{id}", status_code=200, response_model=SingleUserResponse)
-async def get_user(id: int, db: Session = Depends(get_session)):
+async def get_user(
+    id: int,
+    request: Request,
+    response: Response,
+    user_service: AsyncUserService = Depends(get_user_service),
+):
     """
     Get a user by their unique identifier.
 
     Args:
         id (int): The unique identifier of the user.
-        db (Session): SQLAlchemy database session.
+        request (Request): The request, for its If-None-Match and If-Modified-Since headers.
+        response (Response): The response, which gets the ETag and Last-Modified headers.
+        user_service (AsyncUserService): User service of the request.
 
     Returns:
-        UserResponse: User object.
+        UserResponse: User object, or an empty 304 response when the client's copy is current.
     """
     try:
-        user_service.db = db
-        user = user_service.find(id)
+        user = await user_service.find_unless_fresh(
+            id, lambda timestamps: not_modified(request, response, id, timestamps)
+        )
+        if isinstance(user, Response):
+            return user
         if not user:
             raise HTTPException(status_code=404, detail="User not found")
-        return {"data": user, "status_code": 200}
+        return json_response(SingleUserResponse, {"data": user, "status_code": 200}, headers=response.headers)
     except HTTPException as e:
         logging.error(e)
         raise HTTPException(status_code=404, detail="User not found")
@@ -119,13 +176,13 @@ async def get_user(id: int, db: Session = Depends(get_session)):
 
 
 @route.post("/users", status_code=201, response_model=SingleUserResponse)
-async def create_user(user: UserCreateRequest, db: Session = Depends(get_session)):
+async def create_user(user: UserCreateRequest, user_service: AsyncUserService = Depends(get_user_service)):
     """
     Create a new user.
 
     Args:
         user (UserCreateRequest): User creation request.
-        db (Session): SQLAlchemy database session.
+        user_service (AsyncUserService): User service of the request.
 
     Returns:
         UserCreateResponse: Created user object.
@@ -135,8 +192,7 @@ async def create_user(user: UserCreateRequest, db: Session = Depends(get_session
 
     """
     try:
-        user_service.db = db
-        created_user = user_service.save(user)
+        created_user = await user_service.save(user)
         return {"data": created_user, "status_code": 201}
     except Exception as e:
         logging.error(e)
@@ -145,7 +201,7 @@ async def create_user(user: UserCreateRequest, db: Session = Depends(get_session
 
 @route.put("/users/{id}", status_code=200, response_model=SingleUserResponse)
 async def update_user(
-    id: int, user: UserUpdateRequest, db: Session = Depends(get_session)
+    id: int, user: UserUpdateRequest, user_service: AsyncUserService = Depends(get_user_service)
 ):
     """
     Update an existing user's information.
@@ -153,7 +209,7 @@ async def update_user(
     Args:
         id (int): The unique identifier of the user to update.
         user (UserUpdateRequest): User update request.
-        db (Session): SQLAlchemy database session.
+        user_service (AsyncUserService): User service of the request.
 
     Returns:
         UserUpdateResponse: Updated user object.
@@ -164,8 +220,7 @@ async def update_user(
                        or if there is an internal server error (status_code=500).
     """
     try:
-        user_service.db = db
-        updated_user = user_service.update(id, user)
+        updated_user = await user_service.update(id, user)
         if not updated_user:
             raise HTTPException(status_code=404, detail="User not found")
         return {"data": updated_user, "status_code": 200}
@@ -178,13 +233,13 @@ async def update_user(
 
 
 @route.delete("/users/{id}", status_code=200, response_model=SingleUserResponse)
-async def delete_user(id: int, db: Session = Depends(get_session)):
+async def delete_user(id: int, user_service: AsyncUserService = Depends(get_user_service)):
     """
     Delete a user by their unique identifier.
 
     Args:
         id (int): The unique identifier of the user to delete.
-        db (Session): SQLAlchemy database session.
+        user_service (AsyncUserService): User service of the request.
 
     Returns:
         dict: A dictionary containing the deleted user data and the status code.
@@ -193,9 +248,8 @@ async def delete_user(id: int, db: Session = Depends(get_session)):
         HTTPException: If the user is not found or if there is an internal server error.
     """
     try:
-        user_service.db = db
 
-        user = user_service.delete(id)
+        user = await user_service.delete(id)
 
         if not user:
             raise HTTPException(status_code=404, detail="User not found")
@@ -212,13 +266,12 @@ async def delete_user(id: int, db: Session = Depends(get_session)):
     status_code=200,
 )
 async def delete_multiple_users(
-    ids: str, db: Session = Depends(get_session),
+    ids: str, user_service: AsyncUserService = Depends(get_user_service),
 ):
     try:
         id_list = [int(id) for id in ids.split(",")]
 
-        user_service.db = db
-        user_service.bulk_delete(id_list)
+        await user_service.bulk_delete(id_list)
 
         return {"data": {"user_deleted": len(id_list)}, "status_code": 200}
     except Exception as e:
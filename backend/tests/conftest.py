@@ -2,19 +2,19 @@ import os
 
 import pytest
 from dotenv import load_dotenv
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
 from starlette.testclient import TestClient
 
 from app.models.base import Base
 from app.models.user import User
-from config.database import get_session
+from app.services.cache import reference_caches, response_backends
+from config.database import get_async_session, get_session
 from public.main import app
 
 load_dotenv(dotenv_path=".env_testing")
 
-get_db = get_session()
-
 
 def construct_database_url():
     db_type = os.environ.get("DB_TYPE", "sqlite")
@@ -54,6 +54,45 @@ def test_db_session():
     Base.metadata.drop_all(bind=engine)
 
 
+@pytest.fixture(autouse=True)
+def clear_caches():
+    yield
+    for cache in reference_caches.values():
+        cache.clear()
+    response_backends.clear()
+
+
+@pytest.fixture(scope="function")
+def sqlite_session():
+    engine = create_engine(
+        "sqlite://",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    Base.metadata.create_all(bind=engine)
+    TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+    db = TestingSessionLocal()
+
+    yield db
+
+    db.close()
+    engine.dispose()
+
+
+@pytest.fixture
+def statements(sqlite_session):
+    executed = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        executed.append(statement)
+
+    engine = sqlite_session.get_bind()
+    event.listen(engine, "before_cursor_execute", record)
+    yield executed
+    event.remove(engine, "before_cursor_execute", record)
+
+
 @pytest.fixture(scope="module")
 def test_data(test_db_session):
     users = [
@@ -78,7 +117,8 @@ def test_data(test_db_session):
 
 @pytest.fixture(scope="function")
 def client(test_db_session):
-    app.dependency_overrides[get_db] = lambda: test_db_session
+    app.dependency_overrides[get_session] = lambda: test_db_session
+    app.dependency_overrides[get_async_session] = lambda: test_db_session
 
     with TestClient(app) as test_client:
         yield test_client
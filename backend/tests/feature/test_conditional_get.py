@@ -0,0 +1,86 @@
+from datetime import datetime
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from starlette.testclient import TestClient
+
+from app.models.base import Base
+from app.models.category import Category
+from app.services.device import DeviceService
+from config.database import get_async_session
+from public.main import app
+from tests.unit.test_reading_service import add_readings, seed_devices
+
+
+@pytest.fixture
+def client(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'conditional.db'}", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=engine)
+    factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+    db = factory()
+    user, devices = seed_devices(db, 1)
+    add_readings(db, user, devices, 1)
+    db.close()
+
+    def override_session():
+        db = factory()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    app.dependency_overrides[get_async_session] = override_session
+    yield TestClient(app), factory
+    app.dependency_overrides.clear()
+    engine.dispose()
+
+
+def test_matching_etag_skips_building_the_device(client, monkeypatch):
+    client, _ = client
+    first = client.get("/api/devices/1")
+    assert first.status_code == 200
+    assert first.headers["etag"].startswith('W/"')
+    assert first.headers["last-modified"].endswith(" GMT")
+
+    def fail(self, id):
+        raise AssertionError("the device graph was built")
+
+    monkeypatch.setattr(DeviceService, "find", fail)
+    second = client.get("/api/devices/1", headers={"If-None-Match": first.headers["etag"]})
+
+    assert second.status_code == 304
+    assert second.content == b""
+    assert second.headers["etag"] == first.headers["etag"]
+
+
+def test_if_modified_since_compares_whole_seconds(client):
+    client, _ = client
+    last_modified = client.get("/api/readings/1").headers["last-modified"]
+
+    assert client.get("/api/readings/1", headers={"If-Modified-Since": last_modified}).status_code == 304
+    assert client.get(
+        "/api/readings/1", headers={"If-Modified-Since": "Sat, 01 Jan 2000 00:00:00 GMT"}
+    ).status_code == 200
+
+
+def test_embedded_changes_move_the_etag(client):
+    client, factory = client
+    tag = client.get("/api/readings/1").headers["etag"]
+
+    db = factory()
+    db.query(Category).update({Category.updated_at: datetime(2030, 1, 1)})
+    db.commit()
+    db.close()
+
+    response = client.get("/api/readings/1", headers={"If-None-Match": tag})
+    assert response.status_code == 200
+    assert response.headers["etag"] != tag
+    assert response.headers["last-modified"] == "Tue, 01 Jan 2030 00:00:00 GMT"
+
+
+def test_missing_entity_is_not_found(client):
+    client, _ = client
+    assert client.get("/api/devices/99").status_code == 404
+    assert client.get("/api/readings/99").status_code == 404
@@ -0,0 +1,86 @@
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from starlette.testclient import TestClient
+
+from app.models.base import Base
+from config.database import get_async_session
+from public.main import app
+from tests.unit.test_reading_service import add_readings, seed_devices
+
+
+@pytest.fixture
+def client(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'readings.db'}", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=engine)
+    factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+    db = factory()
+    user, devices = seed_devices(db, 2)
+    add_readings(db, user, devices, 4)
+    db.close()
+
+    def override_session():
+        db = factory()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    app.dependency_overrides[get_async_session] = override_session
+    yield TestClient(app)
+    app.dependency_overrides.clear()
+    engine.dispose()
+
+
+def test_substring_id_match_is_flagged_as_deprecated(client):
+    for query in ("", "&cursor="):
+        response = client.get(f"/api/readings?device_id=1&id_match=substring{query}")
+
+        assert response.status_code == 200
+        assert response.headers["deprecation"] == "true"
+
+
+def test_listing_without_parameters_embeds_every_relationship(client):
+    body = client.get("/api/readings").json()
+
+    assert "included" not in body
+    assert body["data"][0]["user"]["username"] == "farmer"
+    assert body["data"][0]["device"]["category"]["name"] == "Sensors"
+
+
+def test_fields_and_include_trim_the_readings(client):
+    body = client.get("/api/readings?fields=value&include=device").json()
+
+    assert body["data"][0].keys() == {"id", "value", "device"}
+    assert body["data"][0]["device"]["name"] == "device1"
+    assert body["meta"]["total"] == 4
+
+    body = client.get("/api/readings?cursor=&include=").json()
+    assert body["data"][0].keys() == {"id", "user_id", "device_id", "unit", "value"}
+
+
+def test_compound_mode_sends_each_related_entity_once(client):
+    body = client.get("/api/readings?fields=value&compound=true").json()
+
+    assert [item.keys() for item in body["data"]] == [{"id", "value", "user_id", "device_id"}] * 4
+    assert sorted(body["included"]["device"]) == ["1", "2"]
+    assert list(body["included"]["user"]) == ["1"]
+    assert body["included"]["device"]["2"]["location"]["name"] == "Greenhouse"
+
+
+def test_devices_accept_the_same_parameters(client):
+    body = client.get("/api/devices?include=category&compound=true&fields=name").json()
+
+    assert body["data"] == [
+        {"id": 1, "category_id": 1, "name": "device1"},
+        {"id": 2, "category_id": 1, "name": "device2"},
+    ]
+    assert body["included"] == {"category": {"1": {"id": 1, "name": "Sensors", "description": "Field sensors"}}}
+
+
+def test_unknown_names_are_rejected(client):
+    for query in ("fields=password", "include=location"):
+        response = client.get(f"/api/readings?{query}")
+
+        assert response.status_code == 400
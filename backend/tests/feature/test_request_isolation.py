@@ -0,0 +1,83 @@
+import asyncio
+import time
+from collections import defaultdict
+
+import httpx
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import NullPool
+
+from app.models.base import Base
+from app.services.device import DeviceService
+from config.database import get_async_session
+from public.main import app
+from tests.unit.test_reading_service import seed_devices
+
+DEVICES = 20
+ROUNDS = 5
+
+
+@pytest.fixture
+def session_factory(tmp_path):
+    # One connection per session, so that the concurrent requests never wait on a pool.
+    engine = create_engine(
+        f"sqlite:///{tmp_path / 'isolation.db'}", connect_args={"check_same_thread": False}, poolclass=NullPool
+    )
+    Base.metadata.create_all(bind=engine)
+    factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+    db = factory()
+    seed_devices(db, DEVICES)
+    db.close()
+
+    yield factory
+
+    engine.dispose()
+
+
+def test_concurrent_requests_never_share_sessions(session_factory, monkeypatch):
+    yielded = []
+    closed = set()
+    used = defaultdict(list)
+
+    def override_session():
+        db = session_factory()
+        yielded.append(db)
+        try:
+            yield db
+        finally:
+            db.close()
+            closed.add(id(db))
+
+    find = DeviceService.find
+
+    def recording_find(self, device_id):
+        used[id(self.db)].append(device_id)
+        time.sleep(0.005)
+        return find(self, device_id)
+
+    monkeypatch.setattr(DeviceService, "find", recording_find)
+    app.dependency_overrides[get_async_session] = override_session
+
+    async def fire():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            device_ids = [index for _ in range(ROUNDS) for index in range(1, DEVICES + 1)]
+            responses = await asyncio.gather(*(client.get(f"/api/devices/{device_id}") for device_id in device_ids))
+            return list(zip(device_ids, responses))
+
+    try:
+        results = asyncio.run(fire())
+    finally:
+        app.dependency_overrides.pop(get_async_session, None)
+
+    for device_id, response in results:
+        assert response.status_code == 200
+        assert response.json()["data"]["name"] == f"device{device_id}"
+
+    assert len(yielded) == DEVICES * ROUNDS
+    assert len({id(db) for db in yielded}) == DEVICES * ROUNDS
+    assert set(used) == {id(db) for db in yielded}
+    assert all(len(ids) == 1 for ids in used.values())
+    assert closed == {id(db) for db in yielded}
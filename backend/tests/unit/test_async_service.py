@@ -0,0 +1,50 @@
+import asyncio
+
+import pytest
+from sqlalchemy.pool import StaticPool
+
+from app.models.base import Base
+from app.services.device import AsyncDeviceService
+from app.services.reading import AsyncReadingService
+from tests.unit.test_reading_service import add_readings, seed_devices
+
+
+def test_async_service_runs_on_threadpool_with_sync_session(sqlite_session):
+    user, devices = seed_devices(sqlite_session, 3)
+    add_readings(sqlite_session, user, devices, 6)
+    reading_service = AsyncReadingService(db=sqlite_session)
+
+    readings, total, *_ = asyncio.run(reading_service.all(1, 10, device_id="2"))
+
+    assert total == 2
+    assert {reading.device.name for reading in readings} == {"device2"}
+
+
+def test_async_service_runs_on_async_session():
+    pytest.importorskip("aiosqlite")
+    from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+    async def scenario():
+        engine = create_async_engine("sqlite+aiosqlite://", poolclass=StaticPool)
+        async with engine.begin() as connection:
+            await connection.run_sync(Base.metadata.create_all)
+
+        async with async_sessionmaker(engine, expire_on_commit=False)() as db:
+            await db.run_sync(seed_devices, 4)
+            device_service = AsyncDeviceService(db)
+            devices, total, *_ = await device_service.all(1, 2, sort_type="desc")
+            found = await device_service.find(devices[0].id)
+
+        await engine.dispose()
+        return devices, total, found
+
+    devices, total, found = asyncio.run(scenario())
+
+    assert total == 4
+    assert [device.name for device in devices] == ["device4", "device3"]
+    assert found.category.name == "Sensors"
+
+
+def test_async_service_rejects_unknown_method(sqlite_session):
+    with pytest.raises(AttributeError):
+        AsyncDeviceService(db=sqlite_session).missing
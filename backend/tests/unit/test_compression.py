@@ -0,0 +1,137 @@
+import asyncio
+import gzip
+import json
+import zlib
+
+import pytest
+from starlette.applications import Starlette
+from starlette.responses import JSONResponse, Response, StreamingResponse
+from starlette.routing import Route
+from starlette.testclient import TestClient
+
+from app.middleware import compression
+from app.middleware.compression import CompressionMiddleware, available_encoders, negotiate
+
+ROWS = [{"id": i, "device_id": i % 7, "unit": "C", "value": str(i)} for i in range(200)]
+
+
+def stream(request):
+    async def lines():
+        for row in ROWS[:3]:
+            yield json.dumps(row) + "\n"
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+
+routes = Starlette(routes=[
+    Route("/rows", lambda request: JSONResponse(ROWS)),
+    Route("/small", lambda request: JSONResponse({"id": 1})),
+    Route("/image", lambda request: Response(b"\x89PNG" * 500, media_type="image/png")),
+    Route("/tagged", lambda request: JSONResponse(ROWS, headers={"etag": '"v1"'})),
+    Route("/stream", stream),
+])
+app = CompressionMiddleware(routes, minimum_size=500, encodings=("zstd", "br", "gzip"))
+
+
+def call(path, accept_encoding="gzip", middleware=app):
+    messages = []
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        messages.append(message)
+
+    asyncio.run(middleware({
+        "type": "http", "asgi": {"version": "3.0", "spec_version": "2.4"}, "method": "GET",
+        "path": path, "raw_path": path.encode(), "root_path": "", "scheme": "http", "query_string": b"",
+        "server": ("testserver", 80), "client": ("testclient", 50000),
+        "headers": [(b"accept-encoding", accept_encoding.encode())],
+    }, receive, send))
+    return messages
+
+
+def test_negotiate_follows_q_values_then_preference():
+    assert negotiate("gzip, br", ["zstd", "br", "gzip"]) == "br"
+    assert negotiate("gzip;q=1, br;q=0.5", ["zstd", "br", "gzip"]) == "gzip"
+    assert negotiate("*;q=0.1, gzip;q=0", ["gzip"]) is None
+    assert negotiate("*", ["zstd", "gzip"]) == "zstd"
+    assert negotiate(None, ["gzip"]) is None
+    assert negotiate("identity", ["gzip"]) is None
+
+
+def test_missing_packages_leave_gzip(monkeypatch, caplog):
+    monkeypatch.setattr(compression, "import_brotli", lambda: None)
+    monkeypatch.setattr(compression, "import_zstandard", lambda: None)
+
+    assert list(available_encoders(("zstd", "br", "gzip"))) == ["gzip"]
+    assert [record.levelname for record in caplog.records] == ["WARNING", "WARNING"]
+
+
+def test_large_json_is_gzipped():
+    client = TestClient(app)
+
+    response = client.get("/rows", headers={"Accept-Encoding": "gzip"})
+
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.headers["vary"] == "Accept-Encoding"
+    assert response.json() == ROWS
+    assert int(response.headers["content-length"]) < len(json.dumps(ROWS)) / 4
+
+
+def test_small_binary_and_refused_responses_are_sent_as_they_are():
+    client = TestClient(app)
+
+    small = client.get("/small", headers={"Accept-Encoding": "gzip"})
+    image = client.get("/image", headers={"Accept-Encoding": "gzip"})
+    refused = client.get("/rows", headers={"Accept-Encoding": "identity"})
+
+    assert "content-encoding" not in small.headers
+    assert small.headers["vary"] == "Accept-Encoding"
+    assert "content-encoding" not in image.headers
+    assert "vary" not in image.headers
+    assert "content-encoding" not in refused.headers
+    assert refused.json() == ROWS
+
+
+def test_strong_etags_become_weak():
+    response = TestClient(app).get("/tagged", headers={"Accept-Encoding": "gzip"})
+
+    assert response.headers["etag"] == 'W/"v1"'
+
+
+def test_streams_are_compressed_chunk_by_chunk():
+    messages = call("/stream")
+    start, bodies = messages[0], [message for message in messages[1:] if message["type"] == "http.response.body"]
+    headers = dict(start["headers"])
+
+    assert headers[b"content-encoding"] == b"gzip"
+    assert b"content-length" not in headers
+    decompressor = zlib.decompressobj(zlib.MAX_WBITS | 16)
+    assert decompressor.decompress(bodies[0]["body"]) == (json.dumps(ROWS[0]) + "\n").encode()
+    assert bodies[-1]["more_body"] is False
+    assert gzip.decompress(b"".join(body["body"] for body in bodies)).count(b"\n") == 3
+
+
+def test_streams_are_not_flushed_without_flush_chunks():
+    messages = call("/stream", middleware=CompressionMiddleware(routes, encodings=("gzip",), flush_chunks=False))
+    bodies = [message["body"] for message in messages[1:] if message["type"] == "http.response.body"]
+
+    assert zlib.decompressobj(zlib.MAX_WBITS | 16).decompress(bodies[0]) == b""
+    assert gzip.decompress(b"".join(bodies)).count(b"\n") == 3
+
+
+def test_br_and_zstd_round_trip():
+    zstandard = pytest.importorskip("zstandard")
+    brotli = pytest.importorskip("brotli")
+    decompress = {
+        "zstd": lambda body: zstandard.ZstdDecompressor().decompressobj().decompress(body),
+        "br": brotli.decompress,
+    }
+
+    for encoding in ("zstd", "br"):
+        # Sent through ASGI directly, as the test client would decode the bodies itself.
+        start, *bodies = call("/rows", accept_encoding=encoding)
+
+        assert dict(start["headers"])[b"content-encoding"] == encoding.encode()
+        assert json.loads(decompress[encoding](b"".join(body["body"] for body in bodies))) == ROWS
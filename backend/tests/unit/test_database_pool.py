@@ -0,0 +1,72 @@
+import threading
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import NullPool, QueuePool, StaticPool
+
+from config.app import get_settings
+from config.database import instrument_engine, pool_metrics, pool_options, threadpool_limit
+
+
+@pytest.fixture
+def pool_settings(monkeypatch):
+    settings = get_settings()
+
+    def configure(**values):
+        for key, value in values.items():
+            monkeypatch.setattr(settings, key, value)
+
+    yield configure
+    pool_metrics.pop("test", None)
+
+
+@pytest.mark.parametrize("mode, pool_class", [("queue", QueuePool), ("null", NullPool), ("static", StaticPool)])
+def test_pool_options_select_pool_class(pool_settings, mode, pool_class):
+    pool_settings(DB_POOL_MODE=mode, DB_POOL_SIZE=3, DB_MAX_OVERFLOW=0, DB_POOL_TIMEOUT=1)
+
+    options = pool_options("test")
+
+    assert issubclass(options["poolclass"], pool_class)
+    assert ("pool_size" in options) == (mode == "queue")
+
+
+def test_pool_options_reject_unknown_mode(pool_settings):
+    pool_settings(DB_POOL_MODE="bogus")
+
+    with pytest.raises(ValueError):
+        pool_options("test")
+
+
+@pytest.mark.parametrize("mode, db_async, limit", [
+    ("queue", False, 15), ("null", False, None), ("static", False, None), ("queue", True, None),
+])
+def test_threadpool_limit_matches_pool_capacity(pool_settings, mode, db_async, limit):
+    pool_settings(DB_POOL_MODE=mode, DB_ASYNC=db_async, DB_POOL_SIZE=5, DB_MAX_OVERFLOW=10)
+
+    assert threadpool_limit() == limit
+
+
+def test_pool_metrics_record_checkouts_and_waits(pool_settings, tmp_path):
+    pool_settings(DB_POOL_MODE="queue", DB_POOL_SIZE=1, DB_MAX_OVERFLOW=0, DB_POOL_TIMEOUT=0.2)
+    engine = instrument_engine("test", create_engine(f"sqlite:///{tmp_path}/pool.db", **pool_options("test")))
+
+    held = engine.connect()
+    with pytest.raises(PoolTimeoutError):
+        engine.connect()
+
+    released = threading.Timer(0.1, held.close)
+    released.start()
+    with engine.connect() as connection:
+        connection.exec_driver_sql("select 1")
+    released.join()
+
+    metrics = pool_metrics["test"].snapshot(engine.pool)
+    assert metrics["pool"] == "QueuePool"
+    assert metrics["checkouts"] == 2
+    assert metrics["checkins"] == 2
+    assert metrics["connects"] == 1
+    assert metrics["timeouts"] == 1
+    assert metrics["wait_seconds_max"] >= 0.2
+    assert metrics["size"] == 1 and metrics["checked_out"] == 0
+    engine.dispose()
@@ -0,0 +1,79 @@
+import asyncio
+import logging
+import threading
+
+import pytest
+from sqlalchemy.orm import Session
+
+from config.database import SessionLeakDetector, get_async_session, get_session, session_leak_detector
+
+
+def test_get_session_closes_after_request():
+    dependency = get_session()
+    db = next(dependency)
+    db.connection()
+    assert db.in_transaction()
+
+    with pytest.raises(StopIteration):
+        next(dependency)
+
+    assert not db.in_transaction()
+    assert id(db) not in session_leak_detector._sessions
+
+
+def test_get_session_rolls_back_on_error():
+    dependency = get_session()
+    db = next(dependency)
+    db.connection()
+
+    with pytest.raises(RuntimeError):
+        dependency.throw(RuntimeError("request failed"))
+
+    assert not db.in_transaction()
+    assert id(db) not in session_leak_detector._sessions
+
+
+def test_get_async_session_ends_sync_sessions_off_the_event_loop(monkeypatch):
+    threads = {}
+    for name in ("rollback", "close"):
+        def record(self, name=name, method=getattr(Session, name)):
+            threads[name] = threading.get_ident()
+            return method(self)
+
+        monkeypatch.setattr(Session, name, record)
+
+    async def scenario():
+        dependency = get_async_session(read_consistency=None)
+        db = await dependency.__anext__()
+        db.connection()
+        with pytest.raises(RuntimeError):
+            await dependency.athrow(RuntimeError("request failed"))
+        return db
+
+    db = asyncio.run(scenario())
+
+    assert not db.in_transaction()
+    assert threads.keys() == {"rollback", "close"}
+    assert threading.get_ident() not in threads.values()
+
+
+def test_leak_detector_reports_each_leak_once(caplog):
+    detector = SessionLeakDetector(threshold=10, interval=0)
+
+    class Stub:
+        pass
+
+    stale, fresh = Stub(), Stub()
+    detector.opened(stale)
+    detector._sessions[id(stale)] = (*detector._sessions[id(stale)][:1], 0.0, "worker")
+    detector.opened(fresh)
+
+    with caplog.at_level(logging.WARNING):
+        assert detector.check(now=30.0) == 1
+        assert detector.check(now=31.0) == 1
+
+    assert len([record for record in caplog.records if "still open" in record.message]) == 1
+
+    detector.closed(id(stale))
+    assert detector.check(now=32.0) == 0
+    assert detector.open_sessions() == 1
@@ -0,0 +1,50 @@
+from app.models.category import Category
+from app.models.device import Device
+from app.models.location import Location
+from app.services.device import DeviceService
+
+
+def add_devices(session, num_devices):
+    categories = [Category(name=f"category{i}", description="Sensors") for i in range(3)]
+    locations = [Location(name=f"location{i}", description="Field") for i in range(3)]
+    session.add_all(categories + locations)
+    session.flush()
+    session.add_all([
+        Device(
+            name=f"device{i}",
+            description=f"Soil probe {i}",
+            topic=f"farm/device{i}",
+            channel=i,
+            type=1,
+            visualization=1,
+            message_type=1,
+            category_id=categories[i % 3].id,
+            location_id=locations[i % 3].id,
+        )
+        for i in range(num_devices)
+    ])
+    session.commit()
+    session.expire_all()
+
+
+def test_all_loads_category_and_location_with_fixed_statements(sqlite_session, statements):
+    add_devices(sqlite_session, 30)
+    device_service = DeviceService(db=sqlite_session)
+    statements.clear()
+
+    devices, total, *_ = device_service.all(1, 30)
+
+    assert len(devices) == 30
+    assert {device.category.name for device in devices} == {"category0", "category1", "category2"}
+    assert len(statements) == 2
+
+
+def test_find_loads_category_and_location_with_one_statement(sqlite_session, statements):
+    add_devices(sqlite_session, 1)
+    device_service = DeviceService(db=sqlite_session)
+    statements.clear()
+
+    device = device_service.find(1)
+
+    assert device.location.name == "location0"
+    assert len(statements) == 1
@@ -0,0 +1,81 @@
+from datetime import datetime
+
+from app.models.device_last_reading import DeviceLastReading
+from app.models.location import Location
+from app.models.reading import Reading
+from app.requests.reading import ReadingCreateRequest
+from app.services.device import DeviceService
+from app.services.last_reading import upsert_last_readings
+from app.services.reading import ReadingService
+from tests.unit.test_reading_service import seed_devices
+
+
+def last_values(session):
+    return {last.device_id: last.value for last in session.query(DeviceLastReading)}
+
+
+def test_save_many_records_the_newest_reading_per_device(sqlite_session, statements):
+    user, devices = seed_devices(sqlite_session, 2)
+    readings = [
+        ReadingCreateRequest(user_id=user.id, device_id=devices[i % 2].id, unit="C", value=str(i))
+        for i in range(10)
+    ]
+    statements.clear()
+
+    ReadingService(db=sqlite_session).save_many(readings)
+
+    assert sum(1 for statement in statements if "dev_agnes_device_last_readings" in statement) == 1
+    assert last_values(sqlite_session) == {devices[0].id: "8", devices[1].id: "9"}
+
+
+def test_older_readings_do_not_replace_the_last_reading(sqlite_session):
+    user, devices = seed_devices(sqlite_session, 1)
+    row = {"device_id": devices[0].id, "user_id": user.id, "unit": "C", "value_num": None}
+
+    newer = {**row, "reading_id": 2, "value": "new", "read_at": datetime(2026, 10, 16, 12)}
+    older = {**row, "reading_id": 1, "value": "old", "read_at": datetime(2026, 10, 16, 11)}
+    upsert_last_readings(sqlite_session, [newer])
+    upsert_last_readings(sqlite_session, [older])
+    sqlite_session.commit()
+
+    assert last_values(sqlite_session) == {devices[0].id: "new"}
+
+
+def test_delete_falls_back_to_the_previous_reading(sqlite_session):
+    user, devices = seed_devices(sqlite_session, 1)
+    reading_service = ReadingService(db=sqlite_session)
+    reading_service.save_many([
+        ReadingCreateRequest(user_id=user.id, device_id=devices[0].id, unit="C", value=value)
+        for value in ("1", "2")
+    ])
+    newest = sqlite_session.query(Reading).order_by(Reading.id.desc()).first()
+
+    reading_service.delete(newest.id)
+    assert last_values(sqlite_session) == {devices[0].id: "1"}
+
+    reading_service.delete(sqlite_session.query(Reading).one().id)
+    assert last_values(sqlite_session) == {}
+
+
+def test_latest_lists_every_device_with_its_reading(sqlite_session, statements):
+    user, devices = seed_devices(sqlite_session, 3)
+    shed = Location(name="Shed", description="Tool shed")
+    sqlite_session.add(shed)
+    sqlite_session.flush()
+    devices[2].location_id = shed.id
+    sqlite_session.commit()
+    ReadingService(db=sqlite_session).save_many([
+        ReadingCreateRequest(user_id=user.id, device_id=devices[0].id, unit="C", value="21.5"),
+        ReadingCreateRequest(user_id=user.id, device_id=devices[2].id, unit="%", value="40"),
+    ])
+    device_service = DeviceService(db=sqlite_session)
+    statements.clear()
+
+    items = device_service.latest()
+
+    assert len(statements) == 1
+    assert [(item.name, item.value, item.value_num) for item in items] == [
+        ("device1", "21.5", 21.5), ("device2", None, None), ("device3", "40", 40.0),
+    ]
+    assert [item.name for item in device_service.latest(location_id=shed.id)] == ["device3"]
+    assert [item.name for item in device_service.latest(category_id=devices[0].category_id + 1)] == []
@@ -0,0 +1,138 @@
+from starlette.applications import Starlette
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+from starlette.testclient import TestClient
+
+from app.middleware.listing_cache import ListingCacheMiddleware, normalized_query
+from app.requests.category import CategoryUpdateRequest
+from app.services import cache
+from app.services.cache import MemoryBackend, RedisBackend
+from app.services.category import CategoryService
+from tests.unit.test_device_service import add_devices
+
+
+class StandInRedis:
+    """
+    Local stand-in for a Redis server, with the commands the backend uses.
+    """
+
+    def __init__(self):
+        self.values = {}
+
+    def get(self, name):
+        return self.values.get(name)
+
+    def set(self, name, value, ex=None):
+        self.values[name] = value if isinstance(value, bytes) else str(value).encode()
+
+    def incr(self, name):
+        self.values[name] = str(int(self.values.get(name, b"0")) + 1).encode()
+        return int(self.values[name])
+
+
+class DownRedis:
+    def __getattr__(self, name):
+        def fail(*args, **kwargs):
+            raise ConnectionError("Connection refused")
+        return fail
+
+
+def listing_client(backend):
+    calls = []
+
+    async def devices(request):
+        calls.append(request.url.query)
+        if request.query_params.get("page") == "9":
+            return JSONResponse({"detail": "No devices found"}, status_code=404)
+        return JSONResponse({"data": [{"id": len(calls)}], "status_code": 200})
+
+    app = Starlette(routes=[Route("/api/devices", devices)])
+    app.add_middleware(ListingCacheMiddleware, ttl=30, backend=lambda: backend)
+    return TestClient(app), calls
+
+
+def test_normalized_query_ignores_order_and_blanks():
+    assert normalized_query(b"page=2&name=&items_per_page=10") == normalized_query(b"items_per_page=10&page=2")
+
+
+def test_listing_is_served_from_cache_until_the_version_moves():
+    backend = RedisBackend(StandInRedis())
+    client, calls = listing_client(backend)
+
+    first = client.get("/api/devices?page=1&items_per_page=10")
+    second = client.get("/api/devices?items_per_page=10&page=1")
+
+    assert len(calls) == 1
+    assert second.content == first.content
+    assert (first.headers["x-cache"], second.headers["x-cache"]) == ("miss", "hit")
+    assert second.headers["etag"] == first.headers["etag"]
+    assert second.headers["cache-control"] == "max-age=0, must-revalidate"
+
+    not_modified = client.get("/api/devices?page=1&items_per_page=10", headers={"If-None-Match": first.headers["etag"]})
+    assert not_modified.status_code == 304
+    assert not_modified.content == b""
+
+    backend.bump("devices")
+    assert client.get("/api/devices?page=1&items_per_page=10").json()["data"] == [{"id": 2}]
+
+
+def test_errors_and_strong_reads_are_not_cached():
+    client, calls = listing_client(MemoryBackend(max_size=10))
+
+    client.get("/api/devices?page=9")
+    client.get("/api/devices?page=9")
+    client.get("/api/devices", headers={"X-Read-Consistency": "strong"})
+    client.get("/api/devices", headers={"X-Read-Consistency": "strong"})
+
+    assert len(calls) == 4
+
+
+def test_unavailable_server_bypasses_the_cache():
+    client, calls = listing_client(RedisBackend(DownRedis()))
+
+    assert client.get("/api/devices").status_code == 200
+    assert client.get("/api/devices").status_code == 200
+    assert len(calls) == 2
+
+
+def test_failed_bumps_are_retried_and_surfaced(monkeypatch):
+    server = StandInRedis()
+    backend = RedisBackend(server, delay=0)
+    monkeypatch.setitem(cache.response_backends, "default", backend)
+    client, calls = listing_client(backend)
+    client.get("/api/devices")
+
+    failures = []
+    incr = server.incr
+
+    def flaky_incr(name):
+        if len(failures) < 4:
+            failures.append(name)
+            raise ConnectionError("Connection reset")
+        return incr(name)
+
+    monkeypatch.setattr(server, "incr", flaky_incr)
+
+    assert cache.invalidate_listings("devices") == ["devices"]
+    assert len(failures) == 3
+
+    # The stale page is bypassed while the bump is pending, and the bump is retried first.
+    client.get("/api/devices")
+    assert len(calls) == 2
+    assert backend.version("devices") == 1
+    assert backend.pending == set()
+
+    assert cache.invalidate_listings("devices") == []
+    assert backend.version("devices") == 2
+
+
+def test_writes_bump_the_listing_versions(sqlite_session, monkeypatch):
+    backend = MemoryBackend(max_size=10)
+    monkeypatch.setitem(cache.response_backends, "default", backend)
+    add_devices(sqlite_session, 1)
+
+    CategoryService(db=sqlite_session).update(1, CategoryUpdateRequest(name="renamed", description="Sensors"))
+
+    assert backend.version("categories") == 1
+    assert backend.version("devices") == 1
+    assert backend.version("locations") == 0
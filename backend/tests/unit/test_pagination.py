@@ -0,0 +1,121 @@
+import pytest
+from fastapi import HTTPException
+
+from app.models.category import Category
+from app.services.category import CategoryService
+from app.services.pagination import decode_cursor, encode_cursor, paginate_by_cursor
+
+
+def add_categories(session, names):
+    session.add_all([Category(name=name, description=f"{name} description") for name in names])
+    session.commit()
+
+
+def walk(service, sort_type, sort_by, items_per_page):
+    seen = []
+    cursor = ""
+    while cursor is not None:
+        items, cursor = service.all_by_cursor(items_per_page, cursor, sort_type=sort_type, sort_by=sort_by)
+        seen.extend(item.id for item in items)
+    return seen
+
+
+def test_cursor_round_trip():
+    cursor = encode_cursor("name", "asc", "soil probe", 42)
+
+    assert decode_cursor(cursor, "name", "asc") == ("soil probe", 42)
+
+
+def test_invalid_cursor_is_rejected():
+    with pytest.raises(HTTPException) as exc_info:
+        decode_cursor("not-a-cursor", "id", "asc")
+    assert exc_info.value.status_code == 400
+
+
+@pytest.mark.parametrize("sort_by, sort_type", [("name", "asc"), ("id", "desc")])
+def test_cursor_of_another_sort_order_is_rejected(sqlite_session, sort_by, sort_type):
+    add_categories(sqlite_session, ["beta", "alpha", "gamma"])
+    category_service = CategoryService(db=sqlite_session)
+    _, cursor = category_service.all_by_cursor(1, "", sort_type="asc", sort_by="id")
+
+    with pytest.raises(HTTPException) as exc_info:
+        category_service.all_by_cursor(1, cursor, sort_type=sort_type, sort_by=sort_by)
+    assert exc_info.value.detail == "Invalid cursor"
+
+
+@pytest.mark.parametrize("sort_type", ["asc", "desc"])
+@pytest.mark.parametrize("sort_by", ["id", "name"])
+def test_cursor_pages_match_offset_order(sqlite_session, sort_type, sort_by):
+    add_categories(sqlite_session, ["beta", "alpha", "beta", "gamma", "alpha", "delta", "beta"])
+    category_service = CategoryService(db=sqlite_session)
+
+    expected, *_ = category_service.all(1, 100, sort_type=sort_type, sort_by=sort_by)
+    expected_names = [item.name for item in expected]
+    seen = walk(category_service, sort_type, sort_by, 2)
+    names = {category.id: category.name for category in sqlite_session.query(Category)}
+
+    assert sorted(seen) == sorted(item.id for item in expected)
+    assert [names[id] for id in seen] == expected_names
+
+
+@pytest.mark.parametrize("sort_type", ["asc", "desc"])
+def test_cursor_pages_include_null_sort_values(sqlite_session, sort_type):
+    add_categories(sqlite_session, ["beta", "alpha"])
+    sqlite_session.add_all([Category(name=None, description="unnamed"), Category(name=None, description="unnamed")])
+    sqlite_session.commit()
+
+    seen = []
+    cursor = ""
+    while cursor is not None:
+        query = sqlite_session.query(Category)
+        rows, cursor = paginate_by_cursor(query, Category.name, Category.id, sort_type, cursor, 1)
+        seen.extend(row.id for row in rows)
+
+    assert sorted(seen) == [1, 2, 3, 4]
+
+
+def test_with_total_none_skips_count(sqlite_session, statements):
+    add_categories(sqlite_session, [f"category{i}" for i in range(5)])
+    category_service = CategoryService(db=sqlite_session)
+    statements.clear()
+
+    categories, total, last_page, first_item, last_item = category_service.all(1, 2, with_total="none")
+
+    assert [category.name for category in categories] == ["category0", "category1"]
+    assert total is None
+    assert last_page == 2
+    assert (first_item, last_item) == (1, 2)
+    assert len(statements) == 1
+    assert "count(" not in statements[0].lower()
+
+
+def test_with_total_none_on_last_page(sqlite_session):
+    add_categories(sqlite_session, [f"category{i}" for i in range(5)])
+    category_service = CategoryService(db=sqlite_session)
+
+    categories, total, last_page, first_item, last_item = category_service.all(3, 2, with_total="none")
+
+    assert len(categories) == 1
+    assert last_page == 3
+    assert last_item == 5
+
+
+def test_with_total_estimate_is_cached(sqlite_session, statements):
+    add_categories(sqlite_session, [f"estimate{i}" for i in range(5)])
+    category_service = CategoryService(db=sqlite_session)
+
+    _, first_total, *_ = category_service.all(1, 2, name="estimate", with_total="estimate")
+    add_categories(sqlite_session, ["estimate5"])
+    statements.clear()
+    _, second_total, *_ = category_service.all(1, 2, name="estimate", with_total="estimate")
+
+    assert first_total == second_total == 5
+    assert len(statements) == 1
+
+
+def test_invalid_with_total_is_rejected(sqlite_session):
+    category_service = CategoryService(db=sqlite_session)
+
+    with pytest.raises(HTTPException) as exc_info:
+        category_service.all(1, 2, with_total="maybe")
+    assert exc_info.value.status_code == 400
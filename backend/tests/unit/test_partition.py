@@ -0,0 +1,84 @@
+from datetime import date
+from types import SimpleNamespace
+
+from sqlalchemy import text
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.schema import CreateTable
+
+from app.models.partition import add_months, ensure_partitions, partition_months, partition_statement
+from app.models.reading import Reading
+from app.services.reading import ReadingService
+from tests.unit.test_reading_service import seed_devices
+
+
+def test_partition_months_cover_year_boundaries():
+    assert add_months(date(2026, 11, 1), 3) == date(2027, 2, 1)
+    assert add_months(date(2026, 1, 1), -1) == date(2025, 12, 1)
+    assert partition_months(date(2026, 11, 20), date(2027, 1, 5)) == [
+        date(2026, 11, 1), date(2026, 12, 1), date(2027, 1, 1),
+    ]
+
+
+def test_partition_statement_bounds_one_month():
+    assert partition_statement("dev_agnes_readings", date(2026, 12, 1)) == (
+        "CREATE TABLE IF NOT EXISTS dev_agnes_readings_p2026_12 PARTITION OF dev_agnes_readings "
+        "FOR VALUES FROM ('2026-12-01') TO ('2027-01-01')"
+    )
+
+
+def test_readings_table_is_partitioned_on_postgresql_only():
+    pg = str(CreateTable(Reading.__table__).compile(dialect=postgresql.dialect()))
+    lite = str(CreateTable(Reading.__table__).compile(dialect=sqlite.dialect()))
+
+    assert "PRIMARY KEY (id, created_at)" in pg
+    assert "PARTITION BY RANGE (created_at)" in pg
+    assert "PRIMARY KEY (id)" in lite
+    assert "PARTITION" not in lite
+
+
+def test_ensure_partitions_creates_missing_months():
+    executed = []
+
+    def execute(statement, parameters=None):
+        executed.append(str(statement))
+        return SimpleNamespace(scalars=lambda: ["dev_agnes_readings_p2026_10", "dev_agnes_readings_default"])
+
+    connection = SimpleNamespace(dialect=SimpleNamespace(name="postgresql"), execute=execute)
+
+    created = ensure_partitions(connection, "dev_agnes_readings", months_ahead=2, today=date(2026, 10, 16))
+
+    assert created == ["dev_agnes_readings_p2026_11", "dev_agnes_readings_p2026_12"]
+    assert executed[1:] == [
+        partition_statement("dev_agnes_readings", date(2026, 11, 1)),
+        partition_statement("dev_agnes_readings", date(2026, 12, 1)),
+    ]
+
+
+def test_ensure_partitions_is_a_no_op_on_sqlite(sqlite_session):
+    assert ensure_partitions(sqlite_session.connection(), "dev_agnes_readings") == []
+
+
+def test_date_filters_bound_created_at(sqlite_session, statements):
+    user, devices = seed_devices(sqlite_session, 1)
+    for created_at in ("2026-10-15 23:59:59", "2026-10-16 00:00:00", "2026-10-16 23:59:59", "2026-10-17 00:00:00"):
+        sqlite_session.execute(
+            text(
+                "INSERT INTO dev_agnes_readings (user_id, device_id, unit, value, created_at, updated_at) "
+                "VALUES (:user_id, :device_id, 'C', '1', :created_at, :created_at)"
+            ),
+            {"user_id": user.id, "device_id": devices[0].id, "created_at": created_at},
+        )
+    sqlite_session.commit()
+    reading_service = ReadingService(db=sqlite_session)
+    statements.clear()
+
+    readings, total, *_ = reading_service.all(1, 10, start_date=date(2026, 10, 16), end_date=date(2026, 10, 16))
+
+    assert total == 2
+    assert [reading.id for reading in readings] == [2, 3]
+    assert "dev_agnes_readings.created_at >= ?" in statements[0]
+    assert "dev_agnes_readings.created_at < ?" in statements[0]
+
+    readings, total, *_ = reading_service.all(1, 10, start_date="2026-10-17")
+    assert total == 1
+    assert readings[0].id == 4
@@ -0,0 +1,94 @@
+import json
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.models.base import Base
+from app.models.device import Device
+from app.requests.device import DeviceCreateRequest
+from app.services.device import DeviceService
+from app.services.reading import ReadingService
+from app.services.replica import PRIMARY, use_primary
+from config.database import RoutingSession, get_session, replica_info
+from tests.unit.test_reading_service import add_readings, seed_devices
+
+
+def memory_engine():
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(bind=engine)
+    return engine
+
+
+@pytest.fixture
+def routed_session():
+    primary, replica = memory_engine(), memory_engine()
+    for engine, count in ((primary, 3), (replica, 2)):
+        with sessionmaker(bind=engine)() as db:
+            user, devices = seed_devices(db, count)
+            add_readings(db, user, devices, count * 2)
+
+    db = sessionmaker(bind=primary, class_=RoutingSession, info=replica_info([replica]))()
+
+    yield db
+
+    db.close()
+    primary.dispose()
+    replica.dispose()
+
+
+def test_read_only_methods_use_the_replica(routed_session):
+    device_service = DeviceService(db=routed_session)
+
+    assert device_service.total() == 2
+    items, total, _, _, _ = device_service.all(page=1, items_per_page=10)
+    assert total == 2 and len(items) == 2
+    assert device_service.find(2).name == "device2"
+
+
+def test_other_queries_use_the_primary(routed_session):
+    device_service = DeviceService(db=routed_session)
+
+    assert device_service.get_by_id(3).name == "device3"
+    assert routed_session.query(Device).count() == 3
+
+
+def test_reads_follow_writes_to_the_primary(routed_session):
+    device_service = DeviceService(db=routed_session)
+    assert device_service.total() == 2
+
+    device_service.save(DeviceCreateRequest(
+        name="device4", description="Soil probe 4", category_id=1, location_id=1,
+        topic="farm/device4", channel=4, type=1, visualization=1, message_type=1,
+    ))
+
+    assert routed_session.info[PRIMARY]
+    assert device_service.total() == 4
+    assert device_service.find(4).name == "device4"
+
+
+def test_use_primary_reads_from_the_primary(routed_session):
+    use_primary(routed_session)
+
+    assert DeviceService(db=routed_session).total() == 3
+
+
+def test_export_reads_the_replica_while_streaming(routed_session):
+    reading_service = ReadingService(db=routed_session)
+
+    lines = "".join(reading_service.export("ndjson", batch_size=2)).splitlines()
+
+    assert [json.loads(line)["id"] for line in lines] == [1, 2, 3, 4]
+
+
+def test_strong_read_consistency_header_uses_the_primary():
+    dependency = get_session(read_consistency="strong")
+    db = next(dependency)
+    assert db.info[PRIMARY]
+    dependency.close()
+
+    dependency = get_session(read_consistency=None)
+    db = next(dependency)
+    assert not db.info.get(PRIMARY)
+    dependency.close()
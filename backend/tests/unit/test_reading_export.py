@@ -0,0 +1,55 @@
+from datetime import datetime
+
+import pytest
+
+from app.models.reading import Reading
+from app.services.reading import ReadingService
+from tests.unit.test_reading_service import seed_devices
+
+pa = pytest.importorskip("pyarrow")
+pq = pytest.importorskip("pyarrow.parquet")
+
+
+def add_daily_readings(session, user, devices):
+    session.add_all([
+        Reading(
+            user_id=user.id,
+            device_id=devices[i % 2].id,
+            unit="C",
+            value="offline" if i == 0 else str(i / 2),
+            created_at=datetime(2024, 5, 1 + i // 4, i % 4),
+            updated_at=datetime(2024, 5, 1 + i // 4, i % 4),
+        )
+        for i in range(12)
+    ])
+    session.commit()
+
+
+def test_export_arrow_streams_record_batches(sqlite_session):
+    user, devices = seed_devices(sqlite_session, 2)
+    add_daily_readings(sqlite_session, user, devices)
+    reading_service = ReadingService(db=sqlite_session)
+
+    chunks = list(reading_service.export_arrow(device_id="1", batch_size=4))
+    table = pa.ipc.open_stream(b"".join(chunks)).read_all()
+
+    assert len(chunks) == 3
+    assert table.column_names == ["device_id", "user_id", "created_at", "value_num", "unit"]
+    assert table.num_rows == 6
+    assert table["value_num"].to_pylist() == [None, 1.0, 2.0, 3.0, 4.0, 5.0]
+    assert table["created_at"][1].as_py() == datetime(2024, 5, 1, 2)
+
+
+def test_export_parquet_partitions_by_day(sqlite_session, tmp_path):
+    user, devices = seed_devices(sqlite_session, 2)
+    add_daily_readings(sqlite_session, user, devices)
+    reading_service = ReadingService(db=sqlite_session)
+
+    written = reading_service.export_parquet(
+        str(tmp_path), start_date="2024-05-02", end_date="2024-05-03", batch_size=3
+    )
+
+    assert written == 8
+    assert sorted(path.name for path in tmp_path.iterdir()) == ["date=2024-05-02", "date=2024-05-03"]
+    table = pq.read_table(tmp_path / "date=2024-05-02")
+    assert sorted(table["value_num"].to_pylist()) == [2.0, 2.5, 3.0, 3.5]
@@ -0,0 +1,310 @@
+import csv
+import io
+import json
+import sys
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import event
+
+from app.models.category import Category
+from app.models.device import Device
+from app.models.location import Location
+from app.models.reading import Reading
+from app.models.user import User
+from app.requests.reading import ReadingCreateRequest, ReadingUpdateRequest
+from app.services.reading import ReadingService
+from config.app import get_settings
+
+
+def seed_devices(session, num_devices):
+    category = Category(name="Sensors", description="Field sensors")
+    location = Location(name="Greenhouse", description="North greenhouse")
+    user = User(username="farmer", email="farmer@example.com", password="password")
+    session.add_all([category, location, user])
+    session.flush()
+
+    devices = [
+        Device(
+            name=f"device{i}",
+            description=f"Soil probe {i}",
+            topic=f"farm/device{i}",
+            channel=i,
+            type=1,
+            visualization=1,
+            message_type=1,
+            category_id=category.id,
+            location_id=location.id,
+        )
+        for i in range(1, num_devices + 1)
+    ]
+    session.add_all(devices)
+    session.commit()
+
+    return user, devices
+
+
+def test_save_many_returns_ids_in_submission_order(sqlite_session):
+    user, devices = seed_devices(sqlite_session, 2)
+    reading_service = ReadingService(db=sqlite_session)
+    readings = [
+        ReadingCreateRequest(user_id=user.id, device_id=devices[i % 2].id, unit="C", value=str(i))
+        for i in range(2500)
+    ]
+
+    results = reading_service.save_many(readings)
+
+    assert [result["status"] for result in results] == ["created"] * 2500
+    stored = {reading.id: reading.value for reading in sqlite_session.query(Reading)}
+    assert [stored[result["id"]] for result in results] == [str(i) for i in range(2500)]
+
+
+def test_save_accepts_further_readings_of_a_device(sqlite_session):
+    user, devices = seed_devices(sqlite_session, 1)
+    reading_service = ReadingService(db=sqlite_session)
+
+    for value in ("21.5", "22.0"):
+        reading_service.save(ReadingCreateRequest(user_id=user.id, device_id=devices[0].id, unit="C", value=value))
+
+    assert [reading.value for reading in sqlite_session.query(Reading).order_by(Reading.id)] == ["21.5", "22.0"]
+
+
+def test_save_many_reports_per_item_status(sqlite_session):
+    user, devices = seed_devices(sqlite_session, 1)
+    reading_service = ReadingService(db=sqlite_session)
+    readings = [
+        ReadingCreateRequest(user_id=user.id, device_id=devices[0].id, unit="C", value="21.5"),
+        ReadingCreateRequest(user_id=user.id, device_id=999, unit="C", value="22.0"),
+        ReadingCreateRequest(user_id=999, device_id=devices[0].id, unit="C", value="22.5"),
+        ReadingCreateRequest(user_id=user.id, device_id=devices[0].id, unit="C", value="23.0"),
+    ]
+
+    results = reading_service.save_many(readings)
+
+    assert [result["status"] for result in results] == ["created", "rejected", "rejected", "created"]
+    assert results[1]["detail"] == "Device not found"
+    assert results[2]["detail"] == "User not found"
+
+    stored = {reading.id: reading.value for reading in sqlite_session.query(Reading)}
+    assert stored[results[0]["id"]] == "21.5"
+    assert stored[results[3]["id"]] == "23.0"
+
+
+def add_readings(session, user, devices, num_readings):
+    session.add_all([
+        Reading(user_id=user.id, device_id=devices[i % len(devices)].id, unit="C", value=str(i))
+        for i in range(num_readings)
+    ])
+    session.commit()
+
+
+def test_all_loads_page_graph_with_fixed_statements(sqlite_session, statements):
+    user, devices = seed_devices(sqlite_session, 10)
+    add_readings(sqlite_session, user, devices, 100)
+    sqlite_session.expire_all()
+    reading_service = ReadingService(db=sqlite_session)
+    statements.clear()
+
+    readings, total, *_ = reading_service.all(1, 100)
+
+    assert len(readings) == 100
+    assert total == 100
+    assert {reading.device.category.name for reading in readings} == {"Sensors"}
+    assert len(statements) == 2
+
+
+def test_all_loads_only_included_relationships(sqlite_session, statements):
+    user, devices = seed_devices(sqlite_session, 2)
+    add_readings(sqlite_session, user, devices, 4)
+    sqlite_session.expire_all()
+    reading_service = ReadingService(db=sqlite_session)
+    statements.clear()
+
+    readings, *_ = reading_service.all(1, 10, include=["device"])
+
+    assert [reading.user for reading in readings] == [None] * 4
+    assert readings[0].device.category.name == "Sensors"
+    assert len(statements) == 2
+    assert not any("FROM users" in statement or "JOIN users" in statement for statement in statements)
+
+    statements.clear()
+    readings, _ = reading_service.all_by_cursor(10, "", include=[])
+
+    assert [(reading.user, reading.device) for reading in readings] == [(None, None)] * 4
+    assert len(statements) == 1
+    assert "dev_agnes_devices" not in statements[0]
+
+
+def test_find_loads_graph_with_one_statement(sqlite_session, statements):
+    user, devices = seed_devices(sqlite_session, 1)
+    add_readings(sqlite_session, user, devices, 1)
+    sqlite_session.expire_all()
+    reading_service = ReadingService(db=sqlite_session)
+    statements.clear()
+
+    reading = reading_service.find(1)
+
+    assert reading.device.location.name == "Greenhouse"
+    assert reading.user.username == "farmer"
+    assert len(statements) == 1
+
+
+def test_aggregate_buckets_numeric_values(sqlite_session):
+    user, devices = seed_devices(sqlite_session, 2)
+    samples = [
+        ("2024-05-01 10:01:00", "10"),
+        ("2024-05-01 10:03:00", "20"),
+        ("2024-05-01 10:04:00", "offline"),
+        ("2024-05-01 10:06:00", "5.5"),
+        ("2024-05-01 11:00:00", "-1e1"),
+    ]
+    sqlite_session.add_all([
+        Reading(user_id=user.id, device_id=devices[0].id, unit="C", value=value,
+                created_at=datetime.fromisoformat(created_at), updated_at=datetime.fromisoformat(created_at))
+        for created_at, value in samples
+    ])
+    sqlite_session.add(Reading(user_id=user.id, device_id=devices[1].id, unit="C", value="99"))
+    sqlite_session.commit()
+    reading_service = ReadingService(db=sqlite_session)
+
+    buckets = reading_service.aggregate(devices[0].id, "5m", ["avg", "min", "max", "count", "last"])
+
+    assert buckets == [
+        {"bucket": "2024-05-01 10:00:00", "avg": 15.0, "min": 10.0, "max": 20.0, "count": 2, "last": 20.0},
+        {"bucket": "2024-05-01 10:05:00", "avg": 5.5, "min": 5.5, "max": 5.5, "count": 1, "last": 5.5},
+        {"bucket": "2024-05-01 11:00:00", "avg": -10.0, "min": -10.0, "max": -10.0, "count": 1, "last": -10.0},
+    ]
+
+
+def test_aggregate_rejects_unknown_bucket(sqlite_session):
+    reading_service = ReadingService(db=sqlite_session)
+
+    with pytest.raises(HTTPException) as exc_info:
+        reading_service.aggregate(1, "7m", ["avg"])
+    assert exc_info.value.status_code == 400
+
+
+def test_value_num_follows_value(sqlite_session):
+    user, devices = seed_devices(sqlite_session, 1)
+    reading_service = ReadingService(db=sqlite_session)
+    results = reading_service.save_many([
+        ReadingCreateRequest(user_id=user.id, device_id=devices[0].id, unit="C", value=" 21.5 "),
+        ReadingCreateRequest(user_id=user.id, device_id=devices[0].id, unit="C", value="offline"),
+    ])
+
+    stored = {reading.id: reading.value_num for reading in sqlite_session.query(Reading)}
+    assert stored == {results[0]["id"]: 21.5, results[1]["id"]: None}
+
+    reading_service.update(
+        results[1]["id"], ReadingUpdateRequest(user_id=user.id, device_id=devices[0].id, unit="C", value="-3")
+    )
+    assert sqlite_session.get(Reading, results[1]["id"]).value_num == -3.0
+
+
+def test_aggregate_uses_device_created_at_index(sqlite_session):
+    user, devices = seed_devices(sqlite_session, 2)
+    add_readings(sqlite_session, user, devices, 10)
+    reading_service = ReadingService(db=sqlite_session)
+    executed = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        executed.append((statement, parameters))
+
+    engine = sqlite_session.get_bind()
+    event.listen(engine, "before_cursor_execute", record)
+    try:
+        reading_service.aggregate(devices[0].id, "1h", ["avg"], start_date="2024-05-01", end_date="2024-05-31")
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+
+    statement, parameters = executed[-1]
+    plan = sqlite_session.connection().exec_driver_sql("EXPLAIN QUERY PLAN " + statement, parameters).all()
+    details = " ".join(row[-1] for row in plan)
+    assert "ix_dev_agnes_readings_device_id_created_at" in details
+
+
+def test_all_filters_exact_device_ids(sqlite_session):
+    user, devices = seed_devices(sqlite_session, 12)
+    add_readings(sqlite_session, user, devices, 24)
+    reading_service = ReadingService(db=sqlite_session)
+
+    readings, total, *_ = reading_service.all(1, 50, device_id="1")
+    assert total == 2
+    assert {reading.device_id for reading in readings} == {1}
+
+    readings, total, *_ = reading_service.all(1, 50, device_id="1, 2,12")
+    assert total == 6
+    assert {reading.device_id for reading in readings} == {1, 2, 12}
+
+    _, total, *_ = reading_service.all(1, 50, device_id="1", id_match="substring")
+    assert total == 8
+
+
+def test_all_without_dates_lists_recent_readings(sqlite_session, monkeypatch):
+    monkeypatch.setattr(get_settings(), "READING_LISTING_DAYS", 31)
+    user, devices = seed_devices(sqlite_session, 1)
+    add_readings(sqlite_session, user, devices, 3)
+    sqlite_session.get(Reading, 1).created_at = datetime.now() - timedelta(days=40)
+    sqlite_session.commit()
+    reading_service = ReadingService(db=sqlite_session)
+
+    readings, total, *_ = reading_service.all(1, 10)
+    assert total == 2
+    assert [reading.id for reading in readings] == [2, 3]
+
+    readings, total, *_ = reading_service.all(1, 10, start_date="2000-01-01")
+    assert total == 3
+
+    monkeypatch.setattr(get_settings(), "READING_LISTING_DAYS", 0)
+    readings, _ = reading_service.all_by_cursor(10)
+    assert [reading.id for reading in readings] == [1, 2, 3]
+
+
+def test_all_rejects_non_integer_device_ids(sqlite_session):
+    reading_service = ReadingService(db=sqlite_session)
+
+    with pytest.raises(HTTPException) as exc_info:
+        reading_service.all(1, 10, device_id="1,x")
+    assert exc_info.value.status_code == 400
+
+
+def test_export_streams_chunks(sqlite_session):
+    user, devices = seed_devices(sqlite_session, 2)
+    add_readings(sqlite_session, user, devices, 25)
+    reading_service = ReadingService(db=sqlite_session)
+
+    chunks = list(reading_service.export("ndjson", device_id="1", batch_size=5))
+
+    lines = "".join(chunks).splitlines()
+    assert len(chunks) == 3
+    assert len(lines) == 13
+    assert [json.loads(line)["id"] for line in lines] == list(range(1, 26, 2))
+
+
+def test_export_csv_has_header(sqlite_session):
+    user, devices = seed_devices(sqlite_session, 1)
+    add_readings(sqlite_session, user, devices, 3)
+    reading_service = ReadingService(db=sqlite_session)
+
+    rows = list(csv.reader(io.StringIO("".join(reading_service.export("csv")))))
+
+    assert rows[0] == ["id", "user_id", "device_id", "unit", "value", "created_at", "updated_at"]
+    assert [row[4] for row in rows[1:]] == ["0", "1", "2"]
+
+
+def test_export_rejects_unknown_format(sqlite_session):
+    reading_service = ReadingService(db=sqlite_session)
+
+    with pytest.raises(HTTPException) as exc_info:
+        reading_service.export("xml")
+    assert exc_info.value.status_code == 400
+
+
+def test_columnar_export_without_pyarrow(sqlite_session, monkeypatch):
+    monkeypatch.setitem(sys.modules, "pyarrow", None)
+    reading_service = ReadingService(db=sqlite_session)
+
+    with pytest.raises(HTTPException) as exc_info:
+        reading_service.export_arrow()
+    assert exc_info.value.status_code == 501
@@ -0,0 +1,93 @@
+import pytest
+from fastapi import HTTPException
+
+from app.requests.category import CategoryUpdateRequest
+from app.models.category import Category
+from app.services.cache import LRUCache, cache_stats, invalidate, reference_cache
+from app.services.category import CategoryService
+from app.services.device import DeviceService
+from tests.unit.test_device_service import add_devices
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_lru_cache_evicts_and_expires():
+    clock = Clock()
+    cache = LRUCache(max_size=2, ttl=10, clock=clock)
+    cache.set(1, "a")
+    cache.set(2, "b")
+    cache.get(1)
+    cache.set(3, "c")
+
+    assert cache.get(2) is None
+    assert cache.get(1) == "a"
+
+    clock.now = 10
+    assert cache.get(3) is None
+    assert cache.stats() | {"hit_ratio": None} == {
+        "hits": 2, "misses": 2, "hit_ratio": None, "evictions": 1, "size": 1, "max_size": 2, "ttl": 10,
+    }
+
+
+def test_lru_cache_skips_fills_raced_by_an_invalidation():
+    cache = LRUCache(max_size=2, ttl=10)
+    generation = cache.generation
+    cache.invalidate(1)
+    cache.set(1, "stale", generation)
+
+    assert cache.get(1) is None
+
+    cache.set(1, "fresh", cache.generation)
+    assert cache.get(1) == "fresh"
+
+
+def test_cached_get_does_not_cache_a_row_updated_during_the_load(sqlite_session, monkeypatch):
+    add_devices(sqlite_session, 1)
+    category_service = CategoryService(db=sqlite_session)
+    query = sqlite_session.query
+
+    def racing_query(*args, **kwargs):
+        # Another request commits an update right after this one read the row.
+        result = query(*args, **kwargs)
+        invalidate(Category, 1)
+        return result
+
+    monkeypatch.setattr(sqlite_session, "query", racing_query)
+    category_service.find(1)
+    monkeypatch.undo()
+
+    assert reference_cache(Category).get(1) is None
+
+
+def test_find_serves_device_graph_from_cache(sqlite_session, statements):
+    add_devices(sqlite_session, 1)
+    device_service = DeviceService(db=sqlite_session)
+    statements.clear()
+
+    first = device_service.find(1)
+    sqlite_session.expunge_all()
+    second = device_service.find(1)
+
+    assert len(statements) == 1
+    assert second == first
+    assert cache_stats()["dev_agnes_devices"]["hits"] == 1
+    assert cache_stats()["dev_agnes_categories"]["hits"] == 1
+
+
+def test_writes_invalidate_the_cache(sqlite_session):
+    add_devices(sqlite_session, 1)
+    category_service = CategoryService(db=sqlite_session)
+    category_service.find(1)
+
+    category_service.update(1, CategoryUpdateRequest(name="renamed", description="Sensors"))
+    assert category_service.find(1).name == "renamed"
+
+    category_service.delete(1)
+    with pytest.raises(HTTPException):
+        category_service.find(1)
@@ -0,0 +1,86 @@
+from datetime import datetime, timedelta
+
+from app.models.category import Category
+from app.models.device import Device
+from app.models.reading import Reading
+from app.models.reading_rollup import ReadingRollup
+from app.models.retention_policy import RetentionPolicy
+from app.services.retention import RetentionService
+from app.services.rollup import RollupService
+from tests.unit.test_reading_service import seed_devices
+
+NOW = datetime(2026, 10, 16, 12, 0, 0)
+
+
+def seed_history(session):
+    user, devices = seed_devices(session, 1)
+    other = Category(name="Weather", description="Weather stations")
+    session.add(other)
+    session.flush()
+    station = Device(
+        name="station", description="Rooftop station", topic="farm/station", channel=9,
+        type=1, visualization=1, message_type=1, category_id=other.id, location_id=devices[0].location_id,
+    )
+    session.add(station)
+    session.flush()
+
+    for device in (devices[0], station):
+        for days in (60, 45, 40, 5, 1):
+            created_at = NOW - timedelta(days=days)
+            session.add(Reading(
+                user_id=user.id, device_id=device.id, unit="C", value=str(days),
+                created_at=created_at, updated_at=created_at,
+            ))
+    session.commit()
+    return devices[0], station
+
+
+def remaining(session, device):
+    return sorted(int(reading.value) for reading in session.query(Reading).filter(Reading.device_id == device.id))
+
+
+def test_raw_readings_wait_for_the_rollups(sqlite_session):
+    sensor, _ = seed_history(sqlite_session)
+    sqlite_session.add(RetentionPolicy(category_id=sensor.category_id, raw_days=30))
+    sqlite_session.commit()
+
+    reports = RetentionService(sqlite_session).apply(now=NOW)
+
+    assert reports == []
+    assert remaining(sqlite_session, sensor) == [1, 5, 40, 45, 60]
+
+
+def test_policies_apply_per_category_in_batches(sqlite_session):
+    sensor, station = seed_history(sqlite_session)
+    sqlite_session.add_all([
+        RetentionPolicy(category_id=sensor.category_id, raw_days=30),
+        RetentionPolicy(category_id=None, raw_days=50),
+    ])
+    sqlite_session.commit()
+    RollupService(sqlite_session).refresh()
+
+    reports = RetentionService(sqlite_session).apply(now=NOW, batch_size=2)
+
+    assert remaining(sqlite_session, sensor) == [1, 5]
+    assert remaining(sqlite_session, station) == [1, 5, 40, 45]
+    assert [(item["target"], item["category_id"], item["rows"]) for item in reports] == [
+        ("readings", sensor.category_id, 3),
+        ("readings", None, 1),
+    ]
+    assert all(item["rows_per_second"] >= 0 for item in reports)
+
+
+def test_rollups_expire_per_width(sqlite_session):
+    sensor, station = seed_history(sqlite_session)
+    RollupService(sqlite_session).refresh()
+    sqlite_session.add(RetentionPolicy(category_id=None, minute_rollup_days=30, day_rollup_days=365))
+    sqlite_session.commit()
+
+    reports = RetentionService(sqlite_session).apply(now=NOW)
+
+    minutes = sqlite_session.query(ReadingRollup).filter(ReadingRollup.width == 60).count()
+    hours = sqlite_session.query(ReadingRollup).filter(ReadingRollup.width == 3600).count()
+    assert minutes == 4
+    assert hours == 10
+    assert [(item["target"], item["rows"]) for item in reports] == [("rollups_60", 6), ("rollups_86400", 0)]
+    assert remaining(sqlite_session, sensor) == [1, 5, 40, 45, 60]
@@ -0,0 +1,161 @@
+import threading
+import time
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import NullPool
+
+from app.models.base import Base
+from app.models.reading import Reading
+from app.models.reading_rollup import ReadingRollup
+from app.services.reading import ReadingService
+from app.services.rollup import RollupService
+from tests.unit.test_reading_service import seed_devices
+
+FUNCTIONS = ["avg", "min", "max", "count", "last"]
+
+
+def add_samples(session, user, devices, start, num_readings):
+    session.add_all([
+        Reading(
+            user_id=user.id,
+            device_id=devices[i % len(devices)].id,
+            unit="C",
+            value="offline" if i % 7 == 0 else str(i % 13 - 4.5),
+            created_at=start + timedelta(seconds=97 * i),
+            updated_at=start + timedelta(seconds=97 * i),
+        )
+        for i in range(num_readings)
+    ])
+    session.commit()
+
+
+@pytest.mark.parametrize("bucket", ["1m", "5m", "15m", "1h", "1d"])
+def test_aggregate_from_rollups_matches_readings(sqlite_session, bucket):
+    user, devices = seed_devices(sqlite_session, 2)
+    add_samples(sqlite_session, user, devices, datetime(2024, 5, 1, 22, 30), 1500)
+    rollup_service = RollupService(db=sqlite_session)
+
+    assert rollup_service.refresh(batch_size=400) == 1500
+
+    expected = ReadingService(db=sqlite_session).aggregate(devices[0].id, bucket, FUNCTIONS)
+    assert rollup_service.aggregate(devices[0].id, bucket, FUNCTIONS) == pytest.approx(expected)
+
+
+def test_refresh_is_incremental(sqlite_session):
+    user, devices = seed_devices(sqlite_session, 1)
+    start = datetime(2024, 5, 1, 10, 0)
+    add_samples(sqlite_session, user, devices, start, 100)
+    rollup_service = RollupService(db=sqlite_session)
+    rollup_service.refresh()
+
+    assert rollup_service.refresh() == 0
+
+    add_samples(sqlite_session, user, devices, start, 100)
+    assert rollup_service.refresh() == 100
+    assert rollup_service.watermark() == 200
+
+    hourly = sqlite_session.query(ReadingRollup).filter(ReadingRollup.width == 3600).all()
+    assert sum(rollup.count for rollup in hourly) == 2 * sum(1 for i in range(100) if i % 7)
+
+
+def test_aggregate_includes_readings_after_watermark(sqlite_session):
+    user, devices = seed_devices(sqlite_session, 1)
+    start = datetime(2024, 5, 1, 10, 0)
+    add_samples(sqlite_session, user, devices, start, 50)
+    rollup_service = RollupService(db=sqlite_session)
+    rollup_service.refresh()
+
+    add_samples(sqlite_session, user, devices, start + timedelta(minutes=30), 50)
+
+    expected = ReadingService(db=sqlite_session).aggregate(devices[0].id, "1h", FUNCTIONS)
+    assert rollup_service.aggregate(devices[0].id, "1h", FUNCTIONS) == pytest.approx(expected)
+
+
+def test_refresh_folds_readings_committed_behind_watermark(sqlite_session):
+    user, devices = seed_devices(sqlite_session, 1)
+    start = datetime(2024, 5, 1, 10, 0)
+    add_samples(sqlite_session, user, devices, start, 40)
+    columns = ("id", "user_id", "device_id", "unit", "value", "created_at", "updated_at")
+    late = sqlite_session.query(Reading).filter(Reading.id.between(11, 15)).all()
+    late = [{column: getattr(reading, column) for column in columns} for reading in late]
+    sqlite_session.query(Reading).filter(Reading.id.between(11, 15)).delete()
+    sqlite_session.commit()
+    rollup_service = RollupService(db=sqlite_session)
+
+    assert rollup_service.refresh(batch_size=25) == 40
+    assert rollup_service.gaps() == [(11, 15)]
+    assert rollup_service.watermark() == 10
+
+    sqlite_session.add_all(Reading(**values) for values in late[:2])
+    sqlite_session.commit()
+
+    expected = ReadingService(db=sqlite_session).aggregate(devices[0].id, "1h", FUNCTIONS)
+    assert rollup_service.aggregate(devices[0].id, "1h", FUNCTIONS) == pytest.approx(expected)
+
+    assert rollup_service.refresh() == 2
+    assert rollup_service.gaps() == [(13, 15)]
+    assert rollup_service.refresh() == 0
+
+    hourly = sqlite_session.query(ReadingRollup).filter(ReadingRollup.width == 3600).all()
+    assert sum(rollup.count for rollup in hourly) == sum(1 for i in range(40) if i % 7 and not 12 <= i < 15)
+    assert rollup_service.aggregate(devices[0].id, "1h", FUNCTIONS) == pytest.approx(expected)
+
+
+def test_refresh_gives_up_expired_gaps(sqlite_session):
+    user, devices = seed_devices(sqlite_session, 1)
+    add_samples(sqlite_session, user, devices, datetime(2024, 5, 1, 10, 0), 20)
+    sqlite_session.query(Reading).filter(Reading.id == 5).delete()
+    sqlite_session.commit()
+    rollup_service = RollupService(db=sqlite_session)
+    rollup_service.refresh()
+
+    assert rollup_service.gaps() == [(5, 5)]
+    assert rollup_service.refresh(gap_seconds=0) == 0
+    assert rollup_service.gaps() == []
+    assert rollup_service.watermark() == 20
+
+
+def test_concurrent_refreshes_fold_each_reading_once(tmp_path, monkeypatch):
+    engine = create_engine(
+        f"sqlite:///{tmp_path / 'rollups.db'}", connect_args={"check_same_thread": False}, poolclass=NullPool
+    )
+    Base.metadata.create_all(bind=engine)
+    factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    db = factory()
+    user, devices = seed_devices(db, 2)
+    add_samples(db, user, devices, datetime(2024, 5, 1, 10, 0), 600)
+
+    barrier = threading.Barrier(2)
+    processed = []
+    fold = RollupService.fold
+
+    def slow_fold(self, reading_service, after_id, upto_id):
+        # Give the other refresh time to read the same watermark.
+        time.sleep(0.01)
+        return fold(self, reading_service, after_id, upto_id)
+
+    monkeypatch.setattr(RollupService, "fold", slow_fold)
+
+    def refresh():
+        session = factory()
+        try:
+            barrier.wait()
+            processed.append(RollupService(db=session).refresh(batch_size=50))
+        finally:
+            session.close()
+
+    threads = [threading.Thread(target=refresh) for _ in range(2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(processed) == 2
+    assert sum(processed) == 600
+    hourly = db.query(ReadingRollup).filter(ReadingRollup.width == 3600).all()
+    assert sum(rollup.count for rollup in hourly) == sum(1 for i in range(600) if i % 7)
+    db.close()
+    engine.dispose()
@@ -0,0 +1,69 @@
+import pytest
+from fastapi import HTTPException
+
+from app.models.category import Category
+from app.models.device import Device
+from app.services.category import CategoryService
+from app.services.device import DeviceService
+from tests.unit.test_reading_service import seed_devices
+
+
+def rename(session, devices, names):
+    for device, (name, description) in zip(devices, names):
+        device.name = name
+        device.description = description
+    session.commit()
+
+
+def test_search_ranks_devices(sqlite_session):
+    _, devices = seed_devices(sqlite_session, 4)
+    rename(sqlite_session, devices, [
+        ("Weather station", "Roof"),
+        ("Soil probe", "Soil probe next to the soil moisture probe"),
+        ("Humidity sensor", "Greenhouse"),
+        ("Soil probe", "Bed 4"),
+    ])
+    device_service = DeviceService(db=sqlite_session)
+
+    devices, total, *_ = device_service.all(1, 10, q="probe")
+
+    assert total == 2
+    assert [device.id for device in devices] == [2, 4]
+
+
+def test_search_rejects_cursor_pagination(sqlite_session):
+    seed_devices(sqlite_session, 2)
+    device_service = DeviceService(db=sqlite_session)
+
+    with pytest.raises(HTTPException) as error:
+        device_service.all_by_cursor(10, "", q="probe")
+
+    assert error.value.status_code == 400
+
+
+def test_search_follows_updates_and_deletes(sqlite_session):
+    _, devices = seed_devices(sqlite_session, 2)
+    device_service = DeviceService(db=sqlite_session)
+
+    rename(sqlite_session, devices, [("Rain gauge", "Field"), ("Wind vane", "Field")])
+    sqlite_session.delete(sqlite_session.get(Device, 2))
+    sqlite_session.commit()
+
+    assert [device.name for device in device_service.all(1, 10, q="gauge")[0]] == ["Rain gauge"]
+    assert device_service.all(1, 10, q="vane")[0] == []
+    assert device_service.all(1, 10, q="Soil probe 1")[0] == []
+
+
+def test_search_short_text_and_wildcards(sqlite_session):
+    sqlite_session.add_all([
+        Category(name="pH", description="Acidity"),
+        Category(name="100% humidity", description="Saturated"),
+        Category(name="1000 lux", description="Light"),
+    ])
+    sqlite_session.commit()
+    category_service = CategoryService(db=sqlite_session)
+
+    assert [category.name for category in category_service.all(1, 10, q="ph")[0]] == ["pH"]
+    assert [category.name for category in category_service.all(1, 10, q="0%")[0]] == ["100% humidity"]
+    categories = category_service.all(1, 10, q="100% h", sort_type="desc")[0]
+    assert [category.name for category in categories] == ["100% humidity"]
@@ -0,0 +1,48 @@
+from datetime import datetime, timedelta, timezone
+
+from app.responses.reading import PaginatedReadingResponse
+from app.responses.serialization import format_timestamp, json_response
+from app.services.reading import ReadingService
+from tests.unit.test_reading_service import add_readings, seed_devices
+
+
+def test_format_timestamp_matches_strftime():
+    for value in (
+        datetime(2026, 10, 16, 9, 5, 7),
+        datetime(2026, 10, 16, 9, 5, 7, 999999),
+        datetime(2026, 10, 16, 9, 5, 7, tzinfo=timezone(timedelta(hours=2))),
+    ):
+        assert format_timestamp(value) == value.strftime("%Y-%m-%d %H:%M:%S")
+
+
+def test_json_response_matches_the_validated_response(sqlite_session):
+    user, devices = seed_devices(sqlite_session, 2)
+    add_readings(sqlite_session, user, devices, 6)
+    readings, total, last_page, first_item, last_item = ReadingService(db=sqlite_session).all(1, 10)
+    meta = {
+        "current_page": 1,
+        "last_page": last_page,
+        "first_item": first_item,
+        "last_item": last_item,
+        "items_per_page": 10,
+        "total": total,
+        "has_next": False,
+    }
+
+    response = json_response(PaginatedReadingResponse, {"data": readings, "meta": meta, "status_code": 200})
+    validated = PaginatedReadingResponse.model_validate(
+        {"data": [reading.model_dump() for reading in readings], "meta": meta, "status_code": 200}
+    )
+
+    assert response.body == validated.model_dump_json().encode()
+    assert response.headers["content-type"] == "application/json"
+
+
+def test_page_shares_user_and_device_responses(sqlite_session):
+    user, devices = seed_devices(sqlite_session, 2)
+    add_readings(sqlite_session, user, devices, 6)
+
+    readings, *_ = ReadingService(db=sqlite_session).all(1, 10)
+
+    assert len({id(reading.user) for reading in readings}) == 1
+    assert len({id(reading.device) for reading in readings}) == 2